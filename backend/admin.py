@@ -1,34 +1,43 @@
 import os
-import io
 import json
+import asyncio
 import random
 import datetime
+import base64
+import uuid
+import glob
+import hashlib
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 from decimal import Decimal
 from fastapi import APIRouter, HTTPException, Body
-from fastapi.responses import Response
-from supabase import create_client, Client
-import google.generativeai as genai
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER
+from fastapi.responses import StreamingResponse, FileResponse
+from postgrest.exceptions import APIError
 from langchain_groq import ChatGroq
 from langchain_community.utilities import SQLDatabase
+from sqlalchemy import text, Date, Float, Integer, String
 from langchain_community.agent_toolkits import create_sql_agent
 from dotenv import load_dotenv
+from clients import get_supabase, gemini_json, fetch_all, RateLimiter
+from sqlstore import analytics_db
+from prewarm import prewarm_worker
+from lead_feed import lead_feed
+from strategy import strategy_engine
+from dispatch_feed import dispatch_feed
+from metrics import track_llm, register_cache
+from cache import TTLCache, SingleFlight, Snapshot
+from chat_intents import route_question, normalize_question
+from reports import build_summary_pdf, build_full_pdf
+from tracing import span, slow_log, profiled_traces
+from dispatch import AgentPool, StaticScores, initial_load, score_row, top_two, candidate, fair_capacity, optimal_assignment, ranked_pairs, SCORE_MIN, SCORE_MAX
 
 load_dotenv()
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
-# 1. CLIENTS
-url = os.getenv("SUPABASE_URL") or os.getenv("VITE_SUPABASE_URL")
-key = os.getenv("SUPABASE_KEY") or os.getenv("VITE_SUPABASE_ANON_KEY")
-supabase: Client = create_client(url, key)
-
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-gemini_model = genai.GenerativeModel('gemini-2.5-flash')
+# 1. CLIENTS (Shared async pools live in clients.py)
 
 # 2. SQL AGENT (THE BRAIN)
 # Strict Schema definitions to prevent hallucinations
@@ -53,6 +62,10 @@ Table: 'transactions'
 - txn_id (PK), investor_id (FK), amount (Revenue), transaction_date, status ('Success', 'Failed').
 - This logs actual money received.
 
+Table: 'investor_features'
+- investor_id (PK, FK), lifetime_invested, txn_count, failed_txn_ratio, sip_streak, fund_mix (jsonb), last_outcome, objection_history (jsonb).
+- One precomputed row per investor, kept current by triggers. Prefer it over scanning transactions for per-investor questions.
+
 --- 2. CRITICAL BUSINESS LOGIC ---
 1. REVENUE CALCULATION:
    - Always SUM(amount) from 'transactions'.
@@ -72,140 +85,242 @@ Table: 'transactions'
    - Example: SELECT agent_name, sum_revenue ...
 """
 
+SQL_AGENT_MODEL = "llama-3.3-70b-versatile"
+
 try:
-    db = SQLDatabase.from_uri(os.getenv("SUPABASE_DB_URL"))
-    llm_sql = ChatGroq(model="llama-3.3-70b-versatile", api_key=os.getenv("GROQ_API_KEY"), temperature=0)
+    db = SQLDatabase(analytics_db.engine) # Shares the analytics pool
+    llm_sql = ChatGroq(model=SQL_AGENT_MODEL, api_key=os.getenv("GROQ_API_KEY"), temperature=0)
     sql_agent = create_sql_agent(
         llm=llm_sql,
         db=db,
         agent_type="openai-tools",
         verbose=True,
         handle_parsing_errors=True,
-        prefix=SCHEMA_HINTS
+        prefix=SCHEMA_HINTS,
+        agent_executor_kwargs={"return_intermediate_steps": True} # Lets chat answers carry the SQL they ran
     )
     print("✅ Admin SQL Brain Online")
 except Exception as e:
     print(f"⚠️ SQL Agent Failed: {e}")
+    db = None
     sql_agent = None
+
+# Fixed analytics queries: portable SQL, typed columns (see sqlstore.py)
+# Whole dashboard in one pass: one GROUP BY over transactions, one scan of interactions.
+# One row per recent day (or a single row with day NULL), KPIs repeated on each.
+DASHBOARD_SNAPSHOT = text(
+    "WITH daily AS ("
+    "  SELECT transaction_date AS day, SUM(amount) AS value FROM transactions WHERE status = 'Success' GROUP BY transaction_date"
+    "), conversions AS ("
+    "  SELECT COUNT(DISTINCT CASE WHEN outcome = 'Converted' THEN agent_id END) AS agents,"
+    "         SUM(CASE WHEN outcome = 'Converted' THEN 1 ELSE 0 END) * 100.0 / NULLIF(COUNT(*), 0) AS rate"
+    "  FROM interactions"
+    ") "
+    "SELECT recent.day, recent.value, (SELECT SUM(value) FROM daily) AS revenue, conversions.agents, conversions.rate "
+    "FROM conversions LEFT JOIN (SELECT day, value FROM daily ORDER BY day DESC LIMIT :days) recent ON 1 = 1 "
+    "ORDER BY recent.day"
+).columns(day=Date, value=Float, revenue=Float, agents=Integer, rate=Float)
+REVENUE_BY_DAY = text(
+    "SELECT transaction_date AS day, SUM(amount) AS value FROM transactions WHERE status = 'Success' "
+    "GROUP BY transaction_date ORDER BY transaction_date DESC LIMIT :days"
+).columns(day=Date, value=Float)
+TOP_CONVERTERS = text(
+    "SELECT agents.name AS label, COUNT(*) AS value FROM interactions JOIN agents ON interactions.agent_id = agents.agent_id "
+    "WHERE outcome = 'Converted' GROUP BY agents.name ORDER BY value DESC LIMIT :limit"
+).columns(label=String, value=Integer)
+TOP_EARNERS = text(
+    "SELECT agents.name AS label, SUM(transactions.amount) AS value FROM transactions "
+    "JOIN investors ON transactions.investor_id = investors.investor_id JOIN agents ON investors.assigned_agent_id = agents.agent_id "
+    "WHERE transactions.status = 'Success' GROUP BY agents.name ORDER BY value DESC LIMIT :limit"
+).columns(label=String, value=Float)
+INVESTORS_BY_RISK = text("SELECT risk_appetite AS label, COUNT(*) AS value FROM investors GROUP BY risk_appetite").columns(label=String, value=Integer)
+INVESTORS_BY_OCCUPATION = text("SELECT occupation AS label, COUNT(*) AS value FROM investors GROUP BY occupation").columns(label=String, value=Integer)
+
+
+async def revenue_by_day(days: int) -> list:
+    """
+    [{"name": "Mon DD", "value": revenue}] oldest first.
+    """
+    rows = await analytics_db.fetch(REVENUE_BY_DAY, days=days)
+    return [{"name": row.day.strftime("%b %d"), "value": row.value} for row in reversed(rows)]
+
 # =================================================================
 # 🧠 AI DISPATCHER (WITH LANGUAGE LOGIC)
 # =================================================================
 
-@router.post("/trigger-assignment")
-async def trigger_assignment():
-    # 1. GET WORKLOAD
-    assigned_res = supabase.table("investors").select("assigned_agent_id").not_.is_("assigned_agent_id", "null").execute()
-    global_workload = {}
-    for row in assigned_res.data:
-        aid = row['assigned_agent_id']
-        global_workload[aid] = global_workload.get(aid, 0) + 1
+BATCH_WRITE_SIZE = 500 # Rows per bulk insert / ids per IN (...) filter (fallback path)
+DISPATCH_FLUSH_CHUNK = int(os.getenv("DISPATCH_FLUSH_CHUNK", "5000")) # Leads per apply_dispatch transaction
+_apply_dispatch_rpc = True
+_workload_table = True
 
-    # 2. FETCH UNASSIGNED LEADS
-    leads = supabase.table("investors").select("*").is_("assigned_agent_id", "null").limit(15).execute().data
-    
-    if not leads: return {"status": "All leads assigned."}
+DISPATCH_LLM_BATCH = int(os.getenv("DISPATCH_LLM_BATCH", "8")) # Leads per Sales Manager prompt
+DISPATCH_RPM = float(os.getenv("DISPATCH_RPM", "30"))
+DISPATCH_SKIP_MARGIN = int(os.getenv("DISPATCH_SKIP_MARGIN", "20")) # Score gap where the LLM can't add anything
+DISPATCH_LLM_BUDGET_SEC = float(os.getenv("DISPATCH_LLM_BUDGET_SEC", "8"))
+dispatch_limiter = RateLimiter(DISPATCH_RPM)
 
-    agents = supabase.table("agents").select("*").limit(20).execute().data
-    logs = []
-    batch_workload = {}
-
-    for lead in leads:
-        candidates = []
-        
-        for agent in agents:
-            score = 60
-            strengths = [] # Collect reasons for AI Context
-            
-            # --- A. LANGUAGE MATCH (CRITICAL) ---
-            # Check if lead's language is in agent's language list
-            # Handle potential string/list formats safely
-            agent_langs = agent.get('languages', [])
-            if isinstance(agent_langs, str):
-                 try: agent_langs = json.loads(agent_langs.replace("'", '"'))
-                 except: agent_langs = []
-            
-            # Normalize for comparison
-            lead_lang = lead.get('preferred_language', 'English')
-            
-            if lead_lang in agent_langs or 'English' in agent_langs: # English is universal fallback
-                score += 15
-                strengths.append(f"Speaks {lead_lang}")
-            else:
-                score -= 50 # Huge penalty if language mismatch
-            
-            # --- B. SPECIALIZATION ---
-            if agent.get('specialization') in lead.get('occupation', ''): 
-                score += 25
-                strengths.append(f"Expert in {agent['specialization']}")
-            
-            # --- C. PERFORMANCE ---
-            perf = agent.get('performance_score', 0) or 0
-            score += int(perf * 5)
-            
-            # --- D. WORKLOAD ---
-            current_db_load = global_workload.get(agent['agent_id'], 0)
-            current_batch_load = batch_workload.get(agent['name'], 0)
-            total_load = current_db_load + current_batch_load
-            
-            if total_load >= 4: 
-                score -= 100 # Burnout prevention
-            else: 
-                score -= (total_load * 15)
-
-            if total_load == 0: 
-                score += 10
-                strengths.append("Available Now")
-
-            candidates.append({
-                "id": agent['agent_id'], 
-                "name": agent['name'], 
-                "score": max(5, min(99, score)), 
-                "load": total_load,
-                "context": ", ".join(strengths)
-            })
-        
-        # Sort
-        candidates.sort(key=lambda x: x['score'], reverse=True)
-        top_match = candidates[0]
-        runner_up = candidates[1] if len(candidates) > 1 else top_match
-        
-        # --- GENAI DECISION ---
-        prompt = f"""
-        Act as Sales Manager. Assign Lead.
-        
-        LEAD: {lead['name']} 
+
+def math_decision(top_match: dict, reasoning: str = "Math optimal.") -> dict:
+    return {"assigned_name": top_match['name'], "assigned_id": top_match['id'], "reasoning": reasoning}
+
+
+async def review_batch(plans: list) -> dict:
+    """
+    One Sales Manager prompt for several leads. Returns {position in batch: decision}.
+    """
+    briefs = "\n".join(f"""
+        LEAD #{n}: {lead['name']}
         - Language: {lead.get('preferred_language')}
         - Job: {lead['occupation']}
         - Capacity: ₹{lead.get('sip_capacity')}
-        
-        TOP CANDIDATES:
-        1. {top_match['name']} (Score: {top_match['score']}%)
-           - Strengths: {top_match['context']}
-           - Load: {top_match['load']}
-           
-        2. {runner_up['name']} (Score: {runner_up['score']}%)
-           - Strengths: {runner_up['context']}
-           - Load: {runner_up['load']}
-        
+        CANDIDATES:
+        1. {top['name']} (Score: {top['score']}%) - Strengths: {top['context']} - Load: {top['load']}
+        2. {runner['name']} (Score: {runner['score']}%) - Strengths: {runner['context']} - Load: {runner['load']}
+    """ for n, (lead, top, runner) in enumerate(plans, 1))
+
+    prompt = f"""
+        Act as Sales Manager. Assign each Lead to one of its two candidates.
+        {briefs}
         RULES:
         - Language Match is PRIORITY. Do not assign if language missing.
         - If #1 is overloaded (>3 leads), pick #2.
-        - Write a short, professional reason, like language matching, professional qualification expertise.
-        - Output JSON: {{ "assigned_name": "Name", "assigned_id": "ID", "reasoning": "Reason" }}
+        - Write a short, professional reason per lead, like language matching, professional qualification expertise.
+        - Output JSON: {{ "decisions": [{{ "lead": 1, "assigned_name": "Name", "reasoning": "Reason" }}] }}
         """
-        
+
+    raw = json.loads(await gemini_json(prompt, limiter=dispatch_limiter))
+    decisions = {}
+    for item in raw.get("decisions", []):
         try:
-            import time; time.sleep(1.5)
-            ai_res = gemini_model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
-            decision = json.loads(ai_res.text)
-            assigned_obj = next((c for c in candidates if c['name'] == decision['assigned_name']), top_match)
-            decision['assigned_id'] = assigned_obj['id']
-        except:
-            decision = {"assigned_name": top_match['name'], "assigned_id": top_match['id'], "reasoning": "Math optimal."}
-
-        batch_workload[decision['assigned_name']] = batch_workload.get(decision['assigned_name'], 0) + 1
-        
-        log_entry = {
+            pos = int(item["lead"]) - 1
+            _, top, runner = plans[pos]
+        except (KeyError, ValueError, TypeError, IndexError):
+            continue
+        chosen = runner if item.get("assigned_name") == runner['name'] else top
+        decisions[pos] = {"assigned_name": chosen['name'], "assigned_id": chosen['id'], "reasoning": item.get("reasoning") or "Math optimal."}
+    return decisions
+
+
+async def review_assignments(plans: list, on_decided=None) -> list:
+    """
+    LLM review for close calls only, DISPATCH_LLM_BATCH leads per prompt, all batches
+    in parallel under the rate limit. Whatever isn't back within the budget stays "Math optimal."
+    `on_decided({position: decision})` fires as each group is settled, not just at the end.
+    """
+    decisions = [None] * len(plans)
+    close_calls = []
+    settled = {}
+    for k, (_, top, runner) in enumerate(plans):
+        margin = top['score'] - runner['score']
+        if top['id'] == runner['id'] or margin >= DISPATCH_SKIP_MARGIN:
+            decisions[k] = settled[k] = math_decision(top, f"Clear math winner (+{margin} pts): {top['context'] or 'best available fit'}.")
+        else:
+            close_calls.append(k)
+    if on_decided and settled: on_decided(settled)
+
+    batches = [close_calls[i:i + DISPATCH_LLM_BATCH] for i in range(0, len(close_calls), DISPATCH_LLM_BATCH)]
+    tasks = {asyncio.create_task(review_batch([plans[k] for k in batch])): batch for batch in batches}
+    deadline = asyncio.get_running_loop().time() + DISPATCH_LLM_BUDGET_SEC
+    pending = set(tasks)
+    while pending:
+        done, pending = await asyncio.wait(pending, timeout=max(deadline - asyncio.get_running_loop().time(), 0), return_when=asyncio.FIRST_COMPLETED)
+        if not done: break
+        for task in done:
+            batch = tasks[task]
+            if task.exception(): print(f"Dispatch LLM Error: {task.exception()}")
+            else:
+                for pos, decision in task.result().items(): decisions[batch[pos]] = decision
+            # Batch positions the LLM skipped (or a failed batch) fall back to math right away
+            settled = {k: decisions[k] or math_decision(plans[k][1]) for k in batch}
+            for k, decision in settled.items(): decisions[k] = decision
+            if on_decided: on_decided(settled)
+
+    if pending:
+        for task in pending: task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        print(f"⏱️ Dispatch LLM budget hit: {len(pending)}/{len(tasks)} batches fell back to math")
+        settled = {k: math_decision(plans[k][1]) for task in pending for k in tasks[task]}
+        for k, decision in settled.items(): decisions[k] = decision
+        if on_decided: on_decided(settled)
+
+    return decisions
+
+
+async def get_workload(supabase) -> dict:
+    """
+    Open leads per agent from agent_workload (sql/agent_workload.sql), which a trigger on
+    investors keeps current - one row per agent instead of one per assigned investor.
+    """
+    global _workload_table
+    if _workload_table:
+        try:
+            rows = await fetch_all(lambda: supabase.table("agent_workload").select("agent_id, open_leads"), "agent_id")
+            return {row['agent_id']: row['open_leads'] for row in rows}
+        except APIError as e:
+            if e.code not in ("PGRST205", "42P01"): raise # Anything but "table not found" is a real failure
+            _workload_table = False
+            print("⚠️ agent_workload table missing (run backend/sql/agent_workload.sql); counting investors instead")
+
+    global_workload = {}
+    for row in await fetch_all(lambda: supabase.table("investors").select("investor_id, assigned_agent_id").not_.is_("assigned_agent_id", "null"), "investor_id"):
+        aid = row['assigned_agent_id']
+        global_workload[aid] = global_workload.get(aid, 0) + 1
+    return global_workload
+
+
+async def flush_dispatch(supabase, rows: list) -> int:
+    """
+    Writes assignments + their ai_dispatch_logs rows via the apply_dispatch RPC (sql/apply_dispatch.sql).
+    rows: [{"investor_id", "assigned_agent_id", "log"}]. Each chunk is one transaction, so a
+    failure leaves that chunk's leads unassigned and unlogged, never half-written.
+    Returns how many leads were assigned.
+    """
+    global _apply_dispatch_rpc
+    applied = 0
+    for start in range(0, len(rows), DISPATCH_FLUSH_CHUNK):
+        chunk = rows[start:start + DISPATCH_FLUSH_CHUNK]
+        if _apply_dispatch_rpc:
+            try:
+                applied += (await supabase.rpc("apply_dispatch", {"rows": chunk}).execute()).data or 0
+                continue
+            except APIError as e:
+                if e.code != "PGRST202": raise # Anything but "function not found" is a real failure
+                _apply_dispatch_rpc = False
+                print("⚠️ apply_dispatch RPC missing (run backend/sql/apply_dispatch.sql); falling back to non-atomic bulk writes")
+
+        by_agent = {}
+        for row in chunk: by_agent.setdefault(row['assigned_agent_id'], []).append(row['investor_id'])
+        for i in range(0, len(chunk), BATCH_WRITE_SIZE):
+            await supabase.table("ai_dispatch_logs").insert([row['log'] for row in chunk[i:i + BATCH_WRITE_SIZE]]).execute()
+        for agent_id, investor_ids in by_agent.items():
+            for i in range(0, len(investor_ids), BATCH_WRITE_SIZE):
+                await supabase.table("investors").update({"assigned_agent_id": agent_id}).in_("investor_id", investor_ids[i:i + BATCH_WRITE_SIZE]).is_("assigned_agent_id", "null").execute()
+        applied += len(chunk)
+    # Leads can only have moved into agents' lists (they were unassigned); refresh the watched ones
+    lead_feed.touch(row['investor_id'] for row in rows if lead_feed.watching(row['assigned_agent_id']))
+    return applied
+
+
+async def dispatch_leads(supabase, leads: list, agents: list, global_workload: dict, review: bool = True) -> list:
+    """
+    Greedy dispatch for one set of leads: math pass, optional LLM review, atomic write-back.
+    Shared by the manual trigger and the streaming dispatcher. Returns the log entries.
+    """
+    # Score every lead x agent pair at once; only the workload term changes per pick
+    pool = AgentPool(agents)
+    static = StaticScores(leads, pool)
+    load = initial_load(pool, global_workload)
+
+    plans = []
+    for i, lead in enumerate(leads):
+        row = score_row(static, i, load)
+        best, second = top_two(row)
+        plans.append((lead, candidate(pool, static, i, best, row, load), candidate(pool, static, i, second, row, load)))
+        load[best] += 1 # Provisional; rebalance() moves it if the review picks the runner-up
+
+    def log_entry(k: int, decision: dict) -> dict:
+        lead, top_match, runner_up = plans[k]
+        return {
             "lead_name": lead['name'],
             "lead_persona": f"{lead['occupation']} ({lead['preferred_language']})",
             "top_candidate": top_match['name'],
@@ -215,161 +330,699 @@ async def trigger_assignment():
             "is_override": decision['assigned_name'] != top_match['name'],
             "reasoning": decision['reasoning']
         }
-        
-        supabase.table("ai_dispatch_logs").insert(log_entry).execute()
-        supabase.table("investors").update({"assigned_agent_id": decision['assigned_id']}).eq("investor_id", lead['investor_id']).execute()
-        logs.append(log_entry)
 
+    # Each decision goes out to live admin feeds as soon as it's made
+    run = uuid.uuid4().hex[:12]
+    def on_decided(settled: dict):
+        for k, decision in settled.items():
+            dispatch_feed.publish("decision", {**log_entry(k, decision), "investor_id": plans[k][0]['investor_id'], "run": run})
+
+    def rebalance(decisions: list):
+        """
+        Reviews run in parallel on the provisional load, so an override never charged the runner-up.
+        Replay the picks in order on the real load: leads after the first override that kept the
+        math pick are rescored, and move (with fresh candidates for the log) if the top agent changes.
+        """
+        first = next((k for k, d in enumerate(decisions) if d['assigned_id'] != plans[k][1]['id']), None)
+        if first is None: return
+        load = initial_load(pool, global_workload)
+        for k, (lead, top_match, _) in enumerate(plans):
+            if k > first and decisions[k]['assigned_id'] == top_match['id']:
+                row = score_row(static, k, load)
+                best, second = top_two(row)
+                if pool.ids[best] != top_match['id']:
+                    plans[k] = (lead, candidate(pool, static, k, best, row, load), candidate(pool, static, k, second, row, load))
+                    decisions[k] = math_decision(plans[k][1], "Math optimal after an earlier override moved workload.")
+            load[pool.index[decisions[k]['assigned_id']]] += 1
+
+    # --- GENAI DECISION (batched, concurrent, time-boxed) ---
+    if review:
+        decisions = await review_assignments(plans, on_decided)
+        rebalance(decisions) # Pending rows on live feeds are replaced by the committed ones below
+    else:
+        decisions = [math_decision(top) for _, top, _ in plans]
+        on_decided(dict(enumerate(decisions)))
+
+    logs, rows = [], []
+    for k, decision in enumerate(decisions):
+        entry = log_entry(k, decision)
+        rows.append({"investor_id": plans[k][0]['investor_id'], "assigned_agent_id": decision['assigned_id'], "log": entry})
+        logs.append(entry)
+
+    applied = await flush_dispatch(supabase, rows)
+    dispatch_feed.publish("committed", {"run": run, "assigned": applied})
+
+    # Warm the deep-dive analyses so each agent's first click is instant
+    prewarm_worker.enqueue(lead['investor_id'] for lead in leads)
     return logs
+
+
+@router.post("/trigger-assignment")
+async def trigger_assignment():
+    supabase = await get_supabase()
+
+    # 1. GET WORKLOAD
+    global_workload = await get_workload(supabase)
+
+    # 2. FETCH UNASSIGNED LEADS
+    leads = (await supabase.table("investors").select("*").is_("assigned_agent_id", "null").limit(15).execute()).data
     
+    if not leads: return {"status": "All leads assigned."}
+
+    agents = (await supabase.table("agents").select("*").limit(20).execute()).data
+    return await dispatch_leads(supabase, leads, agents, global_workload)
+    
+@router.post("/trigger-assignment/batch")
+async def trigger_batch_assignment(payload: dict = Body(default={})):
+    """
+    Assigns the whole unassigned pool in one optimal pass (no per-lead LLM call).
+    Optional payload: {"capacity": max leads per agent, "limit": max leads to take}
+    """
+    supabase = await get_supabase()
+
+    global_workload, leads, agents = await asyncio.gather(
+        get_workload(supabase),
+        fetch_all(lambda: supabase.table("investors").select("*").is_("assigned_agent_id", "null"), "investor_id"),
+        fetch_all(lambda: supabase.table("agents").select("*"), "agent_id"),
+    )
+    if payload.get("limit"): leads = leads[:int(payload["limit"])]
+    if not leads: return {"status": "All leads assigned."}
+    if not agents: raise HTTPException(status_code=400, detail="No agents to assign to")
+
+    with span("dispatch.solve", leads=len(leads), agents=len(agents)):
+        pool = AgentPool(agents)
+        static = StaticScores(leads, pool)
+        load = initial_load(pool, global_workload)
+        capacity = int(payload.get("capacity") or fair_capacity(load, len(leads)))
+        picks = optimal_assignment(static, load, capacity)
+        ranked = ranked_pairs(static)
+        scores = np.clip(static.scores, SCORE_MIN, SCORE_MAX)
+
+    logs, rows = [], []
+    for i, lead in enumerate(leads):
+        j = int(picks[i])
+        if j < 0: continue
+        best, second = int(ranked[i, 0]), int(ranked[i, 1])
+        alternative = best if best != j else second
+        chosen = candidate(pool, static, i, j, scores[i], load)
+        reasoning = f"Optimal batch match: {chosen['context'] or 'best available fit'}."
+        if scores[i, best] > scores[i, j]: reasoning += f" {pool.names[best]} is at capacity ({capacity})."
+        # The solver's pick is the math pick here; there is no LLM to override it
+        log_entry = {
+            "lead_name": lead['name'],
+            "lead_persona": f"{lead['occupation']} ({lead['preferred_language']})",
+            "top_candidate": pool.names[j],
+            "assigned_agent": pool.names[j],
+            "math_score": int(scores[i, j]),
+            "second_score": int(scores[i, alternative]),
+            "is_override": False,
+            "reasoning": reasoning
+        }
+        rows.append({"investor_id": lead['investor_id'], "assigned_agent_id": pool.ids[j], "log": log_entry})
+        logs.append(log_entry)
+
+    applied = await flush_dispatch(supabase, rows)
+    prewarm_worker.enqueue(row['investor_id'] for row in rows)
+    # Too many rows to push one by one; live feeds pick them up with a since-fetch
+    dispatch_feed.publish("committed", {"run": uuid.uuid4().hex[:12], "assigned": applied})
+
+    return {
+        "assigned": applied,
+        "unassigned": len(leads) - applied,
+        "capacity": capacity,
+        "logs": logs[:50],
+    }
+
+# --- Dispatch feed: keyset pages over (created_at, id) + live SSE ---
+
+FEED_PAGE_MAX = int(os.getenv("DISPATCH_FEED_PAGE_MAX", "200"))
+FEED_KEEPALIVE_SEC = 15
+
+
+def encode_cursor(row: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps([row['created_at'], row['id']]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    (ISO timestamp, int id), re-serialized so nothing from the client reaches the filter verbatim.
+    """
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if isinstance(row_id, bool) or not isinstance(row_id, (int, str)): raise TypeError(row_id)
+        return datetime.datetime.fromisoformat(str(created_at)).isoformat(), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _keyset(op: str, cursor: str) -> str:
+    # PostgREST logic tree for (created_at, id) <op> cursor; values quoted for the ':' and '+' in timestamps
+    created_at, row_id = decode_cursor(cursor)
+    return f'created_at.{op}."{created_at}",and(created_at.eq."{created_at}",id.{op}."{row_id}")'
+
+
 @router.get("/dispatch-feed")
-async def get_feed():
-    res = supabase.table("ai_dispatch_logs").select("*").order("created_at", desc=True).limit(50).execute()
-    return res.data
+async def get_feed(limit: int = 50, before: str | None = None, since: str | None = None):
+    """
+    Newest-first page of dispatch logs.
+    - before=<next_cursor>: the page after this one (older rows)
+    - since=<latest_cursor>: only rows newer than that; has_more means call again with the new latest_cursor
+    """
+    supabase = await get_supabase()
+    limit = max(1, min(limit, FEED_PAGE_MAX))
+    query = supabase.table("ai_dispatch_logs").select("*")
+    if since:
+        # Oldest new rows first, so a long gap is walked forward without skipping any
+        rows = (await query.or_(_keyset("gt", since)).order("created_at").order("id").limit(limit + 1).execute()).data
+        has_more = len(rows) > limit
+        rows = rows[:limit][::-1]
+    else:
+        if before: query = query.or_(_keyset("lt", before))
+        rows = (await query.order("created_at", desc=True).order("id", desc=True).limit(limit + 1).execute()).data
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+    return {
+        "logs": rows,
+        "has_more": has_more,
+        "next_cursor": encode_cursor(rows[-1]) if has_more and not since else None,
+        "latest_cursor": encode_cursor(rows[0]) if rows else since,
+    }
+
+
+@router.get("/dispatch-feed/stream")
+async def stream_dispatch_feed():
+    """
+    SSE: decision / committed / override events as dispatch runs happen (see dispatch_feed.py).
+    """
+    async def events():
+        queue = dispatch_feed.subscribe()
+        try:
+            yield sse("ready", dispatch_feed.stats())
+            while True:
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=FEED_KEEPALIVE_SEC)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n" # Comment frame: keeps proxies from closing an idle stream
+                    continue
+                yield sse(event, data)
+        finally:
+            dispatch_feed.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/strategy-rules")
+async def get_strategy_rules():
+    return {**strategy_engine.stats(), "rule_set": strategy_engine.rules}
+
+
+@router.post("/strategy-rules/reload")
+async def reload_strategy_rules():
+    """
+    Picks up strategy_rules edits now instead of within STRATEGY_RULES_TTL_SEC.
+    """
+    changed = await strategy_engine.refresh(force=True)
+    if changed: lead_feed.retag_all()
+    return {"changed": changed, **strategy_engine.stats()}
+
+
+@router.get("/prewarm/status")
+async def get_prewarm_status():
+    return prewarm_worker.status()
+
+
+@router.get("/debug/slow")
+async def get_slow_requests():
+    return slow_log.entries()
+
+
+@router.get("/debug/trace/{trace_id}")
+async def get_trace(trace_id: str):
+    trace = profiled_traces.get(trace_id)
+    if not trace: raise HTTPException(status_code=404, detail="Trace not found or expired")
+    return trace
 
 
 @router.post("/override-assignment")
 async def override_assignment(payload: dict = Body(...)):
-    supabase.table("ai_dispatch_logs").update({
-        "assigned_agent": payload.get("new_agent_name"),
+    supabase = await get_supabase()
+    new_agent_name = payload.get("new_agent_name")
+    log_res, agent_res = await asyncio.gather(
+        supabase.table("ai_dispatch_logs").select("*").eq("id", payload.get("log_id")).limit(1).execute(),
+        supabase.table("agents").select("agent_id").eq("name", new_agent_name).limit(1).execute(),
+    )
+    correction = {
+        "assigned_agent": new_agent_name,
         "admin_corrected": True,
-        "reasoning": f"👨‍💼 ADMIN OVERRIDE: Re-assigned to {payload.get('new_agent_name')} manually."
-    }).eq("id", payload.get("log_id")).execute()
-    return {"status": "success"}
+        "reasoning": f"👨‍💼 ADMIN OVERRIDE: Re-assigned to {new_agent_name} manually."
+    }
+    await supabase.table("ai_dispatch_logs").update(correction).eq("id", payload.get("log_id")).execute()
+
+    # Move the lead itself; the agent_workload trigger moves the counts with it
+    investor_id = log_res.data[0].get("investor_id") if log_res.data else None
+    if investor_id and agent_res.data:
+        await supabase.table("investors").update({"assigned_agent_id": agent_res.data[0]['agent_id']}).eq("investor_id", investor_id).execute()
+        lead_feed.touch([investor_id])
+    dispatch_feed.publish("override", {"id": payload.get("log_id"), **correction})
+    return {"status": "success", "reassigned": bool(investor_id and agent_res.data)}
 
 # =================================================================
 # 💬 ROBUST CHATBOT
 # =================================================================
 
-@router.post("/chat")
-async def admin_chat(payload: dict = Body(...)):
-    question = payload.get("question")
-    if not sql_agent: return {"answer": "Database Agent offline."}
-    
-    try:
-        # 1. Enhance Question for Visuals
-        enhanced_q = question
-        if any(w in question.lower() for w in ["chart", "graph", "trend", "growth", "over time", "vs", "compare", "breakdown", "distribution"]):
-            enhanced_q += " Select exactly two columns: a Label (string/date) and a Value (number)."
-
-        # 2. Run SQL Agent
-        result = sql_agent.invoke(enhanced_q)
-        answer_text = result['output']
-        
-        # 3. Dynamic Chart Detection
-        chart_data = None
-        chart_type = None
+# --- Routed intents: common question families answered with one fixed query ---
+
+CHAT_CACHE_SIZE = int(os.getenv("CHAT_CACHE_SIZE", "500"))
+CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", "86400"))
+DATA_VERSION_TTL_SEC = float(os.getenv("DATA_VERSION_TTL_SEC", "10"))
+ANALYTICS_TABLES = ("agents", "investors", "interactions", "transactions")
+
+# Answers keyed by normalized question (or intent + params), valid for one data version
+chat_cache = TTLCache(maxsize=CHAT_CACHE_SIZE, ttl=CHAT_CACHE_TTL)
+chat_flight = SingleFlight()
+register_cache("admin_chat", chat_cache)
+data_version = Snapshot(lambda: analytics_db.data_version(ANALYTICS_TABLES), ttl=DATA_VERSION_TTL_SEC, max_stale=0)
+
+
+def _rupees(value) -> str:
+    return f"₹{value or 0:,.0f}"
+
+
+def _ranking(rows, fmt) -> str:
+    first, rest = rows[0], rows[1:]
+    summary = f"{first.label} leads with {fmt(first.value)}"
+    if rest: summary += ", followed by " + ", ".join(f"{row.label} ({fmt(row.value)})" for row in rest)
+    return summary + "."
+
+
+async def _revenue_trend(days: int) -> dict:
+    points = await revenue_by_day(days)
+    if not points: return {"answer": "No successful transactions recorded yet.", "chart_data": None, "chart_type": None}
+    peak = max(points, key=lambda p: p["value"])
+    return {
+        "answer": f"Revenue over the last {len(points)} days with transactions: {_rupees(sum(p['value'] for p in points))} in total, peaking at {_rupees(peak['value'])} on {peak['name']}.",
+        "chart_data": points,
+        "chart_type": "area",
+    }
+
+
+async def _top_agents(query, limit: int, fmt) -> dict:
+    rows = await analytics_db.fetch(query, limit=limit)
+    if not rows: return {"answer": "No agent results recorded yet.", "chart_data": None, "chart_type": None}
+    return {"answer": _ranking(rows, fmt), "chart_data": [{"name": row.label, "value": row.value} for row in rows], "chart_type": "bar"}
+
+
+async def _breakdown(query, what: str) -> dict:
+    rows = await analytics_db.fetch(query)
+    total = sum(row.value for row in rows)
+    if not total: return {"answer": "No investors recorded yet.", "chart_data": None, "chart_type": None}
+    largest = max(rows, key=lambda row: row.value)
+    return {
+        "answer": f"{largest.label} is the largest {what} group: {largest.value:,} of {total:,} investors ({largest.value * 100 / total:.1f}%).",
+        "chart_data": [{"name": row.label, "value": row.value} for row in rows],
+        "chart_type": "pie",
+    }
+
+
+async def _kpi(field: str, label: str, fmt) -> dict:
+    stats = await dashboard_snapshot.get()
+    return {"answer": f"{label} is {fmt(stats[field])}.", "chart_data": None, "chart_type": None}
+
+
+INTENT_HANDLERS = {
+    "revenue_trend": _revenue_trend,
+    "top_agents_revenue": lambda limit: _top_agents(TOP_EARNERS, limit, _rupees),
+    "top_agents_conversions": lambda limit: _top_agents(TOP_CONVERTERS, limit, lambda v: f"{v} conversions"),
+    "risk_breakdown": lambda: _breakdown(INVESTORS_BY_RISK, "risk appetite"),
+    "occupation_breakdown": lambda: _breakdown(INVESTORS_BY_OCCUPATION, "occupation"),
+    "total_revenue": lambda: _kpi("revenue", "Total revenue from successful transactions", _rupees),
+    "conversion_rate": lambda: _kpi("conversion_rate", "The overall conversion rate", lambda v: f"{v}%"),
+}
+
 
+def enhance_question(question: str) -> str:
+    # Enhance Question for Visuals
+    if any(w in question.lower() for w in ["chart", "graph", "trend", "growth", "over time", "vs", "compare", "breakdown", "distribution"]):
+        return question + " Select exactly two columns: a Label (string/date) and a Value (number)."
+    return question
+
+
+async def chart_for_question(question: str):
+    """
+    Keyword-picked companion chart for an agent answer; independent of the agent's own SQL.
+    Returns (chart_data, chart_type).
+    """
+    q = question.lower()
+    try:
         # TYPE A: TRENDS (Area Chart)
-        if "trend" in question.lower() or "revenue" in question.lower() or "growth" in question.lower():
-             sql = "SELECT to_char(transaction_date, 'Mon DD'), SUM(amount) FROM transactions WHERE status='Success' GROUP BY transaction_date ORDER BY transaction_date DESC LIMIT 14"
-             try:
-                 res = eval(db.run(sql))
-                 chart_data = [{"name": row[0], "value": row[1]} for row in res][::-1]
-                 chart_type = "area"
-             except: pass
+        if "trend" in q or "revenue" in q or "growth" in q:
+            return await revenue_by_day(14), "area"
 
         # TYPE B: RANKINGS (Bar Chart)
-        elif "top" in question.lower() or "best" in question.lower() or "agent" in question.lower():
-             sql = "SELECT agents.name, count(*) as val FROM interactions JOIN agents ON interactions.agent_id = agents.agent_id WHERE outcome='Converted' GROUP BY agents.name ORDER BY val DESC LIMIT 5"
-             try:
-                 res = eval(db.run(sql))
-                 chart_data = [{"name": row[0], "value": row[1]} for row in res]
-                 chart_type = "bar"
-             except: pass
+        if "top" in q or "best" in q or "agent" in q:
+            return [{"name": row.label, "value": row.value} for row in await analytics_db.fetch(TOP_CONVERTERS, limit=5)], "bar"
 
         # TYPE C: DISTRIBUTION (Pie Chart)
-        elif "breakdown" in question.lower() or "distribution" in question.lower() or "share" in question.lower():
-             if "risk" in question.lower():
-                 sql = "SELECT risk_appetite, count(*) FROM investors GROUP BY risk_appetite"
-             elif "occupation" in question.lower():
-                 sql = "SELECT occupation, count(*) FROM investors GROUP BY occupation"
-             else: sql = None
-             
-             if sql:
-                 try:
-                     res = eval(db.run(sql))
-                     chart_data = [{"name": row[0], "value": row[1]} for row in res]
-                     chart_type = "pie"
-                 except: pass
+        if "breakdown" in q or "distribution" in q or "share" in q:
+            query = INVESTORS_BY_RISK if "risk" in q else INVESTORS_BY_OCCUPATION if "occupation" in q else None
+            if query is not None:
+                return [{"name": row.label, "value": row.value} for row in await analytics_db.fetch(query)], "pie"
+    except Exception as e:
+        print(f"Chart query failed: {e}")
+    return None, None
 
-        return {
-            "answer": answer_text,
-            "chart_data": chart_data,
-            "chart_type": chart_type
-        }
+
+def _tool_query(tool_input):
+    return tool_input.get("query") if isinstance(tool_input, dict) else tool_input
+
+
+async def ask_sql_agent(question: str) -> dict:
+    """
+    The full LangChain SQL agent loop, for questions no intent covers.
+    The chart query runs alongside it rather than after it.
+    """
+    async def run_agent():
+        async with track_llm("groq", SQL_AGENT_MODEL):
+            return await sql_agent.ainvoke(enhance_question(question))
+
+    result, (chart_data, chart_type) = await asyncio.gather(run_agent(), chart_for_question(question))
+    queries = [action.tool_input for action, _ in result.get('intermediate_steps', []) if action.tool == "sql_db_query"]
+    return {
+        "answer": result['output'],
+        "chart_data": chart_data,
+        "chart_type": chart_type,
+        "sql": _tool_query(queries[-1]) if queries else None
+    }
+
+
+def chat_route(question: str):
+    """
+    (routed intent or None, cache key).
+    """
+    routed = route_question(question) if analytics_db else None
+    key = f"intent:{routed[0]}:{json.dumps(routed[1], sort_keys=True)}" if routed else normalize_question(question)
+    return routed, key
+
+
+async def current_data_version():
+    try:
+        return await data_version.get()
+    except Exception as e:
+        print(f"Data version unavailable, chat cache bypassed: {e}")
+        return None
+
+
+def cached_answer(key, version):
+    cached = chat_cache.get(key)
+    if cached and version is not None and cached["version"] == version: return cached["response"]
+    return None
+
+
+@router.post("/chat")
+async def admin_chat(payload: dict = Body(...)):
+    question = payload.get("question") or ""
+    routed, key = chat_route(question)
+    if routed is None and not sql_agent: return {"answer": "Database Agent offline."}
+
+    version = await current_data_version()
+    cached = cached_answer(key, version)
+    if cached: return cached
+
+    async def answer():
+        if routed:
+            try:
+                response = await INTENT_HANDLERS[routed[0]](**routed[1])
+            except Exception as e:
+                if not sql_agent: raise
+                print(f"Intent {routed[0]} failed, asking the SQL agent: {e}")
+                response = await ask_sql_agent(question)
+        else:
+            response = await ask_sql_agent(question)
+        if version is not None: chat_cache.set(key, {"version": version, "response": response})
+        return response
+
+    try:
+        return await chat_flight.do((key, version), answer)
     except Exception as e:
         return {"answer": f"Analysis failed: {str(e)}", "chart_data": None}
 
+# --- Streaming variant (Server-Sent Events) ---
+# event: step   {"tool", "input"}            agent tool calls as they start
+# event: sql    {"sql"}                      each query the agent runs
+# event: chart  {"chart_data", "chart_type"} as soon as the chart query returns
+# event: token  {"text"}                     LLM output tokens
+# event: answer {<same body as /admin/chat>} final, authoritative answer
+# event: done   {}
+
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def chat_events(question: str):
+    yield sse("step", {"tool": "router", "input": question}) # First byte goes out immediately
+
+    routed, key = chat_route(question)
+    if routed is None and not sql_agent:
+        yield sse("answer", {"answer": "Database Agent offline.", "chart_data": None})
+        yield sse("done", {})
+        return
+
+    version = await current_data_version()
+    response = cached_answer(key, version)
+    if response is None and routed:
+        try:
+            response = await INTENT_HANDLERS[routed[0]](**routed[1])
+            if version is not None: chat_cache.set(key, {"version": version, "response": response})
+        except Exception as e:
+            if not sql_agent:
+                yield sse("answer", {"answer": f"Analysis failed: {str(e)}", "chart_data": None})
+                yield sse("done", {})
+                return
+            print(f"Intent {routed[0]} failed, asking the SQL agent: {e}")
+    if response is not None:
+        if response.get("chart_data"): yield sse("chart", {"chart_data": response["chart_data"], "chart_type": response["chart_type"]})
+        yield sse("answer", response)
+        yield sse("done", {})
+        return
+
+    # Agent events and the chart query feed one queue; each producer ends with a None
+    events: asyncio.Queue = asyncio.Queue()
+    result = {"answer": None, "chart_data": None, "chart_type": None, "sql": None}
+
+    async def run_chart():
+        try:
+            result["chart_data"], result["chart_type"] = await chart_for_question(question)
+            if result["chart_data"]: await events.put(("chart", {"chart_data": result["chart_data"], "chart_type": result["chart_type"]}))
+        finally:
+            await events.put(None)
+
+    async def run_agent():
+        try:
+            async with track_llm("groq", SQL_AGENT_MODEL):
+                async for ev in sql_agent.astream_events(enhance_question(question), version="v2"):
+                    kind = ev["event"]
+                    if kind == "on_tool_start":
+                        tool_input = ev["data"].get("input")
+                        await events.put(("step", {"tool": ev["name"], "input": tool_input}))
+                        if ev["name"] == "sql_db_query":
+                            result["sql"] = _tool_query(tool_input)
+                            await events.put(("sql", {"sql": result["sql"]}))
+                    elif kind == "on_chat_model_stream":
+                        token = ev["data"]["chunk"].content
+                        if token and isinstance(token, str): await events.put(("token", {"text": token}))
+                    elif kind == "on_chain_end" and not ev.get("parent_ids"):
+                        result["answer"] = (ev["data"].get("output") or {}).get("output")
+        except Exception as e:
+            result["answer"] = f"Analysis failed: {str(e)}"
+            result["failed"] = True
+        finally:
+            await events.put(None)
+
+    tasks = [asyncio.create_task(run_chart()), asyncio.create_task(run_agent())]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            item = await events.get()
+            if item is None:
+                remaining -= 1
+                continue
+            yield sse(*item)
+    finally:
+        for task in tasks: task.cancel() # Client went away mid-stream
+
+    failed = result.pop("failed", False)
+    if not failed and version is not None: chat_cache.set(key, {"version": version, "response": result})
+    yield sse("answer", result)
+    yield sse("done", {})
+
+
+@router.post("/chat/stream")
+async def admin_chat_stream(payload: dict = Body(...)):
+    return StreamingResponse(
+        chat_events(payload.get("question") or ""),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # =================================================================
 # 📊 REAL ANALYTICS (FIXED SYNTAX)
 # =================================================================
 
+DASHBOARD_TTL_SEC = float(os.getenv("DASHBOARD_TTL_SEC", "15"))
+DASHBOARD_MAX_STALE_SEC = float(os.getenv("DASHBOARD_MAX_STALE_SEC", "300"))
+
+
+async def build_dashboard_stats() -> dict:
+    rows = await analytics_db.fetch(DASHBOARD_SNAPSHOT, days=7)
+    head = rows[0]
+    return {
+        "revenue": head.revenue or 0,
+        "active_agents": head.agents or 0,
+        "conversion_rate": round(head.rate or 0, 1),
+        "chart_data": [{"name": row.day.strftime("%b %d"), "uv": row.value} for row in rows if row.day is not None]
+    }
+
+
+# Dashboard polls hit memory; the aggregate reruns at most once per TTL, in the background,
+# or as soon as the tables behind it are written to (dashboard_version moves).
+# Only the tables DASHBOARD_SNAPSHOT reads, so assignments and prewarm writes to investors/agents don't flush it
+DASHBOARD_TABLES = ("transactions", "interactions")
+dashboard_snapshot = Snapshot(build_dashboard_stats, ttl=DASHBOARD_TTL_SEC, max_stale=DASHBOARD_MAX_STALE_SEC)
+register_cache("dashboard_snapshot", dashboard_snapshot)
+dashboard_version = Snapshot(lambda: analytics_db.data_version(DASHBOARD_TABLES), ttl=DATA_VERSION_TTL_SEC, max_stale=0)
+_dashboard_version = None
+
+
 @router.get("/stats/dashboard")
 async def get_dashboard_stats():
-    if not db: return {"error": "DB Connection Failed"}
-    
-    # Using SQL directly for speed aggregation
-    # 1. Total Revenue
-    rev = db.run("SELECT SUM(amount) FROM transactions WHERE status = 'Success';")
-    total_revenue = eval(rev)[0][0] or 0
+    global _dashboard_version
+    if not analytics_db: return {"error": "DB Connection Failed"}
+    version = await dashboard_version.get()
+    if version != _dashboard_version:
+        if _dashboard_version is not None: dashboard_snapshot.invalidate()
+        _dashboard_version = version
+    return await dashboard_snapshot.get()
 
-    # 2. Active Agents
-    agents_res = db.run("SELECT COUNT(DISTINCT agent_id) FROM interactions WHERE outcome = 'Converted';")
-    active_agents = eval(agents_res)[0][0] or 0
+# =================================================================
+# 📄 REPORTS (Server-side KPIs, worker-built, cached by data version)
+# =================================================================
 
-    # 3. Conversion Rate
-    rate_res = db.run("SELECT (COUNT(*) FILTER (WHERE outcome = 'Converted') * 100.0 / COUNT(*)) FROM interactions;")
-    win_rate = eval(rate_res)[0][0] or 0
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "1"))
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "sipbrain_reports"))
+REPORT_TABLES = ("transactions", "agents", "investors", "interactions", "ai_dispatch_logs")
 
-    # 4. Chart Data
-    chart_res = eval(db.run("SELECT to_char(transaction_date, 'Mon DD'), SUM(amount) FROM transactions WHERE status = 'Success' GROUP BY transaction_date ORDER BY transaction_date DESC LIMIT 7;"))
-    chart_data = [{"name": row[0], "uv": row[1]} for row in chart_res][::-1]
+REPORT_KPIS = text(
+    "SELECT (SELECT SUM(amount) FROM transactions WHERE status = 'Success') AS revenue, (SELECT COUNT(*) FROM agents) AS agents"
+).columns(revenue=Float, agents=Integer)
+AGENT_BREAKDOWN = text(
+    "WITH leads AS (SELECT assigned_agent_id AS agent_id, COUNT(*) AS n FROM investors WHERE assigned_agent_id IS NOT NULL GROUP BY assigned_agent_id), "
+    "conversions AS (SELECT agent_id, COUNT(*) AS n FROM interactions WHERE outcome = 'Converted' GROUP BY agent_id), "
+    "revenue AS (SELECT investors.assigned_agent_id AS agent_id, SUM(transactions.amount) AS total FROM transactions "
+    "JOIN investors ON transactions.investor_id = investors.investor_id WHERE transactions.status = 'Success' GROUP BY investors.assigned_agent_id) "
+    "SELECT agents.name, COALESCE(leads.n, 0) AS leads, COALESCE(conversions.n, 0) AS conversions, COALESCE(revenue.total, 0) AS revenue "
+    "FROM agents LEFT JOIN leads ON leads.agent_id = agents.agent_id LEFT JOIN conversions ON conversions.agent_id = agents.agent_id "
+    "LEFT JOIN revenue ON revenue.agent_id = agents.agent_id ORDER BY revenue DESC"
+).columns(name=String, leads=Integer, conversions=Integer, revenue=Float)
+DISPATCH_LOG_ALL = text(
+    "SELECT created_at, lead_name, assigned_agent, math_score, is_override, admin_corrected FROM ai_dispatch_logs ORDER BY created_at DESC"
+)
+
+_report_pool = None
+report_flight = SingleFlight()
+
+
+def report_pool() -> ProcessPoolExecutor:
+    global _report_pool
+    if _report_pool is None: # Spawned, not forked: this process has gRPC, DB pools and worker threads live
+        _report_pool = ProcessPoolExecutor(max_workers=REPORT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _report_pool
+
+
+def close_report_pool():
+    if _report_pool is not None: _report_pool.shutdown(cancel_futures=True)
+
+
+def _override_flag(log) -> str:
+    return "YES" if log.get('is_override') or log.get('admin_corrected') else "-"
+
+
+async def report_kpis(supabase):
+    if analytics_db:
+        row = (await analytics_db.fetch(REPORT_KPIS))[0]
+        return row.revenue or 0, row.agents or 0
+    # PostgREST only: exact count from a HEAD request; revenue still has to be summed here
+    agents_res, rev_rows = await asyncio.gather(
+        supabase.table('agents').select('agent_id', count='exact', head=True).execute(),
+        fetch_all(lambda: supabase.table('transactions').select('txn_id, amount').eq('status', 'Success'), 'txn_id'),
+    )
+    return sum(r['amount'] for r in rev_rows), agents_res.count or 0
+
+
+async def render_report(kind: str, fingerprint, build, load) -> str:
+    """
+    Path of the cached PDF for this data fingerprint; built once (in the worker process) on a miss.
+    `load` is only awaited on a miss, so a cache hit costs no data fetch.
+    """
+    path = os.path.join(REPORT_CACHE_DIR, f"{kind}-{fingerprint}.pdf")
+    if os.path.exists(path): return path
+
+    async def run():
+        args = await load()
+        os.makedirs(REPORT_CACHE_DIR, exist_ok=True)
+        with span("reportlab.build", report=kind):
+            await asyncio.get_running_loop().run_in_executor(report_pool(), build, path, *args)
+        # Older data versions: keep the previous one, a response may still be about to open it
+        older = sorted((p for p in glob.glob(os.path.join(REPORT_CACHE_DIR, f"{kind}-*.pdf")) if p != path), key=os.path.getmtime, reverse=True)
+        for old in older[1:]:
+            try:
+                os.remove(old)
+            except FileNotFoundError:
+                pass
+        return path
+
+    return await report_flight.do(path, run)
 
-    return {
-        "revenue": total_revenue,
-        "active_agents": active_agents,
-        "conversion_rate": round(float(win_rate), 1),
-        "chart_data": chart_data
-    }
 
 @router.get("/download-report")
-async def download_report():
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=18)
-    elements = []
-    styles = getSampleStyleSheet()
-
-    # Fetch Data using .table() (CORRECT SYNTAX)
-    rev_res = supabase.table('transactions').select('amount').eq('status', 'Success').execute()
-    total_revenue = sum(r['amount'] for r in rev_res.data)
-    
-    agent_count = len(supabase.table('agents').select('agent_id').execute().data)
-    
-    logs_res = supabase.table('ai_dispatch_logs').select('*').order('created_at', desc=True).limit(15).execute()
+async def download_report(full: bool = False):
+    """
+    ?full=1 adds the per-agent breakdown and the complete dispatch log (multi-page, needs SUPABASE_DB_URL).
+    """
+    supabase = await get_supabase()
 
-    # --- PDF GENERATION ---
-    elements.append(Paragraph("SIPBrain™ Executive Report", styles['Heading1']))
-    elements.append(Spacer(1, 12))
-    
-    # KPI Table
-    kpi_data = [['Total Revenue', 'Active Agents'], [f"Rs {total_revenue:,}", str(agent_count)]]
-    t = Table(kpi_data, colWidths=[200, 200])
-    t.setStyle(TableStyle([('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#f1f5f9")), ('ALIGN', (0, 0), (-1, -1), 'CENTER'), ('GRID', (0, 0), (-1, -1), 1, colors.HexColor("#e2e8f0"))]))
-    elements.append(t)
-    elements.append(Spacer(1, 20))
-
-    # Logs Table
-    elements.append(Paragraph("Recent AI Dispatch Decisions", styles['Heading2']))
-    log_data = [['Lead', 'Assigned To', 'Score', 'Override?']]
-    for log in logs_res.data:
-        override = "YES" if log.get('is_override') or log.get('admin_corrected') else "-"
-        log_data.append([log.get('lead_name'), log.get('assigned_agent'), str(log.get('math_score')), override])
-
-    t_logs = Table(log_data)
-    t_logs.setStyle(TableStyle([('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#0f172a")), ('TEXTCOLOR', (0, 0), (-1, 0), colors.white), ('GRID', (0, 0), (-1, -1), 1, colors.black)]))
-    elements.append(t_logs)
-
-    doc.build(elements)
-    buffer.seek(0)
-    return Response(content=buffer.getvalue(), media_type="application/pdf", headers={"Content-Disposition": "attachment; filename=SIPBrain_Report.pdf"})
\ No newline at end of file
+    async def load_summary():
+        (revenue, agent_count), logs_res = await asyncio.gather(
+            report_kpis(supabase),
+            supabase.table('ai_dispatch_logs').select('*').order('created_at', desc=True).limit(15).execute(),
+        )
+        logs = [[log.get('lead_name'), log.get('assigned_agent'), str(log.get('math_score')), _override_flag(log)] for log in logs_res.data]
+        return revenue, agent_count, logs
+
+    async def load_full():
+        (revenue, agent_count), agents, logs = await asyncio.gather(
+            report_kpis(supabase), analytics_db.fetch(AGENT_BREAKDOWN), analytics_db.fetch(DISPATCH_LOG_ALL),
+        )
+        agent_rows = [[row.name, row.leads, row.conversions, row.revenue] for row in agents]
+        log_rows = [[str(row.created_at or "")[:10], row.lead_name, row.assigned_agent, str(row.math_score), _override_flag(row._asdict())] for row in logs]
+        return revenue, agent_count, agent_rows, log_rows
+
+    if full:
+        if not analytics_db: raise HTTPException(status_code=503, detail="Full report needs a direct DB connection (SUPABASE_DB_URL)")
+        path = await render_report("full", await analytics_db.data_version(REPORT_TABLES), build_full_pdf, load_full)
+        filename = "SIPBrain_Full_Report.pdf"
+    elif analytics_db:
+        path = await render_report("summary", await analytics_db.data_version(REPORT_TABLES), build_summary_pdf, load_summary)
+        filename = "SIPBrain_Report.pdf"
+    else:
+        # No write counters to fingerprint with: hash the (small) inputs instead
+        inputs = await load_summary()
+        fingerprint = hashlib.sha1(json.dumps(inputs, default=str).encode()).hexdigest()[:16]
+        path = await render_report("summary", fingerprint, build_summary_pdf, lambda: asyncio.sleep(0, inputs))
+        filename = "SIPBrain_Report.pdf"
+
+    # Streamed from disk in chunks, never held whole in memory
+    return FileResponse(path, media_type="application/pdf", filename=filename)
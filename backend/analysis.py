@@ -0,0 +1,106 @@
+import os
+import json
+from fastapi import HTTPException
+from clients import get_supabase, gemini_json
+from cache import TTLCache, SingleFlight
+from metrics import ANALYSIS_LOOKUPS, register_cache
+from tracing import span
+from features import investor_with_features, history_features, recent_transactions, prompt_profile
+
+# =================================================================
+# 🕵️ DEEP DIVE ANALYSIS (Shared by the API and the pre-warm worker)
+# =================================================================
+
+# In-process layer in front of the `ai_analysis_cache` column. Entries carry the
+# lead's features, so the lead feed drops an entry when its features row changes.
+analysis_cache = TTLCache(
+    maxsize=int(os.getenv("ANALYSIS_CACHE_SIZE", "2048")),
+    ttl=float(os.getenv("ANALYSIS_CACHE_TTL", "600")),
+)
+analysis_flight = SingleFlight()
+register_cache("ai_analysis", analysis_cache)
+
+
+async def get_lead_analysis(investor_id: str, limiter=None):
+    """
+    Returns the deep-dive payload for a lead, coalescing concurrent builds.
+    """
+    cached = analysis_cache.get(investor_id)
+    if cached:
+        ANALYSIS_LOOKUPS.labels("memory").inc()
+        return cached
+    return await analysis_flight.do(investor_id, lambda: build_lead_analysis(investor_id, limiter))
+
+
+async def build_lead_analysis(investor_id: str, limiter=None):
+    supabase = await get_supabase()
+
+    # 1. Investor + its feature record in one lookup (recent transactions for the Deep Dive UI ride along)
+    lead = await investor_with_features(supabase, investor_id, history=False)
+    if not lead: raise HTTPException(status_code=404, detail="Lead not found")
+    features = lead.pop('features')
+
+    # 2. CHECK DB CACHE (Consistency Fix)
+    if lead.get('ai_analysis_cache'):
+        print(f"⚡ Returning Cached Analysis for {lead['name']}")
+        ANALYSIS_LOOKUPS.labels("db_column").inc()
+        result = {
+            "lead_details": lead,
+            # No features table: just the recent transactions, never a full history scan
+            "transactions": features['recent_transactions'] if features else await recent_transactions(supabase, investor_id),
+            "features": features,
+            "analysis": lead['ai_analysis_cache']
+        }
+        analysis_cache.set(investor_id, result)
+        return result
+
+    if features is None: features = await history_features(supabase, investor_id) # The prompt needs the record
+    transactions = features['recent_transactions']
+
+    # 3. GENERATE NEW ANALYSIS (If not cached)
+    prompt = f"""
+    Analyze Lead: {lead['name']} ({lead['occupation']}, Risk: {lead['risk_appetite']}, City: {lead['city']}).
+    History:
+    {prompt_profile(features)}
+    
+    Task:
+    1. Create a "Financial Persona" tag (e.g. "Cautious Saver").
+    2. Write a "Key Insight" (2 sentences max).
+    3. Recommend TOP 3 Products.
+       - Product 1 (The Winner): Best fit.
+       - Product 2 (Alternative): Safer option.
+       - Product 3 (Wildcard): Growth option.
+    4. Write a "Golden Opening Script" for Product 1.
+    
+    Output JSON:
+    {{
+        "personality_tag": "String",
+        "key_insight": "String",
+        "top_recommendations": [
+            {{ "name": "Fund Name", "type": "Equity/Debt", "reason": "Why?" }},
+            {{ "name": "Fund Name", "type": "Equity/Debt", "reason": "Why?" }},
+            {{ "name": "Fund Name", "type": "Equity/Debt", "reason": "Why?" }}
+        ],
+        "opening_pitch": "String"
+    }}
+    """
+    
+    try:
+        raw = await gemini_json(prompt, limiter=limiter)
+        with span("json.parse"): analysis = json.loads(raw)
+        ANALYSIS_LOOKUPS.labels("generated").inc()
+        
+        # 4. WRITE THROUGH (DB column + in-process cache)
+        await supabase.table("investors").update({"ai_analysis_cache": analysis}).eq("investor_id", investor_id).execute()
+        
+        result = {
+            "lead_details": {**lead, "ai_analysis_cache": analysis},
+            "transactions": transactions,
+            "features": features,
+            "analysis": analysis
+        }
+        analysis_cache.set(investor_id, result)
+        return result
+    except Exception as e:
+        print(f"Analysis Failed: {e}")
+        return {"error": "AI Service Unavailable"}
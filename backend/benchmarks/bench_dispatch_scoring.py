@@ -0,0 +1,120 @@
+"""
+Scaling benchmark: original per-pair scoring loop vs the vectorized matrix.
+
+Uses the synthetic agents.csv / investors.csv, replicating investors to reach
+each lead count. Both paths run the same greedy pass (workload updated after
+every pick) and must agree on every assignment.
+
+Also times the batch (capacity-constrained optimal) solver at the same sizes.
+
+Run from backend/:  python benchmarks/bench_dispatch_scoring.py
+"""
+import os
+import sys
+import csv
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from dispatch import AgentPool, StaticScores, initial_load, score_row, top_two, candidate, parse_languages, fair_capacity, optimal_assignment
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "synthtetic", "sipbrain_data")
+SIZES = [15, 1_000, 5_000, 20_000, 100_000]
+LEGACY_MAX = 20_000 # The original loop gets too slow to be worth waiting for past this
+
+
+def load_csv(name):
+    with open(os.path.join(DATA_DIR, name), encoding="utf-8") as f:
+        return list(csv.DictReader(f))
+
+
+def legacy_assign(leads, agents, workload):
+    """
+    The original trigger_assignment scoring loop, math decision only.
+    """
+    batch_workload = {}
+    picks = []
+    for lead in leads:
+        candidates = []
+        for agent in agents:
+            score = 60
+            strengths = []
+            agent_langs = parse_languages(agent.get('languages', []))
+            lead_lang = lead.get('preferred_language', 'English')
+            if lead_lang in agent_langs or 'English' in agent_langs:
+                score += 15
+                strengths.append(f"Speaks {lead_lang}")
+            else:
+                score -= 50
+            spec = agent.get('specialization')
+            if spec and spec in lead.get('occupation', ''):
+                score += 25
+                strengths.append(f"Expert in {spec}")
+            score += int((agent.get('performance_score', 0) or 0) * 5)
+            total_load = workload.get(agent['agent_id'], 0) + batch_workload.get(agent['agent_id'], 0)
+            score += -100 if total_load >= 4 else -(total_load * 15)
+            if total_load == 0:
+                score += 10
+                strengths.append("Available Now")
+            candidates.append({"id": agent['agent_id'], "name": agent['name'], "score": max(5, min(99, score)), "load": total_load, "context": ", ".join(strengths)})
+        candidates.sort(key=lambda x: x['score'], reverse=True)
+        top = candidates[0]
+        batch_workload[top['id']] = batch_workload.get(top['id'], 0) + 1
+        picks.append((top['id'], top['score']))
+    return picks
+
+
+def vectorized_assign(leads, agents, workload):
+    pool = AgentPool(agents)
+    static = StaticScores(leads, pool)
+    load = initial_load(pool, workload)
+    picks = []
+    for i in range(len(leads)):
+        row = score_row(static, i, load)
+        best, second = top_two(row)
+        top = candidate(pool, static, i, best, row, load)
+        candidate(pool, static, i, second, row, load)
+        load[best] += 1
+        picks.append((top['id'], top['score']))
+    return picks, static
+
+
+def main():
+    agents = load_csv("agents.csv")
+    for a in agents: a['performance_score'] = float(a['performance_score'] or 0)
+    investors = load_csv("investors.csv")
+    print(f"{len(agents)} agents, {len(investors)} base investors\n")
+    print(f"{'leads':>8} | {'legacy (s)':>10} | {'vector (s)':>10} | {'matrix only (ms)':>16} | {'speedup':>7} | agree")
+
+    for n in SIZES:
+        leads = (investors * (n // len(investors) + 1))[:n]
+
+        start = time.perf_counter()
+        picks, _ = vectorized_assign(leads, agents, {})
+        vec_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        StaticScores(leads, AgentPool(agents))
+        matrix_ms = (time.perf_counter() - start) * 1000
+
+        if n <= LEGACY_MAX:
+            start = time.perf_counter()
+            legacy = legacy_assign(leads, agents, {})
+            legacy_s = time.perf_counter() - start
+            print(f"{n:>8} | {legacy_s:>10.3f} | {vec_s:>10.3f} | {matrix_ms:>16.1f} | {legacy_s / vec_s:>6.1f}x | {legacy == picks}")
+        else:
+            print(f"{n:>8} | {'-':>10} | {vec_s:>10.3f} | {matrix_ms:>16.1f} | {'-':>7} | -")
+
+    print(f"\n{'leads':>8} | {'batch solve (s)':>15} | {'capacity':>8} | unassigned")
+    for n in SIZES:
+        leads = (investors * (n // len(investors) + 1))[:n]
+        start = time.perf_counter()
+        pool = AgentPool(agents)
+        static = StaticScores(leads, pool)
+        load = initial_load(pool, {})
+        capacity = fair_capacity(load, n)
+        picks = optimal_assignment(static, load, capacity)
+        print(f"{n:>8} | {time.perf_counter() - start:>15.3f} | {capacity:>8} | {int((picks < 0).sum())}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Offline benchmark for the local objection classifier.
+
+Leave-one-out over every "User Variation" in knowledge_base.md: each variation
+is classified by an index built without it. Neutral call chatter is
+used to measure how often the classifier fires when it should stay quiet.
+
+Run from backend/:  python benchmarks/bench_objections.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from objections import ObjectionClassifier, parse_knowledge_base
+
+NEUTRAL_UTTERANCES = [
+    "Hello, am I speaking with Mr. Sharma?",
+    "Haan ji, boliye, kaun bol raha hai?",
+    "Yes I can hear you now, sorry network issue tha.",
+    "Okay, aur batao, how is the weather in Pune?",
+    "Ek minute, main car chala raha hoon.",
+    "Thank you for calling, have a nice day.",
+    "Mera email id likh lo, rahul at gmail dot com.",
+    "Aap kaunse company se bol rahe ho?",
+    "Kal subah 10 baje call kar lena.",
+    "Theek hai, samajh gaya, aage bolo.",
+    "Sorry, can you repeat that last part?",
+    "Mera PAN card ready hai, KYC kaise hoga?",
+]
+THRESHOLDS = [0.10, 0.15, 0.20, 0.25, 0.30, 0.35, 0.40]
+
+
+def main():
+    concepts = parse_knowledge_base()
+    samples = [(ci, v) for ci, c in enumerate(concepts) for v in c['variations']]
+    print(f"{len(concepts)} concepts, {len(samples)} variations, {len(NEUTRAL_UTTERANCES)} neutral utterances\n")
+
+    # Leave-one-out predictions
+    loo = []
+    for i, (true_idx, text) in enumerate(samples):
+        held_out = [dict(c, variations=[v for v in c['variations'] if not (ci == true_idx and v == text)]) for ci, c in enumerate(concepts)]
+        pred_idx, score = ObjectionClassifier(held_out).predict(text)
+        loo.append((true_idx == pred_idx, score))
+
+    full = ObjectionClassifier(concepts)
+    neutral_scores = [full.predict(t)[1] for t in NEUTRAL_UTTERANCES]
+
+    top1 = sum(ok for ok, _ in loo) / len(loo)
+    print(f"Leave-one-out top-1 accuracy (no threshold): {top1:.1%}\n")
+    print(f"{'threshold':>9} | {'coverage':>8} | {'precision':>9} | {'neutral FP':>10}")
+    for th in THRESHOLDS:
+        fired = [ok for ok, score in loo if score >= th]
+        coverage = len(fired) / len(loo)
+        precision = sum(fired) / len(fired) if fired else 0.0
+        false_pos = sum(s >= th for s in neutral_scores) / len(neutral_scores)
+        print(f"{th:>9.2f} | {coverage:>8.1%} | {precision:>9.1%} | {false_pos:>10.1%}")
+
+    # Latency over every variation + neutral line
+    texts = [t for _, t in samples] + NEUTRAL_UTTERANCES
+    rounds = 20
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for t in texts: full.classify(t)
+    per_call = (time.perf_counter() - start) / (rounds * len(texts))
+    print(f"\nLatency: {per_call * 1e6:.0f} µs per utterance (index build + {rounds * len(texts)} calls)")
+
+
+if __name__ == "__main__":
+    main()
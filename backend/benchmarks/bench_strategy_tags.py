@@ -0,0 +1,110 @@
+"""
+Strategy-tag engine vs the original if/elif hook chain from get_my_leads.
+
+Uses the synthetic investors.csv (numeric columns cast the way Supabase returns
+them), replicated to reach each list size. The compiled rules in
+strategy_rules.json must pick the same tag as the original chain for every lead.
+The "legacy" column is that chain as it was: 4 tag checks and a constant
+score. The engine evaluates all 13 bundled rules (tags + match score) and is
+roughly 3x slower than it per call - most of its time goes to pulling columns
+out of the row dicts. The "hand-written" column is the same 13 rules as a
+per-row if/elif loop, the fair baseline for a rule set of this size. In the
+app the engine's output is cached per agent by the lead feed and re-run only
+for changed leads, not per request.
+
+Run from backend/:  python benchmarks/bench_strategy_tags.py
+"""
+import os
+import sys
+import csv
+import time
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+from strategy import StrategyEngine
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "synthtetic", "sipbrain_data")
+SIZES = [50, 1_000, 5_000, 20_000, 100_000]
+NUMERIC = ("age", "sip_capacity", "monthly_income_est")
+
+
+def load_investors():
+    with open(os.path.join(DATA_DIR, "investors.csv"), encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    for row in rows:
+        for col in NUMERIC: row[col] = int(row[col])
+    return rows
+
+
+def legacy_enrich(leads):
+    """
+    The original get_my_leads loop.
+    """
+    enriched = []
+    for lead in leads:
+        hook = "General Follow-up"
+        if lead['age'] > 50: hook = "🛡️ Capital Protection Strategy"
+        elif "Gig" in lead['occupation']: hook = "💧 High Liquidity Pitch"
+        elif "High" in lead['risk_appetite']: hook = "🚀 Small Cap Multiplier Pitch"
+        elif "Business" in lead['occupation']: hook = "💼 Tax Saver (Section 54EC)"
+        enriched.append({**lead, "ai_strategy_tag": hook, "match_score": 95})
+    return enriched
+
+
+def handwritten_enrich(leads):
+    """
+    The bundled strategy_rules.json as plain Python, one lead at a time.
+    """
+    today = datetime.date.today()
+    enriched = []
+    for lead in leads:
+        if lead['age'] > 50: hook, score = "🛡️ Capital Protection Strategy", 20
+        elif "Gig" in lead['occupation']: hook, score = "💧 High Liquidity Pitch", 15
+        elif "High" in lead['risk_appetite']: hook, score = "🚀 Small Cap Multiplier Pitch", 15
+        elif "Business" in lead['occupation']: hook, score = "💼 Tax Saver (Section 54EC)", 15
+        else: hook, score = "General Follow-up", 0
+        score += 35
+        if lead['sip_capacity'] >= 5000: score += 10
+        if lead['sip_capacity'] >= 15000: score += 10
+        if lead['monthly_income_est'] >= 100000: score += 10
+        try:
+            if (today - datetime.date.fromisoformat(lead['last_activity_date'][:10])).days <= 30: score += 15
+        except (TypeError, ValueError):
+            pass
+        if lead['tier'] == "Tier 1": score += 5
+        features = lead.get('features') or {}
+        if (features.get('sip_streak') or 0) >= 6: score += 10
+        if (features.get('failed_txn_ratio') or 0) >= 0.2: score -= 10
+        enriched.append({**lead, "ai_strategy_tag": hook, "match_score": max(5, min(99, score))})
+    return enriched
+
+
+def main():
+    investors = load_investors()
+    engine = StrategyEngine()
+    print(f"{len(engine.rules)} rules (v{engine.version}), {len(investors)} base investors\n")
+    print(f"{'leads':>8} | {'legacy (ms)':>11} | {'hand-written (ms)':>17} | {'engine (ms)':>11} | {'scores min/avg/max':>18} | tags agree | scores agree")
+    for n in SIZES:
+        leads = (investors * (n // len(investors) + 1))[:n]
+
+        start = time.perf_counter()
+        legacy = legacy_enrich(leads)
+        legacy_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        handwritten = handwritten_enrich(leads)
+        handwritten_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        enriched = engine.enrich(leads)
+        engine_ms = (time.perf_counter() - start) * 1000
+
+        scores = [lead['match_score'] for lead in enriched]
+        agree = all(a['ai_strategy_tag'] == b['ai_strategy_tag'] for a, b in zip(legacy, enriched))
+        scores_agree = all(a['match_score'] == b['match_score'] for a, b in zip(handwritten, enriched))
+        spread = f"{min(scores)}/{sum(scores) / n:.0f}/{max(scores)}"
+        print(f"{n:>8} | {legacy_ms:>11.2f} | {handwritten_ms:>17.2f} | {engine_ms:>11.2f} | {spread:>18} | {str(agree):>10} | {scores_agree}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import time
+import asyncio
+from collections import OrderedDict
+
+# =================================================================
+# ⚡ IN-PROCESS CACHES
+# =================================================================
+
+class TTLCache:
+    """
+    Bounded LRU cache with a per-entry time-to-live.
+    Tracks hits/misses so callers can report hit ratios.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None:
+            self.misses += 1
+            return default
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            self.misses += 1
+            return default
+
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key, value, ttl: float | None = None):
+        self._data[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self):
+        self._data.clear()
+
+    def __contains__(self, key):
+        item = self._data.get(key)
+        return item is not None and item[0] >= time.monotonic()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one in-flight task.
+    Late callers await the first caller's result instead of repeating the work;
+    the shared task is only cancelled once every caller has gone away.
+    """
+
+    def __init__(self):
+        self._inflight: dict = {}
+        self._waiters: dict = {}
+
+    def __contains__(self, key):
+        return key in self._inflight
+
+    def _forget(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            self._waiters.pop(key, None)
+
+    async def do(self, key, fn):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            self._waiters[key] = 0
+            task.add_done_callback(lambda t: self._forget(key, t))
+
+        self._waiters[key] += 1
+        try:
+            # Shield so one disconnecting caller doesn't cancel the shared work
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._inflight.get(key) is task:
+                self._waiters[key] -= 1
+                if self._waiters[key] <= 0 and not task.done(): task.cancel()
+            raise
+
+
+class Snapshot:
+    """
+    One cached value with stale-while-revalidate: fresh for `ttl` seconds, then
+    served as-is for up to `max_stale` more while a single background refresh runs.
+    Only a cold (or too stale) snapshot makes the caller wait.
+    """
+
+    def __init__(self, fetch, ttl: float = 15, max_stale: float = 300):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self._value = None
+        self._fetched_at = None
+        self._refresh: asyncio.Future | None = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    async def _load(self):
+        value = await self.fetch()
+        self._value, self._fetched_at = value, time.monotonic()
+        return value
+
+    def _start_refresh(self) -> asyncio.Future:
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.ensure_future(self._load())
+            self._refresh.add_done_callback(self._log_failure)
+        return self._refresh
+
+    @staticmethod
+    def _log_failure(task):
+        if not task.cancelled() and task.exception(): print(f"Snapshot refresh failed: {task.exception()}")
+
+    async def get(self):
+        age = None if self._fetched_at is None else time.monotonic() - self._fetched_at
+        if age is not None and age < self.ttl:
+            self.hits += 1
+            return self._value
+        if age is not None and age < self.ttl + self.max_stale:
+            self.stale_hits += 1
+            self._start_refresh()
+            return self._value
+        self.misses += 1
+        return await asyncio.shield(self._start_refresh())
+
+    def invalidate(self):
+        """
+        Marks the value stale; the next get() still answers instantly and triggers a refresh.
+        """
+        if self._fetched_at is not None: self._fetched_at = min(self._fetched_at, time.monotonic() - self.ttl)
+
+    def stats(self) -> dict:
+        served = self.hits + self.stale_hits
+        total = served + self.misses
+        return {
+            "size": int(self._fetched_at is not None),
+            "hits": served,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "hit_ratio": round(served / total, 4) if total else 0.0,
+            "age_sec": round(time.monotonic() - self._fetched_at, 1) if self._fetched_at is not None else None,
+        }
@@ -0,0 +1,92 @@
+import re
+
+# =================================================================
+# 🧭 ADMIN CHAT INTENT ROUTER (Common questions -> fixed SQL)
+# =================================================================
+# A question routes to an intent only if it hits every required keyword group
+# and has no content word outside that intent's vocabulary. "Who are the top
+# 3 agents?" routes; "top agents in Pune by revenue" goes to the SQL agent.
+# One number in the question becomes the intent's parameter (top N, last N days).
+
+FILLER = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "who", "what", "whats", "which", "how", "much", "many",
+    "show", "me", "give", "get", "list", "tell", "us", "our", "my", "we", "i", "you", "please", "can", "could",
+    "want", "to", "see", "of", "for", "in", "by", "with", "and", "do", "did", "does", "have", "has", "so", "far",
+    "make", "made", "display", "as", "from", "all", "it", "this", "that",
+}
+# Not filler: time words ("today", "now", ...) scope a question, so they send it to the
+# SQL agent; chart words ask for a chart, which only revenue_trend draws.
+CHART = {"chart", "graph", "plot", "visualize", "visualise"}
+
+
+class Intent:
+    def __init__(self, name: str, required: list, vocabulary: set, param: str | None = None,
+                 default: int | None = None, bounds: tuple = (1, 365)):
+        self.name = name
+        self.required = required
+        self.vocabulary = vocabulary | set().union(*required)
+        self.param = param
+        self.default = default
+        self.bounds = bounds
+
+    def match(self, words: list, numbers: list):
+        if not all(group & set(words) for group in self.required): return None
+        if any(w not in self.vocabulary for w in words): return None
+        if numbers and (self.param is None or len(numbers) > 1): return None
+        if self.param is None: return {}
+        value = numbers[0] if numbers else self.default
+        return {self.param: max(self.bounds[0], min(self.bounds[1], value))}
+
+
+REVENUE = {"revenue", "sales", "collections", "inflow", "inflows", "aum"}
+TOP = {"top", "best", "leading", "highest", "star"}
+AGENTS = {"agent", "agents", "performer", "performers", "rm", "rms"}
+
+INTENTS = [
+    Intent("revenue_trend", [{"trend", "trends", "growth", "daily", "timeline", "history", "time"} | CHART, REVENUE],
+           CHART | {"over", "last", "past", "recent", "per", "day", "days", "successful", "transactions", "total", "area", "line"},
+           param="days", default=14),
+    # "Best agent" means revenue unless conversions are asked for (SCHEMA_HINTS rule 2)
+    Intent("top_agents_conversions", [TOP, AGENTS, {"converting", "conversions", "converted", "conversion", "closers", "wins"}],
+           {"performing", "count", "number", "ranking", "rank", "most"},
+           param="limit", default=5, bounds=(1, 50)),
+    Intent("top_agents_revenue", [TOP, AGENTS],
+           REVENUE | {"performing", "ranking", "rank", "earning", "earners", "most"},
+           param="limit", default=5, bounds=(1, 50)),
+    Intent("risk_breakdown", [{"breakdown", "distribution", "share", "split", "mix"}, {"risk", "appetite"}],
+           {"investors", "investor", "clients", "leads", "customers", "profile", "profiles", "wise", "across"}),
+    Intent("occupation_breakdown", [{"breakdown", "distribution", "share", "split", "mix"}, {"occupation", "occupations", "job", "jobs", "profession", "professions"}],
+           {"investors", "investor", "clients", "leads", "customers", "wise", "across"}),
+    Intent("total_revenue", [REVENUE],
+           {"total", "overall", "till", "date", "successful", "transactions", "lifetime", "generated", "earned"}),
+    Intent("conversion_rate", [{"conversion", "win"}, {"rate", "ratio", "percentage", "percent"}],
+           {"overall", "interactions", "calls", "our"}),
+]
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(question: str) -> list:
+    words = _WORD_RE.findall(question.lower().replace("'", "").replace("’", ""))
+    return [w for w in words if w not in FILLER]
+
+
+def normalize_question(question: str) -> str:
+    """
+    Cache key: case, punctuation and filler words folded away (time and chart words are kept).
+    """
+    return " ".join(_tokens(question))
+
+
+def route_question(question: str):
+    """
+    (intent name, params) for a known question family, else None.
+    """
+    tokens = _tokens(question)
+    words = [w for w in tokens if not w.isdigit()]
+    numbers = [int(w) for w in tokens if w.isdigit()]
+    if not words: return None
+    for intent in INTENTS:
+        params = intent.match(words, numbers)
+        if params is not None: return intent.name, params
+    return None
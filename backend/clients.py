@@ -0,0 +1,119 @@
+import os
+import time
+import asyncio
+import httpx
+from supabase import acreate_client, AsyncClient, AsyncClientOptions
+from groq import AsyncGroq
+import google.generativeai as genai
+from dotenv import load_dotenv
+from metrics import SUPABASE_EVENT_HOOKS, track_llm
+from tracing import TRACE_EVENT_HOOKS
+
+load_dotenv()
+
+# =================================================================
+# 🔌 SHARED ASYNC CLIENTS (One pool per worker)
+# =================================================================
+# Every handler in main.py and admin.py awaits these instead of calling
+# the blocking SDKs, so one slow Gemini call no longer freezes the loop.
+
+url = os.getenv("SUPABASE_URL") or os.getenv("VITE_SUPABASE_URL")
+key = os.getenv("SUPABASE_KEY") or os.getenv("VITE_SUPABASE_ANON_KEY")
+
+POOL_LIMITS = httpx.Limits(
+    max_connections=int(os.getenv("HTTP_POOL_MAX", "200")),
+    max_keepalive_connections=int(os.getenv("HTTP_POOL_KEEPALIVE", "50")),
+)
+HTTP_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+
+# Separate pools so a burst of LLM traffic can't starve DB calls (and vice versa)
+supabase_http = httpx.AsyncClient(
+    limits=POOL_LIMITS, timeout=HTTP_TIMEOUT,
+    event_hooks={
+        "request": SUPABASE_EVENT_HOOKS["request"] + TRACE_EVENT_HOOKS["request"],
+        "response": SUPABASE_EVENT_HOOKS["response"] + TRACE_EVENT_HOOKS["response"],
+    },
+)
+llm_http = httpx.AsyncClient(limits=POOL_LIMITS, timeout=HTTP_TIMEOUT)
+
+groq_client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"), http_client=llm_http)
+
+GEMINI_MODEL = 'gemini-2.5-flash'
+genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+gemini_model = genai.GenerativeModel(GEMINI_MODEL)
+
+_supabase: AsyncClient | None = None
+_supabase_lock = asyncio.Lock()
+
+
+async def get_supabase() -> AsyncClient:
+    """
+    Returns the shared async Supabase client (created lazily on first use).
+    """
+    global _supabase
+    if _supabase is None:
+        async with _supabase_lock:
+            if _supabase is None:
+                _supabase = await acreate_client(url, key, options=AsyncClientOptions(httpx_client=supabase_http))
+    return _supabase
+
+
+SUPABASE_PAGE_SIZE = 1000 # PostgREST's default max-rows
+
+
+async def fetch_all(make_query, key: str, page: int = SUPABASE_PAGE_SIZE) -> list:
+    """
+    Pages through a select past PostgREST's row cap, by keyset on `key` (a unique
+    column the select must return), so pages can't overlap or skip rows the way
+    unordered offset pages can.
+    `make_query` returns a fresh builder each time, e.g. lambda: supabase.table("agents").select("*").
+    """
+    rows, last = [], None
+    while True:
+        query = make_query().order(key).limit(page)
+        if last is not None: query = query.gt(key, last)
+        batch = (await query.execute()).data
+        rows.extend(batch)
+        if len(batch) < page: return rows
+        last = batch[-1][key]
+
+
+class RateLimiter:
+    """
+    Async token bucket: allows `rate` calls per `per` seconds with bursts up to `rate`.
+    """
+
+    def __init__(self, rate: float, per: float = 60.0):
+        self.rate = rate
+        self.per = per
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.per)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.per / self.rate)
+
+
+async def gemini_json(prompt: str, limiter: RateLimiter | None = None):
+    """
+    Non-blocking Gemini call that returns the raw JSON text.
+    """
+    if limiter: await limiter.acquire()
+    async with track_llm("gemini", GEMINI_MODEL) as call:
+        res = await gemini_model.generate_content_async(prompt, generation_config={"response_mime_type": "application/json"})
+        usage = getattr(res, "usage_metadata", None)
+        if usage: call.tokens(usage.prompt_token_count, usage.candidates_token_count)
+    return res.text
+
+
+async def close_clients():
+    await supabase_http.aclose()
+    await llm_http.aclose()
@@ -0,0 +1,356 @@
+import os
+import re
+import json
+import time
+import uuid
+import asyncio
+from collections import Counter, deque
+from clients import groq_client
+from cache import TTLCache, SingleFlight
+from metrics import track_llm, register_cache
+from triggers import trigger_engine
+from objections import objection_classifier
+
+# =================================================================
+# ⚡ COCKPIT LLM LAYER (Groq + normalized-utterance cache)
+# =================================================================
+
+SYSTEM_PROMPT = """
+Analyze the text. Return JSON:
+{ "type": "objection" | "fact" | "none", "title": "...", "content": "...", "data": {} }
+"""
+COCKPIT_MODEL = "meta-llama/llama-4-maverick-17b-128e-instruct"
+
+# Spelling variants agents' speech-to-text produces for the same Hinglish word. Only spellings that
+# can't be an English word or a different Hindi word (not he, me, thick, mein = "in", yaa = "or");
+# FILLERS likewise leaves out words that change meaning (to, so, like, haan)
+TRANSLITERATIONS = {
+    "hain": "hai", "h": "hai",
+    "nahin": "nahi", "nai": "nahi", "nhi": "nahi", "nahee": "nahi",
+    "kia": "kya", "kyaa": "kya",
+    "bohot": "bahut", "bahot": "bahut", "bohut": "bahut", "bhot": "bahut",
+    "acha": "accha", "achha": "accha", "acchha": "accha",
+    "theek": "thik", "tik": "thik",
+    "paise": "paisa", "pesa": "paisa", "paisaa": "paisa",
+    "yar": "yaar",
+    "krna": "karna", "karni": "karna",
+    "mai": "main",
+    "abhie": "abhi", "abi": "abhi",
+    "puchna": "poochna", "puchhna": "poochna",
+    "mkt": "market", "mrkt": "market",
+    "mf": "mutual fund", "mfs": "mutual fund", "funds": "fund",
+}
+FILLERS = {"umm", "um", "uh", "hmm", "ji", "sir", "madam", "maam", "yaar", "toh", "basically", "actually"}
+
+utterance_cache = TTLCache(
+    maxsize=int(os.getenv("UTTERANCE_CACHE_SIZE", "5000")),
+    ttl=float(os.getenv("UTTERANCE_CACHE_TTL", "3600")),
+)
+utterance_flight = SingleFlight()
+register_cache("cockpit_utterance", utterance_cache)
+
+
+def normalize_utterance(text: str) -> str:
+    """
+    Canonical cache key: case, punctuation, whitespace, fillers and transliteration folded.
+    """
+    words = re.sub(r"[^a-z0-9₹%\s]", " ", text.lower()).split()
+    words = [TRANSLITERATIONS.get(w, w) for w in words]
+    return " ".join(w for w in words if w not in FILLERS)
+
+
+async def _ask_groq(text: str) -> dict:
+    async with track_llm("groq", COCKPIT_MODEL) as call:
+        completion = await groq_client.chat.completions.create(
+            messages=[{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": text}],
+            model=COCKPIT_MODEL,
+            response_format={"type": "json_object"}
+        )
+        if completion.usage: call.tokens(completion.usage.prompt_tokens, completion.usage.completion_tokens)
+    return json.loads(completion.choices[0].message.content)
+
+
+async def llm_card(text: str) -> dict:
+    """
+    Returns the LLM's card for an utterance, shared across every socket.
+    "none" answers are cached too, so small talk isn't re-sent either.
+    """
+    key = normalize_utterance(text)
+    cached = utterance_cache.get(key)
+    if cached is not None: return cached
+
+    async def fetch():
+        ai_resp = await _ask_groq(text)
+        utterance_cache.set(key, ai_resp)
+        return ai_resp
+
+    return await utterance_flight.do(key, fetch)
+
+
+_FIELD_RE = {f: re.compile(r'"%s"\s*:\s*"((?:[^"\\]|\\.)*)"' % f) for f in ("type", "title")}
+_CONTENT_START_RE = re.compile(r'"content"\s*:\s*"')
+_STRING_BODY_RE = re.compile(r'(?:[^"\\]|\\.)*')
+_HALF_ESCAPE_RE = re.compile(r'\\u[0-9a-fA-F]{0,3}$')
+
+
+def _partial_string(raw: str) -> str:
+    """
+    Decodes a JSON string body that may be cut off mid-token.
+    """
+    body = _STRING_BODY_RE.match(raw).group(0)
+    body = _HALF_ESCAPE_RE.sub("", body) # Drop a half-received \uXXXX escape
+    try:
+        return json.loads(f'"{body}"')
+    except ValueError:
+        return body
+
+
+def parse_partial_card(buffer: str) -> dict:
+    """
+    Pulls whatever card fields are already readable out of an incomplete JSON completion.
+    """
+    fields = {}
+    for name, pattern in _FIELD_RE.items():
+        m = pattern.search(buffer)
+        if m: fields[name] = json.loads(f'"{m.group(1)}"')
+    m = _CONTENT_START_RE.search(buffer)
+    if m: fields["content"] = _partial_string(buffer[m.end():])
+    return fields
+
+
+_partial_listeners = {} # normalized utterance -> on_partial callbacks of streaming callers
+
+
+async def _stream_groq(key: str, text: str) -> dict:
+    buffer = ""
+    async with track_llm("groq", COCKPIT_MODEL) as call:
+        stream = await groq_client.chat.completions.create(
+            messages=[{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": text}],
+            model=COCKPIT_MODEL,
+            response_format={"type": "json_object"},
+            stream=True
+        )
+        async with stream: # Releases the pooled connection on cancel / error, not only when fully read
+            async for chunk in stream:
+                usage = getattr(getattr(chunk, "x_groq", None), "usage", None) # Sent on the last chunk
+                if usage: call.tokens(usage.prompt_tokens, usage.completion_tokens)
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta: continue
+                buffer += delta
+                fields = parse_partial_card(buffer)
+                for listener in list(_partial_listeners.get(key, ())): await listener(fields)
+
+    ai_resp = json.loads(buffer)
+    utterance_cache.set(key, ai_resp)
+    return ai_resp
+
+
+async def stream_llm_card(text: str, on_partial) -> dict:
+    """
+    Like llm_card, but streams tokens and calls `on_partial(fields)` as the
+    card's type/title and then content become readable. Concurrent identical
+    utterances share one streamed completion; each caller gets the partials
+    from the moment it joins.
+    """
+    key = normalize_utterance(text)
+    cached = utterance_cache.get(key)
+    if cached is not None: return cached
+
+    listeners = _partial_listeners.setdefault(key, set())
+    listeners.add(on_partial)
+    try:
+        return await utterance_flight.do(key, lambda: _stream_groq(key, text))
+    finally:
+        listeners.discard(on_partial) # A cancelled caller gets no more partials
+        if not listeners and _partial_listeners.get(key) is listeners: del _partial_listeners[key]
+
+
+# =================================================================
+# 🎙️ PER-CONNECTION PIPELINE (receive | debounce -> infer | send)
+# =================================================================
+# Receiving never waits on the LLM. Fragments that need the LLM are debounced
+# and coalesced; a newer batch cancels a stale in-flight completion and folds
+# its text in. Cards leave through a small bounded outbox so a slow client
+# drops stale frames instead of queueing them forever: a queued delta is
+# updated in place, and when full, deltas go first, then the oldest whole
+# card - never a start / cancel / final frame of a streamed card.
+#
+# Streaming clients (/ws/cockpit?stream=1) also get partial frames, keyed by
+# the card id, before the usual final card:
+#   {"id", "stream": "start", "type", "title"}
+#   {"id", "stream": "delta", "content"}    <- full content so far, safe to drop
+#   {"id", "stream": "cancel"}              <- answer went stale, remove it
+# Non-streaming clients never see partial frames, only the final card.
+
+DEBOUNCE_SEC = float(os.getenv("COCKPIT_DEBOUNCE_MS", "300")) / 1000
+MAX_WAIT_SEC = float(os.getenv("COCKPIT_MAX_WAIT_MS", "1200")) / 1000
+MAX_CONTEXT_CHARS = 600
+OUTBOX_SIZE = 8
+MIN_LLM_CHARS = 15
+DELTA_INTERVAL_SEC = 0.05
+
+pipeline_stats = Counter()
+
+
+def fast_card(text: str):
+    """
+    Sub-millisecond local answers (rules, then knowledge-base classifier).
+    """
+    card = trigger_engine.match(text)
+    if card: return card
+    return objection_classifier.classify(text) if objection_classifier else None
+
+
+def new_card_id() -> str:
+    return uuid.uuid4().hex
+
+
+class CockpitSession:
+    def __init__(self, websocket, stream: bool = False):
+        self.ws = websocket
+        self.stream = stream
+        self.outbox = deque()
+        self.outbox_ready = asyncio.Event()
+        self.streamed = set() # ids whose start frame is queued or sent; their final frame must go out
+        self.pending = []
+        self.new_text = asyncio.Event()
+        self.first_pending_at = None
+        self.last_pending_at = None
+        self.inflight: asyncio.Task | None = None
+        self.inflight_fragments = []
+        self.inflight_started = 0.0
+
+    async def run(self):
+        tasks = [asyncio.create_task(coro) for coro in (self._receive(), self._infer(), self._send())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done: task.result() # Re-raise disconnects / errors
+        finally:
+            for task in tasks: task.cancel()
+            if self.inflight: self.inflight.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def push(self, card: dict, card_id: str | None = None):
+        frame = {"id": card_id or new_card_id(), **card}
+        if frame.get("stream") == "delta":
+            for queued in self.outbox: # Deltas carry the full content so far: refresh the waiting one
+                if queued["id"] == frame["id"] and queued.get("stream") == "delta":
+                    queued["content"] = frame["content"]
+                    pipeline_stats["deltas_merged"] += 1
+                    return
+        if frame.get("stream") == "start": self.streamed.add(frame["id"])
+        if len(self.outbox) >= OUTBOX_SIZE and not self._shed(frame): return
+        self.outbox.append(frame)
+        self.outbox_ready.set()
+
+    def _shed(self, frame: dict) -> bool:
+        """
+        Backpressure. Makes room by dropping a delta (the final frame has the full text),
+        else the oldest whole card. Returns False if the new frame itself is dropped.
+        """
+        pipeline_stats["cards_dropped"] += 1
+        if frame.get("stream") == "delta": return False
+        for droppable in (lambda f: f.get("stream") == "delta", lambda f: "stream" not in f and f["id"] not in self.streamed):
+            victim = next((f for f in self.outbox if droppable(f)), None)
+            if victim is not None:
+                self.outbox.remove(victim)
+                return True
+        return True # Only start / cancel frames queued: go over the bound rather than orphan a card
+
+    async def _receive(self):
+        while True:
+            text = await self.ws.receive_text()
+            pipeline_stats["fragments"] += 1
+
+            card = fast_card(text)
+            if card:
+                self.push(card)
+                continue
+
+            now = time.monotonic()
+            self.pending.append(text)
+            self.first_pending_at = self.first_pending_at or now
+            self.last_pending_at = now
+            self.new_text.set()
+
+    async def _debounce(self):
+        """
+        Waits until speech pauses for DEBOUNCE_SEC, or MAX_WAIT_SEC after the first pending fragment.
+        """
+        while True:
+            self.new_text.clear()
+            now = time.monotonic()
+            deadline = min(self.last_pending_at + DEBOUNCE_SEC, self.first_pending_at + MAX_WAIT_SEC)
+            if now >= deadline: return
+            try:
+                await asyncio.wait_for(self.new_text.wait(), timeout=deadline - now)
+            except asyncio.TimeoutError:
+                return
+
+    async def _infer(self):
+        while True:
+            await self.new_text.wait()
+            await self._debounce()
+
+            fragments, self.pending = self.pending, []
+            self.first_pending_at = self.last_pending_at = None
+            pipeline_stats["coalesced"] += max(0, len(fragments) - 1)
+
+            if self.inflight and not self.inflight.done():
+                if time.monotonic() - self.inflight_started < MAX_WAIT_SEC:
+                    # Newer text makes the running answer stale: cancel and fold it in
+                    self.inflight.cancel()
+                    pipeline_stats["cancelled"] += 1
+                    fragments = self.inflight_fragments + fragments
+                else:
+                    # Nearly done; let it land so continuous speech can't starve the deck
+                    await asyncio.wait({self.inflight})
+
+            text = " ".join(fragments)[-MAX_CONTEXT_CHARS:]
+            if len(text) <= MIN_LLM_CHARS: continue
+
+            self.inflight_fragments = fragments
+            self.inflight_started = time.monotonic()
+            self.inflight = asyncio.create_task(self._complete(text))
+
+    async def _complete(self, text: str):
+        card_id = new_card_id()
+        started = False
+        last_delta = 0.0
+        sent_content = ""
+
+        async def on_partial(fields):
+            nonlocal started, last_delta, sent_content
+            if not started:
+                if fields.get('type') in (None, 'none') or 'title' not in fields: return
+                self.push({"stream": "start", "type": fields['type'], "title": fields['title']}, card_id)
+                started = True
+                pipeline_stats["streamed_cards"] += 1
+            content = fields.get('content', "")
+            now = time.monotonic()
+            if content != sent_content and now - last_delta >= DELTA_INTERVAL_SEC:
+                self.push({"stream": "delta", "content": content}, card_id)
+                sent_content, last_delta = content, now
+
+        try:
+            if self.stream: ai_resp = await stream_llm_card(text, on_partial)
+            else: ai_resp = await llm_card(text)
+        except asyncio.CancelledError:
+            if started: self.push({"stream": "cancel"}, card_id)
+            raise
+        except Exception as e:
+            print(f"Cockpit LLM Error: {e}")
+            if started: self.push({"stream": "cancel"}, card_id)
+            return
+        pipeline_stats["llm_cards"] += 1
+        # Final frame keeps the original card shape
+        if ai_resp.get('type') != 'none': self.push(ai_resp, card_id)
+        elif started: self.push({"stream": "cancel"}, card_id)
+
+    async def _send(self):
+        while True:
+            await self.outbox_ready.wait()
+            card = self.outbox.popleft()
+            if not self.outbox: self.outbox_ready.clear()
+            if card.get("stream") in (None, "cancel"): self.streamed.discard(card["id"])
+            await self.ws.send_json(card)
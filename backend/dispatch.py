@@ -0,0 +1,208 @@
+import os
+import json
+import numpy as np
+from scipy import sparse
+from scipy.optimize import milp, LinearConstraint, Bounds
+
+# =================================================================
+# 🧮 DISPATCH SCORING (Vectorized lead x agent matrix)
+# =================================================================
+# Same rules as the original per-pair loop, computed column-wise:
+#   base 60 | language +15 / -50 | specialization +25 | performance +int(5x)
+#   workload: >=4 leads -100, else -15 per lead, +10 if idle | clamp 5..99
+# Agent attributes are encoded once per run; everything that doesn't depend
+# on workload is one [leads x agents] int matrix.
+
+BASE_SCORE = 60
+LANG_MATCH, LANG_MISMATCH = 15, -50
+SPECIALIZATION_BONUS = 25
+PERF_WEIGHT = 5
+BURNOUT_LOAD, BURNOUT_PENALTY = 4, -100
+LOAD_PENALTY = 15
+IDLE_BONUS = 10
+SCORE_MIN, SCORE_MAX = 5, 99
+
+
+def parse_languages(raw) -> list:
+    if isinstance(raw, str):
+        try: return json.loads(raw.replace("'", '"'))
+        except ValueError: return []
+    return raw or []
+
+
+class AgentPool:
+    """
+    Agents pre-encoded as arrays: language membership matrix, performance bonus, specialization.
+    """
+
+    def __init__(self, agents: list):
+        self.agents = agents
+        self.ids = [a['agent_id'] for a in agents]
+        self.names = [a['name'] for a in agents]
+        self.index = {aid: j for j, aid in enumerate(self.ids)}
+        self.specializations = [a.get('specialization') or "" for a in agents]
+
+        langs = [set(parse_languages(a.get('languages', []))) for a in agents]
+        self.lang_vocab = {lang: k for k, lang in enumerate(sorted(set().union(*langs)))} if langs else {}
+        self.lang_matrix = np.zeros((max(len(self.lang_vocab), 1), len(agents)), dtype=bool)
+        for j, agent_langs in enumerate(langs):
+            for lang in agent_langs: self.lang_matrix[self.lang_vocab[lang], j] = True
+        # English is the universal fallback
+        self.speaks_english = self.lang_matrix[self.lang_vocab['English']] if 'English' in self.lang_vocab else np.zeros(len(agents), dtype=bool)
+
+        perf = np.array([a.get('performance_score', 0) or 0 for a in agents], dtype=float)
+        self.perf_bonus = np.trunc(perf * PERF_WEIGHT).astype(np.int32)
+
+    def __len__(self):
+        return len(self.agents)
+
+
+class StaticScores:
+    """
+    Workload-independent part of the score for every (lead, agent) pair.
+    """
+
+    def __init__(self, leads: list, pool: AgentPool):
+        n_agents = len(pool)
+
+        # Language: look each lead's language up as a row of the agent membership matrix
+        lead_langs = [lead.get('preferred_language', 'English') for lead in leads]
+        lang_idx = np.array([pool.lang_vocab.get(lang, -1) for lang in lead_langs], dtype=np.int64)
+        known = lang_idx >= 0
+        lang_ok = np.zeros((len(leads), n_agents), dtype=bool)
+        lang_ok[known] = pool.lang_matrix[lang_idx[known]]
+        self.lang_ok = lang_ok | pool.speaks_english
+
+        # Specialization: substring test per unique occupation, then broadcast to leads
+        occupations = [lead.get('occupation', '') or '' for lead in leads]
+        uniques, occ_idx = np.unique(np.array(occupations, dtype=object), return_inverse=True)
+        spec_table = np.array([[bool(spec) and spec in occ for spec in pool.specializations] for occ in uniques], dtype=bool).reshape(len(uniques), n_agents)
+        self.spec_ok = spec_table[occ_idx.reshape(-1)]
+
+        self.scores = (
+            BASE_SCORE
+            + np.where(self.lang_ok, LANG_MATCH, LANG_MISMATCH)
+            + np.where(self.spec_ok, SPECIALIZATION_BONUS, 0)
+            + pool.perf_bonus
+        ).astype(np.int32)
+        self.lead_langs = lead_langs
+
+
+def workload_adjustment(load: np.ndarray) -> np.ndarray:
+    """
+    Per-agent workload term for the current load vector.
+    """
+    adj = np.where(load >= BURNOUT_LOAD, BURNOUT_PENALTY, -LOAD_PENALTY * load)
+    return adj + np.where(load == 0, IDLE_BONUS, 0)
+
+
+def score_row(static: StaticScores, i: int, load: np.ndarray) -> np.ndarray:
+    return np.clip(static.scores[i] + workload_adjustment(load), SCORE_MIN, SCORE_MAX)
+
+
+def top_two(row: np.ndarray):
+    """
+    Best and runner-up agent index; ties keep agent order like the original stable sort.
+    """
+    if len(row) == 1: return 0, 0
+    order = np.argsort(-row, kind='stable')
+    return int(order[0]), int(order[1])
+
+
+def candidate(pool: AgentPool, static: StaticScores, i: int, j: int, row: np.ndarray, load: np.ndarray) -> dict:
+    """
+    The dict shape the LLM prompt and dispatch logs use, for one (lead, agent) pair.
+    """
+    strengths = []
+    if static.lang_ok[i, j]: strengths.append(f"Speaks {static.lead_langs[i]}")
+    if static.spec_ok[i, j]: strengths.append(f"Expert in {pool.specializations[j]}")
+    if load[j] == 0: strengths.append("Available Now")
+    return {
+        "id": pool.ids[j],
+        "name": pool.names[j],
+        "score": int(row[j]),
+        "load": int(load[j]),
+        "context": ", ".join(strengths),
+    }
+
+
+def initial_load(pool: AgentPool, workload: dict) -> np.ndarray:
+    return np.array([workload.get(aid, 0) for aid in pool.ids], dtype=np.int32)
+
+
+# =================================================================
+# 🧩 BATCH MODE (Capacity-constrained optimal assignment)
+# =================================================================
+# Solves the whole lead pool at once instead of greedily, lead by lead:
+#   maximise  sum of static scores of the chosen (lead, agent) pairs
+#   s.t.      each lead gets at most one agent
+#             each agent takes at most `capacity - current load` new leads
+#             no pair that fails the language rule (hard constraint, not -50)
+# Leads with the same score row are interchangeable, so the LP runs over
+# (lead group x agent) - a few hundred variables even for 100k leads. It is a
+# transportation problem (min-cost flow), so the optimum is integral.
+
+CAPACITY_SLACK = float(os.getenv("DISPATCH_CAPACITY_SLACK", "1.2"))
+UNASSIGNED_COST = 1000 # Worse than any real match, so only infeasible leads stay open
+
+
+def fair_capacity(load: np.ndarray, n_leads: int, slack: float = CAPACITY_SLACK) -> int:
+    """
+    Default per-agent cap: an even share of existing + new leads, plus some slack.
+    """
+    return int(np.ceil((int(load.sum()) + n_leads) / max(len(load), 1) * slack))
+
+
+def optimal_assignment(static: StaticScores, load: np.ndarray, capacity: int) -> np.ndarray:
+    """
+    Agent index per lead, -1 where no eligible agent had room.
+    """
+    n_leads, n_agents = static.scores.shape
+    if n_leads == 0 or n_agents == 0: return np.full(n_leads, -1, dtype=np.int64)
+
+    rows = np.where(static.lang_ok, static.scores, np.iinfo(np.int32).min)
+    groups, inverse, counts = np.unique(rows, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    n_groups = len(groups)
+    eligible = groups != np.iinfo(np.int32).min
+    room = np.maximum(capacity - load, 0)
+
+    # Variables: x[g, j] for every group/agent pair, then one "left open" slack per group
+    n_pairs = n_groups * n_agents
+    cost = np.concatenate([-groups.astype(float).ravel(), np.full(n_groups, UNASSIGNED_COST, dtype=float)])
+    upper = np.concatenate([np.where(eligible, counts[:, None], 0).ravel(), counts]).astype(float)
+
+    pair_group = np.repeat(np.arange(n_groups), n_agents)
+    pair_agent = np.tile(np.arange(n_agents), n_groups)
+    supply = sparse.csr_array((
+        np.ones(n_pairs + n_groups),
+        (np.concatenate([pair_group, np.arange(n_groups)]), np.arange(n_pairs + n_groups)),
+    ), shape=(n_groups, n_pairs + n_groups))
+    capacity_rows = sparse.csr_array((
+        np.ones(n_pairs), (pair_agent, np.arange(n_pairs)),
+    ), shape=(n_agents, n_pairs + n_groups))
+
+    res = milp(
+        cost,
+        constraints=[LinearConstraint(supply, counts, counts), LinearConstraint(capacity_rows, 0, room)],
+        bounds=Bounds(0, upper),
+        integrality=np.ones_like(cost),
+    )
+    if not res.success: raise RuntimeError(f"Dispatch solver failed: {res.message}")
+
+    flows = np.rint(res.x[:n_pairs]).astype(np.int64).reshape(n_groups, n_agents)
+    picks = np.full(n_leads, -1, dtype=np.int64)
+    order = np.argsort(inverse, kind='stable') # Leads laid out group by group
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    for g in range(n_groups):
+        chosen = np.repeat(np.arange(n_agents), flows[g])
+        picks[order[starts[g]:starts[g] + len(chosen)]] = chosen
+    return picks
+
+
+def ranked_pairs(static: StaticScores) -> np.ndarray:
+    """
+    [leads x 2] best and runner-up agent by static score, ties in agent order.
+    """
+    order = np.argsort(-static.scores, axis=1, kind='stable')
+    return order[:, :2] if order.shape[1] > 1 else np.repeat(order, 2, axis=1)
@@ -0,0 +1,45 @@
+import os
+import asyncio
+
+# =================================================================
+# 📣 DISPATCH FEED (Live dispatch decisions for the admin UI)
+# =================================================================
+# In-process fan-out: dispatch runs publish, /admin/dispatch-feed/stream
+# subscribers receive. Events:
+#   decision  - one lead decided (log entry + investor_id + run), before write-back
+#   committed - a run's write-back landed; fetch ?since=<latest_cursor> for the stored rows
+#   override  - an admin moved a logged lead to another agent
+# A slow subscriber loses its oldest events, not the newest; "committed"
+# followed by a since-fetch heals any gap.
+
+FEED_SUBSCRIBER_QUEUE = int(os.getenv("DISPATCH_FEED_QUEUE", "500"))
+
+
+class DispatchFeed:
+    def __init__(self, queue_size: int = FEED_SUBSCRIBER_QUEUE):
+        self.queue_size = queue_size
+        self.subscribers = set()
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self.subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+    def publish(self, event: str, data: dict):
+        self.published += 1
+        for queue in self.subscribers:
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait((event, data))
+
+    def stats(self) -> dict:
+        return {"subscribers": len(self.subscribers), "published": self.published, "dropped": self.dropped}
+
+
+dispatch_feed = DispatchFeed()
@@ -0,0 +1,178 @@
+import os
+import time
+import asyncio
+from collections import deque
+from clients import get_supabase, fetch_all
+from admin import dispatch_leads, get_workload
+from metrics import DISPATCH_LAG, DISPATCH_QUEUE_DEPTH, DISPATCH_ASSIGNED, DISPATCH_BATCH_SIZE
+
+# =================================================================
+# 🌊 STREAMING DISPATCHER (Leads assigned seconds after they land)
+# =================================================================
+# Off unless DISPATCH_STREAM=1. New investors arrive through a Supabase
+# Realtime INSERT subscription; a poll catches anything Realtime missed by
+# listing unassigned investor_ids (ids only) and reading the rows of any that
+# aren't queued yet. Leads already unassigned at boot are the backlog: left to
+# /admin/trigger-assignment unless DISPATCH_STREAM_SWEEP=1 asks the stream to
+# take them too. (No created_at watermark: timestamps are coarse and ids are
+# random, so a late-committing row could sort behind it and never be seen.)
+# Leads are micro-batched - up to BATCH_SIZE, or WINDOW_SEC after the first
+# one arrives - and go through the same greedy scoring + atomic write-back as
+# /admin/trigger-assignment. The LLM review is opt-in (DISPATCH_STREAM_REVIEW=1).
+
+
+class StreamingDispatcher:
+    def __init__(self, batch_size: int = 100, window: float = 2.0, poll_interval: float = 30.0,
+                 max_queue: int = 50000, review: bool = False, sweep: bool = False):
+        self.batch_size = batch_size
+        self.window = window
+        self.poll_interval = poll_interval
+        self.review = review
+        self.sweep = sweep
+        self.backlog = None # investor_ids unassigned at boot, which the stream leaves alone
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.queued = {} # investor_id -> monotonic time first seen
+        self.assigned = 0
+        self.failed_batches = 0
+        self.dropped = 0
+        self.last_batch = {}
+        self.realtime = "off"
+        self._assigned_at = deque(maxlen=50000)
+        self._channel = None
+        self._tasks = []
+
+    def enqueue(self, leads):
+        for lead in leads:
+            investor_id = lead.get('investor_id')
+            if not investor_id or lead.get('assigned_agent_id') or investor_id in self.queued: continue
+            try:
+                self.queue.put_nowait(lead)
+                self.queued[investor_id] = time.monotonic()
+            except asyncio.QueueFull:
+                self.dropped += 1
+        DISPATCH_QUEUE_DEPTH.set(self.queue.qsize())
+
+    def _on_insert(self, payload):
+        record = payload.get("data", {}).get("record")
+        if record: self.enqueue([record])
+
+    async def _listen(self):
+        supabase = await get_supabase()
+        try:
+            self._channel = supabase.channel("dispatch-investors")
+            self._channel.on_postgres_changes("INSERT", callback=self._on_insert, table="investors", schema="public")
+            await self._channel.subscribe(lambda state, err: setattr(self, "realtime", str(getattr(state, "value", state)).lower()))
+        except Exception as e:
+            self.realtime = "unavailable"
+            print(f"⚠️ Dispatch stream: Realtime unavailable, polling only ({e})")
+
+    async def _unassigned_ids(self, supabase) -> set:
+        rows = await fetch_all(lambda: supabase.table("investors").select("investor_id").is_("assigned_agent_id", "null"), "investor_id")
+        return {row['investor_id'] for row in rows}
+
+    async def _poll(self):
+        while True:
+            try:
+                supabase = await get_supabase()
+                unassigned = await self._unassigned_ids(supabase) # Ids only: cheap even for a big table
+                if self.backlog is None:
+                    self.backlog = set() if self.sweep else unassigned # Left to /admin/trigger-assignment
+                self.backlog &= unassigned # Backlog leads assigned elsewhere drop out
+                new = [iid for iid in unassigned if iid not in self.backlog and iid not in self.queued]
+                for start in range(0, len(new), 200): # Keep the in.(...) filter inside URL limits
+                    res = await supabase.table("investors").select("*").in_("investor_id", new[start:start + 200]).is_("assigned_agent_id", "null").execute()
+                    self.enqueue(res.data)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Dispatch stream poll failed: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _next_batch(self) -> list:
+        """
+        Blocks for the first lead, then gathers more until the batch is full or the window closes.
+        """
+        batch = [await self.queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0: break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            DISPATCH_QUEUE_DEPTH.set(self.queue.qsize())
+            started = time.monotonic()
+            try:
+                supabase = await get_supabase()
+                global_workload, agents = await asyncio.gather(
+                    get_workload(supabase),
+                    fetch_all(lambda: supabase.table("agents").select("*"), "agent_id"),
+                )
+                if not agents: raise RuntimeError("no agents")
+                logs = await dispatch_leads(supabase, batch, agents, global_workload, review=self.review)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Dispatch stream batch failed ({len(batch)} leads): {e}")
+                self.failed_batches += 1
+                for lead in batch:
+                    self.queued.pop(lead['investor_id'], None) # Next poll picks them up again (if still unassigned)
+                continue
+
+            now = time.monotonic()
+            for lead in batch:
+                seen_at = self.queued.pop(lead['investor_id'], now)
+                DISPATCH_LAG.observe(now - seen_at)
+                self._assigned_at.append(now)
+            self.assigned += len(logs)
+            DISPATCH_ASSIGNED.inc(len(logs))
+            DISPATCH_BATCH_SIZE.observe(len(batch))
+            self.last_batch = {"size": len(batch), "duration_ms": round((now - started) * 1000, 1)}
+
+    def start(self):
+        if self._tasks: return
+        self._tasks = [asyncio.create_task(coro) for coro in (self._listen(), self._poll(), self._run())]
+        print(f"🌊 Dispatch stream online (batch {self.batch_size} / {self.window:g}s window, poll {self.poll_interval:g}s, review {'on' if self.review else 'off'}, backlog sweep {'on' if self.sweep else 'off'})")
+
+    async def stop(self):
+        for task in self._tasks: task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._channel is not None:
+            try:
+                await (await get_supabase()).remove_channel(self._channel)
+            except Exception as e:
+                print(f"Dispatch stream: channel close failed: {e}")
+            self._channel = None
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        oldest = min(self.queued.values(), default=None)
+        return {
+            "running": bool(self._tasks),
+            "realtime": self.realtime,
+            "queue_depth": self.queue.qsize(),
+            "queue_lag_sec": round(now - oldest, 2) if oldest is not None else 0.0,
+            "assigned": self.assigned,
+            "failed_batches": self.failed_batches,
+            "dropped": self.dropped,
+            "backlog": len(self.backlog) if self.backlog is not None else None,
+            "throughput_per_min": sum(1 for t in self._assigned_at if now - t <= 60),
+            "last_batch": self.last_batch,
+        }
+
+
+dispatch_stream = StreamingDispatcher(
+    batch_size=int(os.getenv("DISPATCH_STREAM_BATCH", "100")),
+    window=float(os.getenv("DISPATCH_STREAM_WINDOW_MS", "2000")) / 1000,
+    poll_interval=float(os.getenv("DISPATCH_STREAM_POLL_SEC", "30")),
+    max_queue=int(os.getenv("DISPATCH_STREAM_MAX_QUEUE", "50000")),
+    review=os.getenv("DISPATCH_STREAM_REVIEW", "0") == "1",
+    sweep=os.getenv("DISPATCH_STREAM_SWEEP", "0") == "1",
+)
@@ -0,0 +1,176 @@
+import json
+import asyncio
+from collections import Counter
+from postgrest.exceptions import APIError
+from clients import fetch_all
+
+# =================================================================
+# 🧬 INVESTOR FEATURES (Compact per-investor record)
+# =================================================================
+# investor_features (sql/investor_features.sql) is kept current by triggers on
+# transactions / interactions, so readers get lifetime value, SIP streak,
+# failure ratio, fund mix, last outcome and objection history in the same
+# request as the investor row (PostgREST embed) - no history scan.
+# Until that table exists, the same record is computed here from raw history.
+
+RECENT_TXNS = 20
+# Lead lists carry only the scalar features; the recent-transaction list is for the deep dive
+LIST_FEATURES = (
+    "lifetime_invested", "txn_count", "failed_txn_count", "failed_txn_ratio", "sip_streak", "last_sip_month",
+    "fund_mix", "last_txn_date", "interaction_count", "conversions", "last_outcome", "last_sentiment",
+    "last_interaction_date", "objection_history", "updated_at",
+)
+INVESTOR_WITH_FEATURES = "*, features:investor_features(*)"
+INVESTOR_WITH_LIST_FEATURES = f"*, features:investor_features({','.join(LIST_FEATURES)})"
+
+_features_table = True
+
+
+def _month_index(value) -> int | None:
+    if not value: return None
+    day = str(value)[:10]
+    return int(day[:4]) * 12 + int(day[5:7]) - 1
+
+
+def _objections(raw) -> list:
+    """
+    objections_raised arrives as a list, a JSON array string or comma-separated text.
+    """
+    if not raw: return []
+    if isinstance(raw, list): return [str(o).strip() for o in raw if str(o).strip()]
+    try:
+        parsed = json.loads(raw)
+        if isinstance(parsed, list): return [str(o).strip() for o in parsed if str(o).strip()]
+    except (TypeError, ValueError):
+        pass
+    return [o.strip(' "') for o in str(raw).strip("{}[]").split(",") if o.strip(' "')]
+
+
+def compute_features(transactions: list, interactions: list) -> dict:
+    """
+    Python mirror of refresh_investor_features(), for when the table isn't there.
+    """
+    txns = sorted(transactions, key=lambda t: (str(t.get('transaction_date') or ""), str(t.get('txn_id') or "")), reverse=True)
+    ok = [t for t in txns if t.get('status') == 'Success']
+    failed = sum(1 for t in txns if t.get('status') == 'Failed')
+
+    fund_mix = Counter()
+    for t in ok:
+        if t.get('fund_name'): fund_mix[t['fund_name']] += t.get('amount') or 0
+
+    # Streak: consecutive months with a successful SIP, counting back from the latest one
+    months = sorted({m for m in (_month_index(t.get('transaction_date')) for t in ok if t.get('transaction_type') == 'SIP') if m is not None}, reverse=True)
+    streak = 0
+    for k, m in enumerate(months):
+        if m != months[0] - k: break
+        streak += 1
+    last_sip_month = f"{months[0] // 12:04d}-{months[0] % 12 + 1:02d}-01" if months else None
+
+    calls = sorted(interactions, key=lambda i: str(i.get('date') or ""), reverse=True)
+    objections = Counter(o for i in calls for o in _objections(i.get('objections_raised')))
+
+    return {
+        "lifetime_invested": sum(t.get('amount') or 0 for t in ok),
+        "txn_count": len(txns),
+        "failed_txn_count": failed,
+        "failed_txn_ratio": round(failed / len(txns), 4) if txns else 0,
+        "sip_streak": streak,
+        "last_sip_month": last_sip_month,
+        "fund_mix": dict(fund_mix),
+        "last_txn_date": str(txns[0]['transaction_date'])[:10] if txns else None,
+        "recent_transactions": txns[:RECENT_TXNS],
+        "interaction_count": len(calls),
+        "conversions": sum(1 for i in calls if i.get('outcome') == 'Converted'),
+        "last_outcome": calls[0].get('outcome') if calls else None,
+        "last_sentiment": calls[0].get('sentiment') if calls else None,
+        "last_interaction_date": str(calls[0]['date'])[:10] if calls else None,
+        "objection_history": dict(objections),
+    }
+
+
+def list_features(features: dict | None) -> dict | None:
+    """
+    A full feature record (e.g. from Realtime) cut down to what lead lists carry.
+    """
+    if features is None: return None
+    return {k: features.get(k) for k in LIST_FEATURES}
+
+
+def _embedded(row: dict) -> dict:
+    features = row.get('features')
+    if isinstance(features, list): features = features[0] if features else None # If PostgREST doesn't see the 1:1
+    row['features'] = features
+    return row
+
+
+async def fetch_investors(supabase, where, full: bool = False) -> list:
+    """
+    Investor rows matching `where(query)`, each with a 'features' key (None when not built yet).
+    List features only, unless `full` (adds recent_transactions).
+    """
+    global _features_table
+    if _features_table:
+        select = INVESTOR_WITH_FEATURES if full else INVESTOR_WITH_LIST_FEATURES
+        try:
+            rows = await fetch_all(lambda: where(supabase.table("investors").select(select)), "investor_id")
+            return [_embedded(row) for row in rows]
+        except APIError as e:
+            if e.code not in ("PGRST200", "PGRST205", "42P01"): raise # Anything but "table/relationship not found" is a real failure
+            _features_table = False
+            print("⚠️ investor_features table missing (run backend/sql/investor_features.sql); leads load without features")
+    rows = await fetch_all(lambda: where(supabase.table("investors").select("*")), "investor_id")
+    for row in rows: row['features'] = None
+    return rows
+
+
+async def history_features(supabase, investor_id: str) -> dict:
+    """
+    The feature record computed from the investor's full raw history (no table yet).
+    """
+    txns, calls = await asyncio.gather(
+        fetch_all(lambda: supabase.table("transactions").select("*").eq("investor_id", investor_id), "txn_id"),
+        fetch_all(lambda: supabase.table("interactions").select("*").eq("investor_id", investor_id), "interaction_id"),
+    )
+    return compute_features(txns, calls)
+
+
+async def recent_transactions(supabase, investor_id: str) -> list:
+    res = await supabase.table("transactions").select("*").eq("investor_id", investor_id).order("transaction_date", desc=True).limit(RECENT_TXNS).execute()
+    return res.data
+
+
+async def investor_with_features(supabase, investor_id: str, history: bool = True) -> dict | None:
+    """
+    One investor plus its full features record: embedded when the table has it,
+    otherwise computed from raw history (left None with history=False).
+    """
+    rows = await fetch_investors(supabase, lambda q: q.eq("investor_id", investor_id), full=True) # Unique key: at most one row
+    if not rows: return None
+    lead = rows[0]
+    if lead['features'] is None and history: lead['features'] = await history_features(supabase, investor_id)
+    return lead
+
+
+def prompt_profile(features: dict) -> str:
+    """
+    A few lines for an LLM prompt, in place of raw transaction dumps.
+    """
+    if not features or not (features.get('txn_count') or features.get('interaction_count')): return "No history yet."
+    lines = []
+    if features.get('txn_count'):
+        failed = features.get('failed_txn_count') or 0
+        lines.append(f"Invested ₹{features.get('lifetime_invested') or 0:,.0f} lifetime over {features['txn_count']} transactions ({failed} failed, {float(features.get('failed_txn_ratio') or 0):.0%}).")
+    if features.get('sip_streak'):
+        streak = features['sip_streak']
+        lines.append(f"SIP streak: {streak} consecutive month{'s' if streak != 1 else ''}, latest {str(features.get('last_sip_month'))[:7]}.")
+    mix = features.get('fund_mix') or {}
+    total = sum(float(v) for v in mix.values())
+    if total:
+        top = sorted(mix.items(), key=lambda kv: -float(kv[1]))[:4]
+        lines.append("Fund mix: " + ", ".join(f"{name} {float(amount) / total:.0%}" for name, amount in top) + ".")
+    if features.get('last_outcome'):
+        lines.append(f"Last call ({features.get('last_interaction_date')}): {features['last_outcome']}, sentiment {features.get('last_sentiment') or 'unknown'}; {features.get('conversions') or 0} conversions in {features.get('interaction_count') or 0} calls.")
+    objections = sorted((features.get('objection_history') or {}).items(), key=lambda kv: -kv[1])[:4]
+    if objections:
+        lines.append("Objections raised: " + ", ".join(f"{o} (x{n})" for o, n in objections) + ".")
+    return "\n".join(lines)
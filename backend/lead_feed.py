@@ -0,0 +1,307 @@
+import os
+import json
+import time
+import hashlib
+import asyncio
+from collections import OrderedDict
+from clients import get_supabase
+from cache import SingleFlight
+from strategy import strategy_engine
+from features import fetch_investors, list_features
+from analysis import analysis_cache
+
+# =================================================================
+# 📡 LEAD FEED (Per-agent lead lists, pushed as diffs)
+# =================================================================
+# Each agent's enriched lead list is loaded once and then kept current from
+#   - Supabase Realtime INSERT/UPDATE events on investors, and
+#   - in-process notifications after dispatch write-backs and overrides
+# (so a single-process deploy is instant even without Realtime). Lists with
+# open sockets are also reloaded in the background once they go stale (every
+# LEAD_FEED_TTL_SEC without Realtime), so other workers' writes still arrive.
+# Subscribers get one snapshot, then only the leads that changed:
+#   {"type": "snapshot", "version", "leads": [...]}
+#   {"type": "diff", "version", "upserted": [...], "removed": [investor_id, ...]}
+# Plain GET polling is served from the same state with an ETag, so an
+# unchanged list costs a 304 and no Supabase round trip.
+
+LEAD_FEED_TTL_SEC = float(os.getenv("LEAD_FEED_TTL_SEC", "15")) # Without Realtime, other writers are only seen on reload
+LEAD_FEED_RESYNC_SEC = float(os.getenv("LEAD_FEED_RESYNC_SEC", "300")) # With Realtime, reload only to heal missed events
+LEAD_FEED_MAX_AGENTS = int(os.getenv("LEAD_FEED_MAX_AGENTS", "2000"))
+SUBSCRIBER_QUEUE = 32
+
+
+class AgentLeads:
+    __slots__ = ("leads", "etag", "version", "loaded_at", "rules_version", "subscribers")
+
+    def __init__(self):
+        self.leads = {} # investor_id -> enriched lead, in load order
+        self.etag = None
+        self.version = 0
+        self.loaded_at = 0.0
+        self.rules_version = None # Strategy rule set the tags were computed with
+        self.subscribers = set()
+
+    def listing(self) -> list:
+        return list(self.leads.values())
+
+    def snapshot(self) -> dict:
+        return {"type": "snapshot", "version": self.version, "leads": self.listing()}
+
+    def rehash(self):
+        body = json.dumps(self.listing(), sort_keys=True, default=str).encode()
+        self.etag = f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+
+
+class LeadFeed:
+    def __init__(self, ttl: float = LEAD_FEED_TTL_SEC, resync: float = LEAD_FEED_RESYNC_SEC, max_agents: int = LEAD_FEED_MAX_AGENTS):
+        self.ttl = ttl
+        self.resync = resync
+        self.max_agents = max_agents
+        self.agents: OrderedDict = OrderedDict() # agent_id -> AgentLeads, LRU
+        self.owner = {} # investor_id -> agent_id, for leads of loaded agents
+        self.realtime = "off"
+        self.pushed = 0
+        self.loads = 0
+        self._flight = SingleFlight()
+        self._channel = None
+        self._started = False
+        self._tasks = set()
+
+    # --- State ---
+
+    def _fresh(self, state: AgentLeads) -> bool:
+        limit = self.resync if self.realtime == "subscribed" else self.ttl
+        return time.monotonic() - state.loaded_at < limit
+
+    async def get(self, agent_id: str) -> AgentLeads:
+        await strategy_engine.refresh()
+        state = self.agents.get(agent_id)
+        if state is not None and self._fresh(state):
+            if state.rules_version != strategy_engine.version: self._retag(agent_id, state)
+            self.agents.move_to_end(agent_id)
+            return state
+        return await self._flight.do(agent_id, lambda: self._load(agent_id))
+
+    async def _load(self, agent_id: str) -> AgentLeads:
+        supabase = await get_supabase()
+        rows = await fetch_investors(supabase, lambda q: q.eq("assigned_agent_id", agent_id))
+        self.loads += 1
+
+        state = self.agents.get(agent_id)
+        if state is None:
+            state = self.agents[agent_id] = AgentLeads()
+            self._evict()
+        self.agents.move_to_end(agent_id)
+
+        fresh = {lead['investor_id']: lead for lead in strategy_engine.enrich(rows)}
+        removed = [iid for iid in state.leads if iid not in fresh]
+        upserted = [lead for iid, lead in fresh.items() if state.leads.get(iid) != lead]
+        for iid in removed:
+            if self.owner.get(iid) == agent_id: del self.owner[iid]
+        for iid in fresh: self.owner[iid] = agent_id
+        state.leads = fresh
+        state.loaded_at = time.monotonic()
+        state.rules_version = strategy_engine.version
+        if state.etag is None or removed or upserted:
+            self._publish(agent_id, state, upserted, removed) # A reload can also heal drift subscribers missed
+        return state
+
+    def _evict(self):
+        # Least recently used first; lists someone is subscribed to stay
+        for agent_id in list(self.agents):
+            if len(self.agents) <= self.max_agents: return
+            state = self.agents[agent_id]
+            if state.subscribers: continue
+            del self.agents[agent_id]
+            for iid in state.leads:
+                if self.owner.get(iid) == agent_id: del self.owner[iid]
+
+    def apply(self, records: list):
+        """
+        Folds changed investor rows into whichever loaded lists they enter or leave.
+        """
+        changes = {} # agent_id -> (upserted, removed)
+        entering = []
+        unknown = [] # New to a watched list with no feature record at hand: refetch with it
+        for record in records:
+            iid = record.get('investor_id')
+            if not iid: continue
+            new_agent = record.get('assigned_agent_id')
+            old_agent = self.owner.get(iid)
+
+            previous = self.agents[old_agent].leads.get(iid) if old_agent in self.agents else None
+            if old_agent and old_agent != new_agent and old_agent in self.agents:
+                self.agents[old_agent].leads.pop(iid, None)
+                changes.setdefault(old_agent, ([], []))[1].append(iid)
+                del self.owner[iid]
+            if not (new_agent and new_agent in self.agents): continue
+
+            if 'features' not in record: # Realtime rows are bare investors rows
+                if previous is None:
+                    unknown.append(iid)
+                    continue
+                record = {**record, 'features': previous.get('features')}
+            entering.append(record)
+
+        for lead in strategy_engine.enrich(entering): # One vectorized pass for the whole event batch
+            iid, agent_id = lead['investor_id'], lead['assigned_agent_id']
+            state = self.agents[agent_id]
+            if state.leads.get(iid) == lead: continue
+            state.leads[iid] = lead
+            self.owner[iid] = agent_id
+            changes.setdefault(agent_id, ([], []))[0].append(lead)
+
+        for agent_id, (upserted, removed) in changes.items():
+            self._publish(agent_id, self.agents[agent_id], upserted, removed)
+        self.touch(unknown)
+
+    def _retag(self, agent_id: str, state: AgentLeads):
+        """
+        Re-scores a cached list under the current strategy rules (no refetch: the rows are all there).
+        """
+        retagged = strategy_engine.enrich(state.listing())
+        upserted = [lead for lead in retagged if state.leads[lead['investor_id']] != lead]
+        state.leads = {lead['investor_id']: lead for lead in retagged}
+        state.rules_version = strategy_engine.version
+        if upserted: self._publish(agent_id, state, upserted, [])
+
+    def retag_all(self):
+        for agent_id, state in list(self.agents.items()): self._retag(agent_id, state)
+
+    async def _reload_subscribed(self):
+        # Nobody GETs a list that only has sockets on it: reload those here once stale
+        while True:
+            await asyncio.sleep(min(self.ttl, self.resync))
+            for agent_id, state in list(self.agents.items()):
+                if not state.subscribers or self._fresh(state): continue
+                try:
+                    await self._flight.do(agent_id, lambda: self._load(agent_id))
+                except Exception as e:
+                    print(f"Lead feed reload failed for {agent_id}: {e}")
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _watch_rules(self):
+        # Rule edits reach open sockets without waiting for someone to poll
+        while True:
+            await asyncio.sleep(strategy_engine.ttl)
+            try:
+                if await strategy_engine.refresh(): self.retag_all()
+            except Exception as e:
+                print(f"Lead feed rules refresh failed: {e}")
+
+    def _publish(self, agent_id: str, state: AgentLeads, upserted: list, removed: list):
+        state.version += 1
+        state.rehash()
+        if not state.subscribers: return
+        diff = {"type": "diff", "version": state.version, "upserted": upserted, "removed": removed}
+        for queue in state.subscribers:
+            if queue.full():
+                # Slow client: drop its backlog and resend the whole list instead
+                while not queue.empty(): queue.get_nowait()
+                queue.put_nowait(state.snapshot())
+            else:
+                queue.put_nowait(diff)
+            self.pushed += 1
+
+    def watching(self, agent_id) -> bool:
+        return agent_id in self.agents
+
+    def touch(self, investor_ids):
+        """
+        Called after in-process writes (dispatch, overrides). Re-reads only those
+        investors, in the background, and only if some loaded list could change.
+        """
+        ids = list(dict.fromkeys(investor_ids))
+        if not ids or not self.agents: return
+        self._spawn(self._refetch(ids))
+
+    async def _refetch(self, ids: list):
+        try:
+            supabase = await get_supabase()
+            for start in range(0, len(ids), 200): # Keep the in.(...) filter inside URL limits
+                chunk = ids[start:start + 200]
+                self.apply(await fetch_investors(supabase, lambda q: q.in_("investor_id", chunk)))
+        except Exception as e:
+            print(f"Lead feed refresh failed: {e}")
+
+    # --- Subscribers ---
+
+    async def subscribe(self, agent_id: str) -> tuple:
+        """
+        (queue, snapshot) - registered in the same step, so no diff can slip in between.
+        """
+        state = await self.get(agent_id)
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE)
+        state.subscribers.add(queue)
+        return queue, state.snapshot()
+
+    def unsubscribe(self, agent_id: str, queue):
+        state = self.agents.get(agent_id)
+        if state is not None: state.subscribers.discard(queue)
+
+    # --- Realtime ---
+
+    def _on_change(self, payload):
+        record = payload.get("data", {}).get("record")
+        if record: self.apply([record])
+
+    def _on_features(self, payload):
+        # A feature row moved (new transaction / call): re-score the cached lead with it, no refetch
+        record = payload.get("data", {}).get("record")
+        if record: analysis_cache.pop(record.get('investor_id')) # Its deep dive carries the old features
+        agent_id = self.owner.get(record.get('investor_id')) if record else None
+        lead = self.agents[agent_id].leads.get(record['investor_id']) if agent_id in self.agents else None
+        if lead: self.apply([{**lead, 'features': list_features(record)}])
+
+    def start(self):
+        """
+        Returns at once; Realtime connects (with its own retries) in the background.
+        """
+        if self._started: return
+        self._started = True
+        self._spawn(self._watch_rules())
+        self._spawn(self._reload_subscribed())
+        self._spawn(self._connect())
+
+    async def _connect(self):
+        try:
+            supabase = await get_supabase()
+            self._channel = supabase.channel("lead-feed")
+            self._channel.on_postgres_changes("UPDATE", callback=self._on_change, table="investors", schema="public")
+            self._channel.on_postgres_changes("INSERT", callback=self._on_change, table="investors", schema="public")
+            self._channel.on_postgres_changes("*", callback=self._on_features, table="investor_features", schema="public")
+            await self._channel.subscribe(lambda state, err: setattr(self, "realtime", str(getattr(state, "value", state)).lower()))
+            print("📡 Lead feed online")
+        except Exception as e:
+            self.realtime = "unavailable"
+            print(f"⚠️ Lead feed: Realtime unavailable, reloading every {self.ttl:g}s instead ({e})")
+
+    async def stop(self):
+        tasks = list(self._tasks)
+        for task in tasks: task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._started = False
+        if self._channel is not None:
+            try:
+                await (await get_supabase()).remove_channel(self._channel)
+            except Exception as e:
+                print(f"Lead feed: channel close failed: {e}")
+            self._channel = None
+
+    def stats(self) -> dict:
+        return {
+            "realtime": self.realtime,
+            "agents_loaded": len(self.agents),
+            "subscribers": sum(len(s.subscribers) for s in self.agents.values()),
+            "loads": self.loads,
+            "pushed": self.pushed,
+            "strategy": strategy_engine.stats(),
+        }
+
+
+lead_feed = LeadFeed()
@@ -1,14 +1,22 @@
 import os
-import json
-import random
 import asyncio
-from fastapi import FastAPI, WebSocket, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
-from supabase import create_client, Client
-from groq import Groq
-import google.generativeai as genai
+from fastapi.responses import Response, JSONResponse
 from dotenv import load_dotenv
-from admin import router as admin_router 
+from clients import close_clients
+from sqlstore import analytics_db
+from analysis import get_lead_analysis
+from prewarm import prewarm_worker
+from dispatch_stream import dispatch_stream
+from lead_feed import lead_feed
+from dispatch_feed import dispatch_feed
+from triggers import trigger_engine
+from objections import objection_classifier
+from cockpit import CockpitSession, utterance_cache, pipeline_stats
+from metrics import MetricsMiddleware, ACTIVE_WEBSOCKETS, render_metrics
+from tracing import TracingMiddleware
+from admin import router as admin_router, close_report_pool
 
 load_dotenv()
 
@@ -30,46 +38,77 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(TracingMiddleware)
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(admin_router)
 
-# 2. CLIENTS
-url = os.getenv("SUPABASE_URL") or os.getenv("VITE_SUPABASE_URL")
-key = os.getenv("SUPABASE_KEY") or os.getenv("VITE_SUPABASE_ANON_KEY")
-supabase: Client = create_client(url, key)
+# 2. CLIENTS (Shared async pools live in clients.py)
+
+DISPATCH_STREAM = os.getenv("DISPATCH_STREAM", "0") == "1" # Opt-in continuous assignment of new leads
 
-groq_client = Groq(api_key=os.getenv("GROQ_API_KEY"))
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-gemini_model = genai.GenerativeModel('gemini-2.5-flash')
+@app.on_event("startup")
+async def start_workers():
+    prewarm_worker.start()
+    lead_feed.start()
+    if DISPATCH_STREAM: dispatch_stream.start()
+
+@app.on_event("shutdown")
+async def shutdown_clients():
+    await dispatch_stream.stop()
+    await lead_feed.stop()
+    await prewarm_worker.stop()
+    await close_clients()
+    if analytics_db: analytics_db.close()
+    close_report_pool()
 
 # =================================================================
 # 🕵️ AGENT ENDPOINTS (Field App)
 # =================================================================
 
 @app.get("/agent/{agent_id}/leads")
-async def get_my_leads(agent_id: str):
+async def get_my_leads(agent_id: str, request: Request):
     """
     Fetches leads assigned to a specific agent. 
+    Served from the live lead feed; send If-None-Match to get a 304 when nothing changed.
+    """
+    state = await lead_feed.get(agent_id)
+    headers = {"ETag": state.etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == state.etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(state.listing(), headers=headers)
+
+@app.websocket("/ws/agent/{agent_id}/leads")
+async def lead_feed_socket(websocket: WebSocket, agent_id: str):
     """
-    # Fetch from DB
-    res = supabase.table("investors").select("*").eq("assigned_agent_id", agent_id).execute()
-    leads = res.data
-    
-    # Enrich with AI Hooks
-    enriched = []
-    for lead in leads:
-        hook = "General Follow-up"
-        if lead['age'] > 50: hook = "🛡️ Capital Protection Strategy"
-        elif "Gig" in lead['occupation']: hook = "💧 High Liquidity Pitch"
-        elif "High" in lead['risk_appetite']: hook = "🚀 Small Cap Multiplier Pitch"
-        elif "Business" in lead['occupation']: hook = "💼 Tax Saver (Section 54EC)"
-        
-        enriched.append({
-            **lead,
-            "ai_strategy_tag": hook,
-            "match_score": 95 
-        })
-        
-    return enriched
+    One snapshot of the agent's leads, then diffs as assignments and overrides touch them.
+    """
+    await websocket.accept()
+    ACTIVE_WEBSOCKETS.labels("lead_feed").inc()
+    queue = None
+    try:
+        queue, snapshot = await lead_feed.subscribe(agent_id)
+        await websocket.send_json(snapshot)
+
+        async def push():
+            while True: await websocket.send_json(await queue.get())
+
+        async def drain(): # Only here to notice the client going away
+            while True: await websocket.receive_text()
+
+        tasks = [asyncio.create_task(push()), asyncio.create_task(drain())]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done: task.result()
+        finally:
+            for task in tasks: task.cancel()
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Lead feed WS Error: {e}")
+    finally:
+        if queue is not None: lead_feed.unsubscribe(agent_id, queue)
+        ACTIVE_WEBSOCKETS.labels("lead_feed").dec()
 
 # --- THE MISSING ENDPOINT (Restored) ---
 # ... (Keep existing imports and setup) ...
@@ -80,110 +119,48 @@ async def get_my_leads(agent_id: str):
 
 @app.get("/agent/analyze-lead/{investor_id}")
 async def analyze_lead_strategy(investor_id: str):
-    # 1. Fetch Investor Profile
-    lead = supabase.table("investors").select("*").eq("investor_id", investor_id).single().execute().data
-    if not lead: raise HTTPException(status_code=404, detail="Lead not found")
-
-    # 2. Fetch Transactions (For Deep Dive UI)
-    tx_res = supabase.table("transactions").select("*").eq("investor_id", investor_id).order("transaction_date", desc=True).limit(20).execute()
-    transactions = tx_res.data
-
-    # 3. CHECK CACHE (Consistency Fix)
-    if lead.get('ai_analysis_cache'):
-        print(f"⚡ Returning Cached Analysis for {lead['name']}")
-        return {
-            "lead_details": lead,
-            "transactions": transactions, # Sending real data now
-            "analysis": lead['ai_analysis_cache']
-        }
-
-    # 4. GENERATE NEW ANALYSIS (If not cached)
-    history_str = json.dumps(transactions[:5], indent=2) if transactions else "No recent history."
-    
-    prompt = f"""
-    Analyze Lead: {lead['name']} ({lead['occupation']}, Risk: {lead['risk_appetite']}, City: {lead['city']}).
-    History: {history_str}
-    
-    Task:
-    1. Create a "Financial Persona" tag (e.g. "Cautious Saver").
-    2. Write a "Key Insight" (2 sentences max).
-    3. Recommend TOP 3 Products.
-       - Product 1 (The Winner): Best fit.
-       - Product 2 (Alternative): Safer option.
-       - Product 3 (Wildcard): Growth option.
-    4. Write a "Golden Opening Script" for Product 1.
-    
-    Output JSON:
-    {{
-        "personality_tag": "String",
-        "key_insight": "String",
-        "top_recommendations": [
-            {{ "name": "Fund Name", "type": "Equity/Debt", "reason": "Why?" }},
-            {{ "name": "Fund Name", "type": "Equity/Debt", "reason": "Why?" }},
-            {{ "name": "Fund Name", "type": "Equity/Debt", "reason": "Why?" }}
-        ],
-        "opening_pitch": "String"
-    }}
-    """
-    
-    try:
-        # Simulating "Thinking"
-        await asyncio.sleep(2) 
-        
-        ai_res = gemini_model.generate_content(prompt, generation_config={"response_mime_type": "application/json"})
-        analysis = json.loads(ai_res.text)
-        
-        # 5. SAVE TO DB (Cache it)
-        supabase.table("investors").update({"ai_analysis_cache": analysis}).eq("investor_id", investor_id).execute()
-        
-        return {
-            "lead_details": lead,
-            "transactions": transactions,
-            "analysis": analysis
-        }
-    except Exception as e:
-        print(f"Analysis Failed: {e}")
-        return {"error": "AI Service Unavailable"}
+    # Hot cache hit returns with no network; concurrent misses share one Gemini call
+    return await get_lead_analysis(investor_id)
+
 # =================================================================
 # ⚡ COCKPIT SOCKET
 # =================================================================
 
-SYSTEM_PROMPT = """
-Analyze the text. Return JSON:
-{ "type": "objection" | "fact" | "none", "title": "...", "content": "...", "data": {} }
-"""
-
 @app.websocket("/ws/cockpit")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
+    ACTIVE_WEBSOCKETS.labels("cockpit").inc()
     try:
-        while True:
-            data = await websocket.receive_text()
-            
-            # Fast Trigger
-            if "fd" in data.lower() or "fixed deposit" in data.lower():
-                await websocket.send_json({
-                    "id": str(random.randint(1000,9999)),
-                    "type": "fact",
-                    "title": "FD vs Mutual Fund",
-                    "content": "FDs are taxed. MFs are efficient.",
-                    "data": {"table": {"FD Post-Tax": "4.8%", "Hybrid": "11.2%"}}
-                })
-                continue
-
-            # Smart Trigger
-            if len(data) > 15:
-                completion = groq_client.chat.completions.create(
-                    messages=[{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": data}],
-                    model="meta-llama/llama-4-maverick-17b-128e-instruct",
-                    response_format={"type": "json_object"}
-                )
-                ai_resp = json.loads(completion.choices[0].message.content)
-                if ai_resp['type'] != 'none':
-                    await websocket.send_json({ "id": str(random.randint(1000,9999)), **ai_resp })
-
+        stream = websocket.query_params.get("stream") == "1"
+        await CockpitSession(websocket, stream=stream).run()
+    except WebSocketDisconnect:
+        pass
     except Exception as e:
         print(f"WS Error: {e}")
+    finally:
+        ACTIVE_WEBSOCKETS.labels("cockpit").dec()
+
+@app.get("/dispatch/stats")
+async def get_dispatch_stats():
+    return {**dispatch_stream.status(), "feed": dispatch_feed.stats()}
+
+@app.get("/agent/feed/stats")
+async def get_lead_feed_stats():
+    return lead_feed.stats()
+
+@app.get("/cockpit/stats")
+async def get_cockpit_stats():
+    return {
+        "triggers": trigger_engine.stats(),
+        "classifier": objection_classifier.stats() if objection_classifier else None,
+        "llm_cache": utterance_cache.stats(),
+        "pipeline": dict(pipeline_stats),
+    }
+
+@app.get("/metrics")
+def get_metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 @app.get("/")
 def home():
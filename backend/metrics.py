@@ -0,0 +1,169 @@
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, REGISTRY
+from tracing import span
+
+# =================================================================
+# 📈 METRICS (Prometheus text format on GET /metrics)
+# =================================================================
+# Hot-path cost is one histogram observe per request/call. Cache ratios are
+# read from the caches' own counters at scrape time, not on every lookup.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+HTTP_LATENCY = Histogram(
+    "sipbrain_http_request_duration_seconds", "HTTP request latency by route",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+SUPABASE_LATENCY = Histogram(
+    "sipbrain_supabase_request_duration_seconds", "Supabase REST latency by table and operation",
+    ["table", "operation", "status"], buckets=LATENCY_BUCKETS,
+)
+LLM_LATENCY = Histogram(
+    "sipbrain_llm_request_duration_seconds", "LLM call latency by provider",
+    ["provider", "model", "outcome"], buckets=LATENCY_BUCKETS,
+)
+LLM_TOKENS = Counter("sipbrain_llm_tokens_total", "LLM tokens by provider", ["provider", "model", "kind"])
+LLM_ERRORS = Counter("sipbrain_llm_errors_total", "Failed LLM calls by provider", ["provider", "model"])
+ANALYSIS_LOOKUPS = Counter(
+    "sipbrain_analysis_lookups", "Deep-dive analyses served, by where they came from",
+    ["source"], # memory | db_column | generated
+)
+ACTIVE_WEBSOCKETS = Gauge("sipbrain_active_websockets", "Open WebSocket connections", ["endpoint"])
+DISPATCH_LAG = Histogram(
+    "sipbrain_dispatch_lag_seconds", "Time from a lead being seen to being assigned (streaming dispatcher)",
+    buckets=(0.5, 1, 2, 5, 10, 30, 60, 120, 300, 900),
+)
+DISPATCH_QUEUE_DEPTH = Gauge("sipbrain_dispatch_queue_depth", "Unassigned leads waiting in the streaming dispatcher")
+DISPATCH_ASSIGNED = Counter("sipbrain_dispatch_assigned", "Leads assigned by the streaming dispatcher")
+DISPATCH_BATCH_SIZE = Histogram(
+    "sipbrain_dispatch_batch_size", "Leads per streaming micro-batch",
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000),
+)
+
+# PostgREST verbs -> the supabase-py call that produced them
+_OPERATIONS = {"GET": "select", "HEAD": "count", "POST": "insert", "PATCH": "update", "PUT": "upsert", "DELETE": "delete"}
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (no BaseHTTPMiddleware buffering, safe for streaming responses).
+    Labels use the route template, e.g. /agent/{agent_id}/leads, to keep cardinality bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start": status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_LATENCY.labels(scope["method"], getattr(route, "path", "unmatched"), str(status)).observe(time.perf_counter() - start)
+
+
+# --- Supabase (httpx event hooks on the shared pool) ---
+
+async def _on_supabase_request(request):
+    request.extensions["sipbrain_start"] = time.perf_counter()
+
+
+async def _on_supabase_response(response):
+    request = response.request
+    start = request.extensions.get("sipbrain_start")
+    if start is None: return
+    parts = request.url.path.strip("/").split("/") # rest/v1/<table> or rest/v1/rpc/<fn>
+    if len(parts) > 3 and parts[2] == "rpc":
+        table, operation = parts[3], "rpc"
+    else:
+        table = parts[2] if len(parts) > 2 else request.url.path
+        operation = _OPERATIONS.get(request.method, request.method.lower())
+        if request.method == "POST" and "merge-duplicates" in request.headers.get("prefer", ""): operation = "upsert"
+    SUPABASE_LATENCY.labels(table, operation, str(response.status_code)).observe(time.perf_counter() - start)
+
+
+SUPABASE_EVENT_HOOKS = {"request": [_on_supabase_request], "response": [_on_supabase_response]}
+
+
+# --- LLM providers ---
+
+@asynccontextmanager
+async def track_llm(provider: str, model: str):
+    """
+    Times an LLM call; errors are counted and re-raised.
+    Usage: async with track_llm("groq", model) as call: ...; call.tokens(prompt, completion)
+    """
+    call = _LLMCall(provider, model)
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        with span(f"llm:{provider}", model=model):
+            yield call
+    except asyncio.CancelledError:
+        outcome = "cancelled" # Superseded by newer speech, not a provider failure
+        raise
+    except BaseException:
+        outcome = "error"
+        LLM_ERRORS.labels(provider, model).inc()
+        raise
+    finally:
+        LLM_LATENCY.labels(provider, model, outcome).observe(time.perf_counter() - start)
+
+
+class _LLMCall:
+    __slots__ = ("provider", "model")
+
+    def __init__(self, provider, model):
+        self.provider = provider
+        self.model = model
+
+    def tokens(self, prompt: int | None, completion: int | None):
+        if prompt: LLM_TOKENS.labels(self.provider, self.model, "prompt").inc(prompt)
+        if completion: LLM_TOKENS.labels(self.provider, self.model, "completion").inc(completion)
+
+
+# --- In-process caches (read at scrape time) ---
+
+_caches = {}
+
+
+def register_cache(name: str, cache):
+    """
+    Exposes a TTLCache's hits/misses/size; anything with a .stats() dict of those keys works.
+    """
+    _caches[name] = cache
+
+
+class _CacheCollector:
+    def collect(self):
+        hits = CounterMetricFamily("sipbrain_cache_hits", "Cache hits since start", labels=["cache"])
+        misses = CounterMetricFamily("sipbrain_cache_misses", "Cache misses since start", labels=["cache"])
+        ratio = GaugeMetricFamily("sipbrain_cache_hit_ratio", "Cache hit ratio since start", labels=["cache"])
+        size = GaugeMetricFamily("sipbrain_cache_entries", "Entries currently cached", labels=["cache"])
+        for name, cache in _caches.items():
+            s = cache.stats()
+            hits.add_metric([name], s.get("hits", 0))
+            misses.add_metric([name], s.get("misses", 0))
+            ratio.add_metric([name], s.get("hit_ratio", 0.0))
+            size.add_metric([name], s.get("size", 0))
+        yield from (hits, misses, ratio, size)
+
+
+REGISTRY.register(_CacheCollector())
+
+
+def render_metrics():
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,144 @@
+import os
+import re
+import math
+from collections import Counter
+
+# =================================================================
+# 🛡️ LOCAL OBJECTION CLASSIFIER (knowledge_base.md -> TF-IDF index)
+# =================================================================
+# Every concept's "User Variations" (plus its script and facts) are folded
+# into one char n-gram TF-IDF centroid. A transcript fragment is matched to
+# the nearest centroid; confident matches become a card instantly, the rest
+# still go to Groq.
+
+KB_PATH = os.getenv(
+    "KNOWLEDGE_BASE_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "synthtetic", "sipbrain_data", "knowledge_base.md"),
+)
+CONFIDENCE_THRESHOLD = float(os.getenv("OBJECTION_THRESHOLD", "0.25"))
+CONTEXT_WEIGHT = 3.0
+NGRAM_RANGE = (3, 5)
+
+
+def parse_knowledge_base(path: str = KB_PATH) -> list:
+    """
+    Returns [{concept, variations, script, facts}] for every "### Concept:" section.
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+
+    concepts = []
+    for block in re.split(r"^### Concept:\s*", text, flags=re.M)[1:]:
+        lines = block.splitlines()
+        entry = {"concept": lines[0].strip(), "variations": [], "script": "", "facts": []}
+        section = None
+        for line in lines[1:]:
+            if line.startswith("## "): break # Next top-level part (Fund knowledge)
+            if "User Variations" in line: section = "variations"
+            elif "Recommended Agent Script" in line: section = "script"
+            elif "Key Counters" in line: section = "facts"
+            elif line.startswith("- ") and section in ("variations", "facts"):
+                entry[section].append(line[2:].strip())
+            elif line.startswith("> ") and section == "script":
+                entry["script"] += line[2:].strip()
+        concepts.append(entry)
+    return concepts
+
+
+def normalize(text: str) -> str:
+    text = text.lower()
+    text = re.sub(r"[^a-z0-9₹%\s]", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def char_ngrams(text: str) -> Counter:
+    grams = Counter()
+    for word in normalize(text).split():
+        padded = f" {word} "
+        for n in range(NGRAM_RANGE[0], NGRAM_RANGE[1] + 1):
+            for i in range(len(padded) - n + 1):
+                grams[padded[i:i + n]] += 1
+    return grams
+
+
+class ObjectionClassifier:
+    def __init__(self, concepts: list, threshold: float = CONFIDENCE_THRESHOLD, context_weight: float = CONTEXT_WEIGHT):
+        self.concepts = concepts
+        self.threshold = threshold
+        self.hits = 0
+        self.misses = 0
+
+        # Variations carry weight 1; the concept's own title/script/facts add vocabulary
+        docs = []
+        for idx, c in enumerate(concepts):
+            docs += [(idx, char_ngrams(v), 1.0) for v in c['variations']]
+            docs += [(idx, char_ngrams(t), context_weight) for t in [c['concept'], c['script'], *c['facts']] if t]
+
+        df = Counter()
+        for _, grams, _ in docs: df.update(grams.keys())
+        n_docs = len(docs)
+        self.idf = {g: math.log((1 + n_docs) / (1 + count)) + 1 for g, count in df.items()}
+
+        # One L2-normalized centroid per concept: shared filler phrases average out
+        centroids = [Counter() for _ in concepts]
+        for idx, grams, weight in docs:
+            for gram, w in self._vectorize(grams).items():
+                centroids[idx][gram] += w * weight
+        self.centroids = [self._unit(c) for c in centroids]
+
+    @classmethod
+    def from_file(cls, path: str = KB_PATH, **kwargs):
+        return cls(parse_knowledge_base(path), **kwargs)
+
+    @staticmethod
+    def _unit(vec: dict) -> dict:
+        norm = math.sqrt(sum(w * w for w in vec.values())) or 1.0
+        return {g: w / norm for g, w in vec.items()}
+
+    def _vectorize(self, grams: Counter) -> dict:
+        return self._unit({g: (1 + math.log(tf)) * self.idf[g] for g, tf in grams.items() if g in self.idf})
+
+    def predict(self, text: str):
+        """
+        Returns (concept_idx, cosine score) of the nearest concept centroid, or (None, 0.0).
+        """
+        query = self._vectorize(char_ngrams(text))
+        if not query: return None, 0.0
+        scores = [sum(w * centroid.get(g, 0.0) for g, w in query.items()) for centroid in self.centroids]
+        best = max(range(len(scores)), key=scores.__getitem__)
+        return best, scores[best]
+
+    def classify(self, text: str):
+        """
+        Returns a cockpit card when confident, else None (caller falls back to the LLM).
+        """
+        concept_idx, score = self.predict(text)
+        if concept_idx is None or score < self.threshold:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        concept = self.concepts[concept_idx]
+        return {
+            "type": "objection",
+            "title": concept['concept'],
+            "content": concept['script'],
+            "data": {"facts": concept['facts'], "confidence": round(score, 3)},
+        }
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "concepts": len(self.concepts),
+            "threshold": self.threshold,
+            "local_hits": self.hits,
+            "sent_to_llm": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+try:
+    objection_classifier = ObjectionClassifier.from_file()
+except FileNotFoundError:
+    print(f"⚠️ Knowledge base not found at {KB_PATH}, local objection classifier disabled")
+    objection_classifier = None
@@ -0,0 +1,93 @@
+import os
+import time
+import asyncio
+from collections import deque
+from clients import RateLimiter
+from analysis import analysis_cache, get_lead_analysis
+
+# =================================================================
+# 🔥 PRE-WARM WORKER (Analysis ready before the agent clicks)
+# =================================================================
+
+class PrewarmWorker:
+    """
+    Generates deep-dive analyses for freshly assigned leads in the background,
+    with a fixed number of workers and a Gemini requests-per-minute budget.
+    """
+
+    def __init__(self, concurrency: int = 4, rpm: float = 30, max_queue: int = 10000):
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rpm)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.pending = set()
+        self.in_flight = 0
+        self.processed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.dropped = 0
+        self._completed_at = deque(maxlen=5000)
+        self._tasks = []
+
+    def enqueue(self, investor_ids):
+        for investor_id in investor_ids:
+            if investor_id in self.pending or investor_id in analysis_cache:
+                self.skipped += 1
+                continue
+            try:
+                self.queue.put_nowait(investor_id)
+                self.pending.add(investor_id)
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    async def _run(self):
+        while True:
+            investor_id = await self.queue.get()
+            self.in_flight += 1
+            try:
+                result = await get_lead_analysis(investor_id, limiter=self.limiter)
+                if result.get("error"): self.failed += 1
+                else: self.processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Prewarm Failed ({investor_id}): {e}")
+                self.failed += 1
+            finally:
+                self.in_flight -= 1
+                self.pending.discard(investor_id)
+                self._completed_at.append(time.monotonic())
+                self.queue.task_done()
+
+    def start(self):
+        if self._tasks: return
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+        print(f"🔥 Prewarm worker online ({self.concurrency} workers, {self.limiter.rate:g} rpm)")
+
+    async def stop(self):
+        for task in self._tasks: task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        last_minute = sum(1 for t in self._completed_at if now - t <= 60)
+        return {
+            "running": bool(self._tasks),
+            "workers": self.concurrency,
+            "rate_limit_rpm": self.limiter.rate,
+            "queue_depth": self.queue.qsize(),
+            "in_flight": self.in_flight,
+            "processed": self.processed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "dropped": self.dropped,
+            "throughput_per_min": last_minute,
+            "cache": analysis_cache.stats(),
+        }
+
+
+prewarm_worker = PrewarmWorker(
+    concurrency=int(os.getenv("PREWARM_CONCURRENCY", "4")),
+    rpm=float(os.getenv("PREWARM_RPM", "30")),
+    max_queue=int(os.getenv("PREWARM_MAX_QUEUE", "10000")),
+)
@@ -0,0 +1,66 @@
+import os
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
+from reportlab.lib.styles import getSampleStyleSheet
+
+# =================================================================
+# 📄 PDF REPORTS (Run in a worker process)
+# =================================================================
+# Plain functions of plain data, so they can be shipped to a ProcessPoolExecutor:
+# ReportLab is pure-Python CPU work and would hold the GIL in a thread.
+# Each writes to a temp file and renames it into place, so a half-written PDF
+# is never served from the cache directory.
+
+TABLE_CHUNK_ROWS = 500 # Long tables are split into chunks; one huge Table makes ReportLab's page splitting quadratic
+
+KPI_STYLE = TableStyle([('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#f1f5f9")), ('ALIGN', (0, 0), (-1, -1), 'CENTER'), ('GRID', (0, 0), (-1, -1), 1, colors.HexColor("#e2e8f0"))])
+LOG_STYLE = TableStyle([('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#0f172a")), ('TEXTCOLOR', (0, 0), (-1, 0), colors.white), ('GRID', (0, 0), (-1, -1), 1, colors.black)])
+
+
+def _kpi_table(revenue: float, agent_count: int) -> Table:
+    t = Table([['Total Revenue', 'Active Agents'], [f"Rs {revenue:,.0f}", str(agent_count)]], colWidths=[200, 200])
+    t.setStyle(KPI_STYLE)
+    return t
+
+
+def _tables(header: list, rows: list) -> list:
+    chunks = [rows[i:i + TABLE_CHUNK_ROWS] for i in range(0, len(rows), TABLE_CHUNK_ROWS)] or [[]]
+    tables = []
+    for chunk in chunks:
+        t = Table([header] + chunk, repeatRows=1)
+        t.setStyle(LOG_STYLE)
+        tables.append(t)
+    return tables
+
+
+def _write(path: str, elements: list):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    SimpleDocTemplate(tmp, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=18).build(elements)
+    os.replace(tmp, path)
+
+
+def build_summary_pdf(path: str, revenue: float, agent_count: int, logs: list):
+    """
+    One-page executive report: KPIs + recent dispatch decisions.
+    logs: [[lead, assigned_to, score, override]]
+    """
+    styles = getSampleStyleSheet()
+    elements = [Paragraph("SIPBrain™ Executive Report", styles['Heading1']), Spacer(1, 12), _kpi_table(revenue, agent_count), Spacer(1, 20)]
+    elements.append(Paragraph("Recent AI Dispatch Decisions", styles['Heading2']))
+    elements += _tables(['Lead', 'Assigned To', 'Score', 'Override?'], logs)
+    _write(path, elements)
+
+
+def build_full_pdf(path: str, revenue: float, agent_count: int, agents: list, logs: list):
+    """
+    Multi-page report: KPIs, per-agent breakdown and the full dispatch log.
+    agents: [[name, leads, conversions, revenue]]; logs: [[date, lead, assigned_to, score, override]]
+    """
+    styles = getSampleStyleSheet()
+    elements = [Paragraph("SIPBrain™ Full Operations Report", styles['Heading1']), Spacer(1, 12), _kpi_table(revenue, agent_count), Spacer(1, 20)]
+    elements.append(Paragraph("Agent Breakdown", styles['Heading2']))
+    elements += _tables(['Agent', 'Leads', 'Conversions', 'Revenue'], [[name, f"{leads:,}", f"{conv:,}", f"Rs {rev:,.0f}"] for name, leads, conv, rev in agents])
+    elements += [PageBreak(), Paragraph(f"AI Dispatch Log ({len(logs):,} decisions)", styles['Heading2'])]
+    elements += _tables(['Date', 'Lead', 'Assigned To', 'Score', 'Override?'], logs)
+    _write(path, elements)
@@ -0,0 +1,43 @@
+-- =================================================================
+-- 📊 agent_workload: open leads per agent, maintained by trigger
+-- =================================================================
+-- Run once in the Supabase SQL editor. Dispatch reads this table (one row per
+-- agent) instead of downloading every assigned investor to count them.
+-- Every path that changes investors.assigned_agent_id keeps it in step in the
+-- same transaction: dispatch (apply_dispatch), admin overrides, and lead
+-- closure (assignment cleared or investor deleted).
+
+create table if not exists agent_workload (
+  agent_id   text primary key,
+  open_leads integer not null default 0
+);
+
+create or replace function bump_agent_workload()
+returns trigger
+language plpgsql
+as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE') and old.assigned_agent_id is not null then
+    update agent_workload set open_leads = open_leads - 1 where agent_id = old.assigned_agent_id;
+  end if;
+  if tg_op in ('INSERT', 'UPDATE') and new.assigned_agent_id is not null then
+    insert into agent_workload (agent_id, open_leads) values (new.assigned_agent_id, 1)
+    on conflict (agent_id) do update set open_leads = agent_workload.open_leads + 1;
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists investors_workload on investors;
+create trigger investors_workload
+after insert or delete or update of assigned_agent_id on investors
+for each row
+execute function bump_agent_workload();
+
+-- Backfill / repair: recount from scratch
+begin;
+lock table investors in share mode;
+delete from agent_workload;
+insert into agent_workload (agent_id, open_leads)
+select assigned_agent_id, count(*) from investors where assigned_agent_id is not null group by assigned_agent_id;
+commit;
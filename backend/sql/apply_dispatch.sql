@@ -0,0 +1,37 @@
+-- =================================================================
+-- 🧾 apply_dispatch: atomic write-back for /admin/trigger-assignment[/batch]
+-- =================================================================
+-- Run once in the Supabase SQL editor. One call = one transaction:
+-- the assignments and their ai_dispatch_logs rows land together or not at all.
+-- Leads another run already claimed are skipped (and get no log row).
+--
+-- rows: [{"investor_id": "...", "assigned_agent_id": "...", "log": {<ai_dispatch_logs columns>}}]
+-- returns: number of leads actually assigned
+
+-- Lets /admin/override-assignment find the lead a log row is about
+alter table ai_dispatch_logs add column if not exists investor_id text;
+
+create or replace function apply_dispatch(rows jsonb)
+returns integer
+language plpgsql
+as $$
+declare
+  applied integer;
+begin
+  with claimed as (
+    update investors i
+       set assigned_agent_id = r.assigned_agent_id
+      from jsonb_to_recordset(rows) as r(investor_id text, assigned_agent_id text, log jsonb)
+     where i.investor_id = r.investor_id
+       and i.assigned_agent_id is null
+    returning r.investor_id, r.log
+  )
+  insert into ai_dispatch_logs (investor_id, lead_name, lead_persona, top_candidate, assigned_agent, math_score, second_score, is_override, reasoning)
+  select c.investor_id, p.lead_name, p.lead_persona, p.top_candidate, p.assigned_agent, p.math_score, p.second_score, p.is_override, p.reasoning
+    from claimed c
+   cross join lateral jsonb_populate_record(null::ai_dispatch_logs, c.log) p;
+
+  get diagnostics applied = row_count;
+  return applied;
+end;
+$$;
@@ -0,0 +1,7 @@
+-- =================================================================
+-- 🌊 Realtime feed for the streaming dispatcher
+-- =================================================================
+-- Run once in the Supabase SQL editor. Without it the dispatcher still works,
+-- but only picks new leads up on its DISPATCH_STREAM_POLL_SEC poll.
+
+alter publication supabase_realtime add table investors;
@@ -0,0 +1,255 @@
+-- =================================================================
+-- 🧬 investor_features: one compact record per investor, kept by triggers
+-- =================================================================
+-- Run once in the Supabase SQL editor (the backfill at the bottom may take a
+-- while on a big book). Afterwards every write to transactions / interactions
+-- updates its investor's row in the same transaction:
+--   - inserts are folded in incrementally (counters, sums, fund mix, streak,
+--     recent list, objection counts) - O(1) per write, no history scan
+--   - updates, deletes and out-of-order inserts (a transaction dated before the
+--     latest one) recompute that one investor with refresh_investor_features()
+-- The agent app and the deep-dive prompt read this row instead of raw history.
+--
+-- sip_streak: consecutive calendar months with a successful SIP, ending at
+-- last_sip_month (compare that with the current month to tell if it's live).
+
+create table if not exists investor_features (
+  investor_id           text primary key references investors (investor_id) on delete cascade,
+  lifetime_invested     numeric not null default 0,
+  txn_count             integer not null default 0,
+  failed_txn_count      integer not null default 0,
+  failed_txn_ratio      numeric generated always as (
+                          case when txn_count > 0 then round(failed_txn_count::numeric / txn_count, 4) else 0 end
+                        ) stored,
+  sip_streak            integer not null default 0,
+  last_sip_month        date,
+  fund_mix              jsonb not null default '{}', -- fund_name -> successful amount
+  last_txn_date         date,
+  recent_transactions   jsonb not null default '[]', -- newest first, at most 20
+  interaction_count     integer not null default 0,
+  conversions           integer not null default 0,
+  last_outcome          text,
+  last_sentiment        text,
+  last_interaction_date date,
+  objection_history     jsonb not null default '{}', -- objection -> times raised
+  updated_at            timestamptz not null default now()
+);
+
+-- Recomputes and backfill look history up by investor
+create index if not exists transactions_investor_idx on transactions (investor_id, transaction_date desc);
+create index if not exists interactions_investor_idx on interactions (investor_id, "date" desc);
+
+-- objections_raised arrives as a JSON array in text ('["Price", "Lock-in"]'),
+-- a Postgres array, or plain comma-separated text; all become one row per objection
+create or replace function objection_list(raw text)
+returns setof text
+language plpgsql
+immutable
+as $$
+begin
+  if raw is null or btrim(raw) in ('', '[]', '{}') then return; end if;
+  begin
+    return query select btrim(o) from jsonb_array_elements_text(raw::jsonb) o where btrim(o) <> '';
+  exception when others then
+    return query select btrim(o, ' "') from unnest(string_to_array(btrim(raw, '{}[]'), ',')) o where btrim(o, ' "') <> '';
+  end;
+end;
+$$;
+
+create or replace function refresh_investor_features(p_investor_id text)
+returns void
+language sql
+as $$
+  insert into investor_features as f (
+    investor_id, lifetime_invested, txn_count, failed_txn_count, sip_streak, last_sip_month, fund_mix,
+    last_txn_date, recent_transactions, interaction_count, conversions, last_outcome, last_sentiment,
+    last_interaction_date, objection_history, updated_at
+  )
+  select p_investor_id, tx.invested, tx.total, tx.failed, streak.months, streak.last_month, coalesce(mix.funds, '{}'),
+         tx.last_date, coalesce(recent.txns, '[]'), ix.total, ix.conversions, last_ix.outcome, last_ix.sentiment,
+         ix.last_date, coalesce(obj.history, '{}'), now()
+    from (
+      select coalesce(sum(amount) filter (where status = 'Success'), 0) as invested,
+             count(*)::int as total,
+             (count(*) filter (where status = 'Failed'))::int as failed,
+             max(transaction_date)::date as last_date
+        from transactions where investor_id = p_investor_id
+    ) tx
+    cross join (
+      -- Gaps-and-islands over months: the island holding the latest month is the streak
+      with months as (
+        select distinct date_trunc('month', transaction_date)::date as m
+          from transactions
+         where investor_id = p_investor_id and status = 'Success' and transaction_type = 'SIP'
+      ), islands as (
+        select m, (extract(year from m) * 12 + extract(month from m))::int - (row_number() over (order by m))::int as grp
+          from months
+      )
+      select count(*)::int as months, max(m) as last_month
+        from islands where grp = (select grp from islands order by m desc limit 1)
+    ) streak
+    cross join (
+      select jsonb_object_agg(fund_name, amount) as funds
+        from (
+          select fund_name, sum(amount) as amount from transactions
+           where investor_id = p_investor_id and status = 'Success' and fund_name is not null
+           group by fund_name
+        ) s
+    ) mix
+    cross join (
+      select jsonb_agg(to_jsonb(t) order by t.transaction_date desc, t.txn_id desc) as txns
+        from (
+          select * from transactions where investor_id = p_investor_id
+           order by transaction_date desc, txn_id desc limit 20
+        ) t
+    ) recent
+    cross join (
+      select count(*)::int as total,
+             (count(*) filter (where outcome = 'Converted'))::int as conversions,
+             max("date")::date as last_date
+        from interactions where investor_id = p_investor_id
+    ) ix
+    cross join (
+      select jsonb_object_agg(o, n) as history
+        from (
+          select o, count(*)::int as n
+            from interactions i, objection_list(i.objections_raised::text) o
+           where i.investor_id = p_investor_id
+           group by o
+        ) s
+    ) obj
+    left join lateral (
+      select outcome, sentiment from interactions
+       where investor_id = p_investor_id order by "date" desc limit 1
+    ) last_ix on true
+  on conflict (investor_id) do update set
+    lifetime_invested = excluded.lifetime_invested,
+    txn_count = excluded.txn_count,
+    failed_txn_count = excluded.failed_txn_count,
+    sip_streak = excluded.sip_streak,
+    last_sip_month = excluded.last_sip_month,
+    fund_mix = excluded.fund_mix,
+    last_txn_date = excluded.last_txn_date,
+    recent_transactions = excluded.recent_transactions,
+    interaction_count = excluded.interaction_count,
+    conversions = excluded.conversions,
+    last_outcome = excluded.last_outcome,
+    last_sentiment = excluded.last_sentiment,
+    last_interaction_date = excluded.last_interaction_date,
+    objection_history = excluded.objection_history,
+    updated_at = excluded.updated_at;
+$$;
+
+create or replace function features_on_transaction()
+returns trigger
+language plpgsql
+as $$
+declare
+  f investor_features%rowtype;
+  m date;
+begin
+  if tg_op <> 'INSERT' then
+    perform refresh_investor_features(old.investor_id);
+    if tg_op = 'UPDATE' and new.investor_id is distinct from old.investor_id then
+      perform refresh_investor_features(new.investor_id);
+    end if;
+    return null;
+  end if;
+
+  insert into investor_features (investor_id) values (new.investor_id) on conflict do nothing;
+  select * into f from investor_features where investor_id = new.investor_id for update;
+
+  -- Late arrival: its place in the recent list and the streak can't be patched in, recompute
+  if f.last_txn_date is not null and new.transaction_date::date < f.last_txn_date then
+    perform refresh_investor_features(new.investor_id);
+    return null;
+  end if;
+
+  if new.status = 'Success' and new.transaction_type = 'SIP' then
+    m := date_trunc('month', new.transaction_date)::date;
+    if f.last_sip_month is null or m > (f.last_sip_month + interval '1 month')::date then
+      f.sip_streak := 1;  -- First SIP, or the chain broke
+    elsif m = (f.last_sip_month + interval '1 month')::date then
+      f.sip_streak := f.sip_streak + 1;
+    end if;
+    f.last_sip_month := greatest(f.last_sip_month, m);
+  end if;
+
+  update investor_features set
+    txn_count = txn_count + 1,
+    -- coalesce throughout: a NULL status / amount must never fail the base-table write
+    failed_txn_count = failed_txn_count + coalesce((new.status = 'Failed')::int, 0),
+    lifetime_invested = lifetime_invested + case when new.status = 'Success' then coalesce(new.amount, 0) else 0 end,
+    fund_mix = case
+      when new.status = 'Success' and new.fund_name is not null
+      then fund_mix || jsonb_build_object(new.fund_name, coalesce((fund_mix ->> new.fund_name)::numeric, 0) + coalesce(new.amount, 0))
+      else fund_mix end,
+    sip_streak = f.sip_streak,
+    last_sip_month = f.last_sip_month,
+    last_txn_date = new.transaction_date::date,
+    recent_transactions = (
+      select coalesce(jsonb_agg(e.t order by e.n), '[]')
+        from jsonb_array_elements(jsonb_build_array(to_jsonb(new)) || recent_transactions) with ordinality as e(t, n)
+       where e.n <= 20
+    ),
+    updated_at = now()
+  where investor_id = new.investor_id;
+  return null;
+end;
+$$;
+
+create or replace function features_on_interaction()
+returns trigger
+language plpgsql
+as $$
+begin
+  if tg_op <> 'INSERT' then
+    perform refresh_investor_features(old.investor_id);
+    if tg_op = 'UPDATE' and new.investor_id is distinct from old.investor_id then
+      perform refresh_investor_features(new.investor_id);
+    end if;
+    return null;
+  end if;
+
+  insert into investor_features (investor_id) values (new.investor_id) on conflict do nothing;
+  update investor_features set
+    interaction_count = interaction_count + 1,
+    conversions = conversions + coalesce((new.outcome = 'Converted')::int, 0),
+    -- A back-dated call doesn't replace the latest outcome
+    last_outcome = case when last_interaction_date is null or new."date"::date >= last_interaction_date then new.outcome else last_outcome end,
+    last_sentiment = case when last_interaction_date is null or new."date"::date >= last_interaction_date then new.sentiment else last_sentiment end,
+    last_interaction_date = greatest(last_interaction_date, new."date"::date),
+    objection_history = objection_history || coalesce((
+      select jsonb_object_agg(o, coalesce((objection_history ->> o)::int, 0) + n)
+        from (select o, count(*)::int as n from objection_list(new.objections_raised::text) o group by o) s
+    ), '{}'),
+    updated_at = now()
+  where investor_id = new.investor_id;
+  return null;
+end;
+$$;
+
+drop trigger if exists investor_features_txn on transactions;
+create trigger investor_features_txn
+  after insert or update or delete on transactions
+  for each row execute function features_on_transaction();
+
+drop trigger if exists investor_features_interaction on interactions;
+create trigger investor_features_interaction
+  after insert or update or delete on interactions
+  for each row execute function features_on_interaction();
+
+-- Lets the agent lead feed re-score a lead when its features move
+do $$
+begin
+  if not exists (
+    select 1 from pg_publication_tables
+     where pubname = 'supabase_realtime' and schemaname = 'public' and tablename = 'investor_features'
+  ) then
+    alter publication supabase_realtime add table investor_features;
+  end if;
+end;
+$$;
+
+-- Backfill
+select refresh_investor_features(investor_id) from investors;
@@ -0,0 +1,41 @@
+-- =================================================================
+-- 🎯 strategy_rules: pitch tags + match score for /agent/{agent_id}/leads
+-- =================================================================
+-- Run once in the Supabase SQL editor. Edits take effect without a deploy:
+-- the backend reloads enabled rules every STRATEGY_RULES_TTL_SEC (or on
+-- POST /admin/strategy-rules/reload) and recompiles them.
+-- Without this table the bundled backend/strategy_rules.json is used.
+--
+-- kind = 'tag':   lowest priority whose conditions all hold picks the lead's tag;
+--                 its points are added to the match score
+-- kind = 'score': points added to the match score whenever the conditions hold
+-- conditions: [{"field": <investors column or features.<investor_features column>>, "op": ..., "value": ...}], ANDed; [] always holds
+-- ops: eq ne gt ge lt le in not_in contains within_days
+-- match_score is clamped to 5..99
+
+create table if not exists strategy_rules (
+  id         text primary key,
+  kind       text not null check (kind in ('tag', 'score')),
+  priority   integer not null default 100,
+  tag        text,
+  conditions jsonb not null default '[]',
+  points     integer not null default 0,
+  enabled    boolean not null default true,
+  updated_at timestamptz not null default now()
+);
+
+insert into strategy_rules (id, kind, priority, tag, conditions, points) values
+  ('capital_protection', 'tag', 10, '🛡️ Capital Protection Strategy', '[{"field": "age", "op": "gt", "value": 50}]', 20),
+  ('high_liquidity', 'tag', 20, '💧 High Liquidity Pitch', '[{"field": "occupation", "op": "contains", "value": "Gig"}]', 15),
+  ('small_cap', 'tag', 30, '🚀 Small Cap Multiplier Pitch', '[{"field": "risk_appetite", "op": "contains", "value": "High"}]', 15),
+  ('tax_saver', 'tag', 40, '💼 Tax Saver (Section 54EC)', '[{"field": "occupation", "op": "contains", "value": "Business"}]', 15),
+  ('general', 'tag', 1000, 'General Follow-up', '[]', 0),
+  ('base', 'score', 100, null, '[]', 35),
+  ('sip_mid', 'score', 100, null, '[{"field": "sip_capacity", "op": "ge", "value": 5000}]', 10),
+  ('sip_high', 'score', 100, null, '[{"field": "sip_capacity", "op": "ge", "value": 15000}]', 10),
+  ('income_high', 'score', 100, null, '[{"field": "monthly_income_est", "op": "ge", "value": 100000}]', 10),
+  ('recently_active', 'score', 100, null, '[{"field": "last_activity_date", "op": "within_days", "value": 30}]', 15),
+  ('tier_1', 'score', 100, null, '[{"field": "tier", "op": "eq", "value": "Tier 1"}]', 5),
+  ('sip_streak', 'score', 100, null, '[{"field": "features.sip_streak", "op": "ge", "value": 6}]', 10),
+  ('payment_failures', 'score', 100, null, '[{"field": "features.failed_txn_ratio", "op": "ge", "value": 0.2}]', -10)
+on conflict (id) do nothing;
@@ -0,0 +1,74 @@
+import os
+import asyncio
+from sqlalchemy import create_engine, text, bindparam
+from sqlalchemy.engine import make_url
+from tracing import span
+
+# =================================================================
+# 🗄️ ANALYTICS SQL (Pooled engine, typed rows)
+# =================================================================
+# Fixed dashboard/chart queries go straight to Postgres and come back as typed
+# rows - no SQLDatabase.run() string round trip, no eval(). Statements are
+# declared once with text(...).columns(...); on Postgres the psycopg 3 driver
+# prepares them server-side after SQL_PREPARE_THRESHOLD runs (set "off" behind
+# a transaction-mode pooler such as Supavisor :6543).
+#
+# Any SQLAlchemy URL works, so `SQLStore("sqlite://")` is a drop-in stand-in
+# for local runs as long as the queries stick to portable SQL.
+
+SQL_POOL_SIZE = int(os.getenv("SQL_POOL_SIZE", "5"))
+SQL_POOL_OVERFLOW = int(os.getenv("SQL_POOL_OVERFLOW", "5"))
+SQL_PREPARE_THRESHOLD = os.getenv("SQL_PREPARE_THRESHOLD", "5")
+
+
+_PG_WRITE_COUNTERS = text(
+    "SELECT SUM(n_tup_ins + n_tup_upd + n_tup_del) FROM pg_stat_user_tables WHERE relname IN :tables"
+).bindparams(bindparam("tables", expanding=True))
+
+
+def _engine_url(raw: str):
+    url = make_url(raw)
+    if url.drivername in ("postgres", "postgresql"): url = url.set(drivername="postgresql+psycopg")
+    return url
+
+
+class SQLStore:
+    def __init__(self, url: str):
+        url = _engine_url(url)
+        options = {"pool_pre_ping": True}
+        if url.get_backend_name() == "postgresql":
+            threshold = None if SQL_PREPARE_THRESHOLD == "off" else int(SQL_PREPARE_THRESHOLD)
+            options.update(pool_size=SQL_POOL_SIZE, max_overflow=SQL_POOL_OVERFLOW, connect_args={"prepare_threshold": threshold})
+        self.engine = create_engine(url, **options)
+
+    def _fetch(self, statement, params: dict) -> list:
+        with self.engine.connect() as conn:
+            return conn.execute(statement, params).all()
+
+    async def fetch(self, statement, **params) -> list:
+        """
+        Rows as named tuples with the column types the statement declares.
+        """
+        with span("sql", query=str(statement)[:120]):
+            return await asyncio.to_thread(self._fetch, statement, params)
+
+    async def scalar(self, statement, **params):
+        rows = await self.fetch(statement, **params)
+        return rows[0][0] if rows else None
+
+    async def data_version(self, tables: tuple) -> int:
+        """
+        A number that changes whenever any of `tables` is written to.
+        Postgres: cumulative insert/update/delete counters from pg_stat_user_tables (no table scans).
+        Other engines (SQLite stand-in): total row count, which misses in-place updates.
+        """
+        if self.engine.dialect.name == "postgresql":
+            return int(await self.scalar(_PG_WRITE_COUNTERS, tables=list(tables)) or 0)
+        counts = " + ".join(f"(SELECT COUNT(*) FROM {t})" for t in tables)
+        return int(await self.scalar(text(f"SELECT {counts}")) or 0)
+
+    def close(self):
+        self.engine.dispose()
+
+
+analytics_db = SQLStore(os.environ["SUPABASE_DB_URL"]) if os.getenv("SUPABASE_DB_URL") else None
@@ -0,0 +1,251 @@
+import os
+import json
+import time
+import hashlib
+import datetime
+import numpy as np
+from postgrest.exceptions import APIError
+from clients import get_supabase, fetch_all
+
+# =================================================================
+# 🎯 STRATEGY TAGS (Compiled rules over the whole lead list)
+# =================================================================
+# Rules live in the strategy_rules table (sql/strategy_rules.sql), falling back
+# to strategy_rules.json. They're compiled once per rule-set version into
+# column predicates, then evaluated for every lead at once:
+#   tag         = first tag rule (by priority) whose conditions all hold
+#   match_score = chosen tag rule's points + points of every score rule that holds
+# Fields may reach one level into a nested record, e.g. "features.sip_streak".
+# String conditions are evaluated once per distinct value and broadcast back,
+# so cost is dominated by pulling the columns out of the row dicts. For the
+# bundled 13 rules that's roughly 3x the old 4-check if/elif chain and close to
+# the same 13 rules hand-written per row (benchmarks/bench_strategy_tags.py);
+# the lead feed caches the result per agent and re-runs it only on changed leads.
+
+RULES_PATH = os.getenv("STRATEGY_RULES_PATH", os.path.join(os.path.dirname(__file__), "strategy_rules.json"))
+STRATEGY_RULES_TTL_SEC = float(os.getenv("STRATEGY_RULES_TTL_SEC", "60"))
+DEFAULT_TAG = "General Follow-up"
+MATCH_SCORE_MIN, MATCH_SCORE_MAX = 5, 99
+
+NUMERIC_OPS = {"gt": np.greater, "ge": np.greater_equal, "lt": np.less, "le": np.less_equal}
+
+
+class Columns:
+    """
+    Lazily extracted, per-call cached columns of a list of lead dicts.
+    """
+
+    def __init__(self, leads: list):
+        self.leads = leads
+        self._cache = {}
+
+    def raw(self, field: str) -> list:
+        key = ("raw", field)
+        if key not in self._cache:
+            if "." not in field:
+                self._cache[key] = [lead.get(field) for lead in self.leads]
+            else:
+                outer, inner = field.split(".", 1) # e.g. features.sip_streak; the outer column is pulled once
+                records = self.raw(outer)
+                self._cache[key] = [r.get(inner) if r else None for r in records] if any(records) else [None] * len(records)
+        return self._cache[key]
+
+    def numbers(self, field: str) -> np.ndarray:
+        key = ("num", field)
+        if key not in self._cache:
+            values = self.raw(field)
+            try:
+                self._cache[key] = np.array(values, dtype=float) # None -> NaN
+            except (TypeError, ValueError):
+                self._cache[key] = np.array([_to_float(v) for v in values], dtype=float)
+        return self._cache[key]
+
+    def strings(self, field: str) -> tuple:
+        """
+        (distinct values, index of each lead's value) - predicates run on the distinct values only.
+        """
+        key = ("str", field)
+        if key not in self._cache:
+            self._cache[key] = _factorize(self.raw(field))
+        return self._cache[key]
+
+    def days_ago(self, field: str) -> np.ndarray:
+        key = ("days", field)
+        if key not in self._cache:
+            uniques, inverse = self.strings(field) # Few distinct dates: parse each once
+            today = datetime.date.today()
+            days = np.array([_days_since(u, today) for u in uniques], dtype=float)
+            self._cache[key] = days[inverse] if len(uniques) else np.zeros(len(self.leads))
+        return self._cache[key]
+
+
+def _factorize(values) -> tuple:
+    """
+    Distinct values (as strings, None -> "") and each row's index into them; a dict pass, no sort.
+    """
+    codes = {v: i for i, v in enumerate(dict.fromkeys(values))}
+    inverse = np.array(list(map(codes.__getitem__, values)), dtype=np.int64)
+    return ["" if v is None else str(v) for v in codes], inverse
+
+
+def _days_since(value: str, today: datetime.date) -> float:
+    try: return float((today - datetime.date.fromisoformat(value[:10])).days)
+    except ValueError: return np.nan # Missing or malformed: the condition just doesn't hold
+
+
+def _to_float(value) -> float:
+    try: return float(value)
+    except (TypeError, ValueError): return np.nan
+
+
+def _on_strings(cols: Columns, field: str, test) -> np.ndarray:
+    uniques, inverse = cols.strings(field)
+    return np.array([test(u) for u in uniques], dtype=bool)[inverse] if len(uniques) else np.zeros(len(cols.leads), dtype=bool)
+
+
+def compile_condition(cond: dict):
+    """
+    One {"field", "op", "value"} -> function(Columns) -> bool array. Raises ValueError on a bad rule.
+    """
+    field, op, value = cond.get("field"), cond.get("op"), cond.get("value")
+    if not field: raise ValueError(f"condition without a field: {cond}")
+    numeric = isinstance(value, (int, float)) and not isinstance(value, bool)
+
+    if op in NUMERIC_OPS:
+        if not numeric: raise ValueError(f"{op} needs a number: {cond}")
+        fn = NUMERIC_OPS[op]
+        return lambda cols: fn(cols.numbers(field), value) # NaN (missing) compares False
+    if op in ("eq", "ne") and numeric:
+        return lambda cols: (cols.numbers(field) == value) if op == "eq" else (cols.numbers(field) != value)
+    if op in ("eq", "ne"):
+        target = str(value)
+        return lambda cols: _on_strings(cols, field, lambda u: (u == target) == (op == "eq"))
+    if op in ("in", "not_in"):
+        if not isinstance(value, list): raise ValueError(f"{op} needs a list: {cond}")
+        options = {str(v) for v in value}
+        return lambda cols: _on_strings(cols, field, lambda u: (u in options) == (op == "in"))
+    if op == "contains": # Case-sensitive, like the `"Gig" in occupation` checks it replaced
+        needle = str(value)
+        return lambda cols: _on_strings(cols, field, lambda u: needle in u)
+    if op == "within_days":
+        if not numeric: raise ValueError(f"within_days needs a number: {cond}")
+        return lambda cols: cols.days_ago(field) <= value
+    raise ValueError(f"unknown op {op!r}: {cond}")
+
+
+def compile_rule(rule: dict):
+    """
+    All conditions ANDed; no conditions always holds.
+    """
+    preds = [compile_condition(c) for c in rule.get("conditions") or []]
+    def holds(cols: Columns) -> np.ndarray:
+        mask = np.ones(len(cols.leads), dtype=bool)
+        for pred in preds: mask &= pred(cols)
+        return mask
+    return holds
+
+
+class CompiledRules:
+    def __init__(self, rules: list):
+        tag_rules = sorted((r for r in rules if r.get("kind") == "tag"), key=lambda r: (r.get("priority", 100), r["id"]))
+        score_rules = [r for r in rules if r.get("kind") == "score"]
+        self.tag_preds = [compile_rule(r) for r in tag_rules]
+        self.tags = [r.get("tag") or DEFAULT_TAG for r in tag_rules] + [DEFAULT_TAG] # Catch-all if no tag rule holds
+        self.tag_points = np.array([r.get("points", 0) for r in tag_rules] + [0], dtype=np.int64)
+        self.score_preds = [compile_rule(r) for r in score_rules]
+        self.score_points = np.array([r.get("points", 0) for r in score_rules], dtype=np.int64)
+
+    def evaluate(self, leads: list) -> tuple:
+        """
+        (tag per lead, match score per lead)
+        """
+        n = len(leads)
+        cols = Columns(leads)
+        hits = np.vstack([pred(cols) for pred in self.tag_preds] + [np.ones(n, dtype=bool)])
+        choice = hits.argmax(axis=0) # First rule that holds, in priority order
+        scores = self.tag_points[choice]
+        if self.score_preds:
+            scores = scores + self.score_points @ np.vstack([pred(cols) for pred in self.score_preds]).astype(np.int64)
+        return [self.tags[c] for c in choice], np.clip(scores, MATCH_SCORE_MIN, MATCH_SCORE_MAX)
+
+
+class StrategyEngine:
+    """
+    Keeps the compiled rule set current; evaluation itself is synchronous.
+    """
+
+    def __init__(self, path: str = RULES_PATH, ttl: float = STRATEGY_RULES_TTL_SEC):
+        self.path = path
+        self.ttl = ttl
+        self.source = None
+        self.version = None
+        self.rules = []
+        self.compiled = CompiledRules([])
+        self.loaded_at = 0.0
+        self.evaluated = 0
+        self.last_eval_ms = 0.0
+        self._use_table = True
+        self.load_file() # Usable before the first refresh, even with Supabase down
+        self.loaded_at = 0.0 # ...but the table is still checked on first use
+
+    def _install(self, rules: list, source: str) -> bool:
+        """
+        Compiles and swaps in a rule set. Returns True if it changed; bad rules keep the old set.
+        """
+        rules = [r for r in rules if r.get("enabled", True)]
+        version = hashlib.sha1(json.dumps(rules, sort_keys=True, default=str).encode()).hexdigest()[:12]
+        self.loaded_at = time.monotonic()
+        if version == self.version: return False
+        try:
+            compiled = CompiledRules(rules)
+        except (ValueError, KeyError) as e:
+            print(f"⚠️ Strategy rules from {source} rejected, keeping version {self.version}: {e}")
+            return False
+        self.rules, self.compiled, self.version, self.source = rules, compiled, version, source
+        print(f"🎯 Strategy rules v{version} compiled from {source} ({len(rules)} rules)")
+        return True
+
+    def load_file(self) -> bool:
+        with open(self.path, encoding="utf-8") as f:
+            return self._install(json.load(f), "file")
+
+    async def refresh(self, force: bool = False) -> bool:
+        """
+        Reloads from strategy_rules when the TTL has passed. Returns True if the rules changed.
+        """
+        if not force and time.monotonic() - self.loaded_at < self.ttl: return False
+        if not self._use_table: return self.load_file()
+        try:
+            supabase = await get_supabase()
+            rows = await fetch_all(lambda: supabase.table("strategy_rules").select("*").eq("enabled", True), "id")
+        except APIError as e:
+            if e.code not in ("PGRST205", "42P01"): raise # Anything but "table not found" is a real failure
+            self._use_table = False
+            print("⚠️ strategy_rules table missing (run backend/sql/strategy_rules.sql); using strategy_rules.json")
+            return self.load_file()
+        except Exception as e:
+            self.loaded_at = time.monotonic() # Back off for a TTL; keep serving the current rules
+            print(f"Strategy rules reload failed: {e}")
+            return False
+        if not rows: return self.load_file() # Table created but not seeded (or everything disabled)
+        return self._install(rows, "table")
+
+    def enrich(self, leads: list) -> list:
+        if not leads: return []
+        start = time.perf_counter()
+        tags, scores = self.compiled.evaluate(leads)
+        self.evaluated += len(leads)
+        self.last_eval_ms = round((time.perf_counter() - start) * 1000, 3)
+        return [{**lead, "ai_strategy_tag": tag, "match_score": int(score)} for lead, tag, score in zip(leads, tags, scores)]
+
+    def stats(self) -> dict:
+        return {
+            "version": self.version,
+            "source": self.source,
+            "rules": len(self.rules),
+            "evaluated": self.evaluated,
+            "last_eval_ms": self.last_eval_ms,
+        }
+
+
+strategy_engine = StrategyEngine()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# admin.py builds its clients at import time; placeholders keep that offline
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+for name in ("SUPABASE_URL", "SUPABASE_KEY", "GROQ_API_KEY", "GEMINI_API_KEY"):
+    os.environ.setdefault(name, "test")
+os.environ.pop("SUPABASE_DB_URL", None)
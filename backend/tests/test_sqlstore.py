@@ -0,0 +1,77 @@
+import asyncio
+import datetime
+import pytest
+from sqlalchemy import text
+from sqlstore import SQLStore
+from admin import DASHBOARD_SNAPSHOT, REVENUE_BY_DAY, TOP_CONVERTERS, TOP_EARNERS, INVESTORS_BY_RISK, INVESTORS_BY_OCCUPATION
+
+SCHEMA = (
+    "CREATE TABLE agents (agent_id TEXT PRIMARY KEY, name TEXT)",
+    "CREATE TABLE investors (investor_id TEXT PRIMARY KEY, assigned_agent_id TEXT, risk_appetite TEXT, occupation TEXT)",
+    "CREATE TABLE interactions (interaction_id INTEGER PRIMARY KEY, agent_id TEXT, investor_id TEXT, outcome TEXT)",
+    "CREATE TABLE transactions (txn_id INTEGER PRIMARY KEY, investor_id TEXT, amount REAL, status TEXT, transaction_date DATE)",
+)
+AGENTS = [("a1", "Asha"), ("a2", "Ravi")]
+INVESTORS = [("i1", "a1", "High", "Doctor"), ("i2", "a1", "Low", "Doctor"), ("i3", "a2", "High", "Engineer")]
+INTERACTIONS = [(1, "a1", "i1", "Converted"), (2, "a1", "i2", "Converted"), (3, "a2", "i3", "Converted"), (4, "a2", "i3", "Callback")]
+TRANSACTIONS = [
+    (1, "i1", 1000, "Success", "2026-10-01"),
+    (2, "i2", 500, "Success", "2026-10-01"),
+    (3, "i3", 4000, "Success", "2026-10-02"),
+    (4, "i3", 9999, "Failed", "2026-10-02"),
+    (5, "i1", 250, "Success", "2026-10-03"),
+]
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SQLStore(f"sqlite:///{tmp_path / 'analytics.db'}")
+    with store.engine.begin() as conn:
+        for ddl in SCHEMA: conn.execute(text(ddl))
+        conn.execute(text("INSERT INTO agents VALUES (:a, :b)"), [dict(zip("ab", r)) for r in AGENTS])
+        conn.execute(text("INSERT INTO investors VALUES (:a, :b, :c, :d)"), [dict(zip("abcd", r)) for r in INVESTORS])
+        conn.execute(text("INSERT INTO interactions VALUES (:a, :b, :c, :d)"), [dict(zip("abcd", r)) for r in INTERACTIONS])
+        conn.execute(text("INSERT INTO transactions VALUES (:a, :b, :c, :d, :e)"), [dict(zip("abcde", r)) for r in TRANSACTIONS])
+    yield store
+    store.close()
+
+
+def test_dashboard_snapshot(store):
+    rows = run(store.fetch(DASHBOARD_SNAPSHOT, days=2))
+    assert [(row.day, row.value) for row in rows] == [(datetime.date(2026, 10, 2), 4000), (datetime.date(2026, 10, 3), 250)]
+    assert {(row.revenue, row.agents, row.rate) for row in rows} == {(5750, 2, 75.0)}
+
+
+def test_dashboard_snapshot_without_transactions(store):
+    with store.engine.begin() as conn: conn.execute(text("DELETE FROM transactions"))
+    rows = run(store.fetch(DASHBOARD_SNAPSHOT, days=7))
+    assert len(rows) == 1 and rows[0].day is None and rows[0].revenue is None
+    assert (rows[0].agents, rows[0].rate) == (2, 75.0)
+
+
+def test_revenue_by_day(store):
+    rows = run(store.fetch(REVENUE_BY_DAY, days=7))
+    assert [(row.day, row.value) for row in rows] == [
+        (datetime.date(2026, 10, 3), 250), (datetime.date(2026, 10, 2), 4000), (datetime.date(2026, 10, 1), 1500)
+    ]
+    assert len(run(store.fetch(REVENUE_BY_DAY, days=1))) == 1
+
+
+def test_top_queries(store):
+    assert [tuple(row) for row in run(store.fetch(TOP_CONVERTERS, limit=5))] == [("Asha", 2), ("Ravi", 1)]
+    assert [tuple(row) for row in run(store.fetch(TOP_EARNERS, limit=5))] == [("Ravi", 4000), ("Asha", 1750)]
+    assert [tuple(row) for row in run(store.fetch(TOP_EARNERS, limit=1))] == [("Ravi", 4000)]
+    assert sorted(tuple(row) for row in run(store.fetch(INVESTORS_BY_RISK))) == [("High", 2), ("Low", 1)]
+    assert sorted(tuple(row) for row in run(store.fetch(INVESTORS_BY_OCCUPATION))) == [("Doctor", 2), ("Engineer", 1)]
+
+
+def test_data_version_moves_on_writes_to_watched_tables(store):
+    before = run(store.data_version(("transactions", "interactions")))
+    with store.engine.begin() as conn: conn.execute(text("INSERT INTO agents VALUES ('a3', 'Meera')"))
+    assert run(store.data_version(("transactions", "interactions"))) == before
+    with store.engine.begin() as conn: conn.execute(text("INSERT INTO interactions VALUES (5, 'a3', 'i1', 'Converted')"))
+    assert run(store.data_version(("transactions", "interactions"))) != before
@@ -0,0 +1,218 @@
+import os
+import time
+import uuid
+import bisect
+import contextvars
+from urllib.parse import parse_qs
+from cache import TTLCache
+
+# =================================================================
+# 🔬 REQUEST TRACING (Span trees + slow-request log)
+# =================================================================
+# Every HTTP request gets a root span; Supabase calls, LLM calls, JSON parses,
+# SQL and ReportLab builds hang child spans off whatever span is current (a few
+# small objects per call). The tree is kept only if the request makes the slow
+# log or was profiled, and dropped otherwise. With no active trace every span()
+# is a no-op, so background work pays nothing.
+#
+# Flag one request with `X-Profile: 1` or `?profile=1` to get an `X-Trace-Id`
+# plus `Server-Timing` header back; the full tree is then at
+# /admin/debug/trace/{id}. The slowest recent requests are always kept for
+# /admin/debug/slow. Server-sent event streams (dispatch feed, chat) stay open
+# for as long as a dashboard does, so they're logged by time to first byte.
+
+SLOW_LOG_SIZE = int(os.getenv("SLOW_LOG_SIZE", "20"))
+SLOW_LOG_WINDOW_SEC = float(os.getenv("SLOW_LOG_WINDOW_SEC", "900"))
+
+_current = contextvars.ContextVar("sipbrain_span", default=None)
+
+
+class Span:
+    __slots__ = ("name", "attrs", "start", "end", "children")
+
+    def __init__(self, name: str, attrs: dict | None = None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.start = time.perf_counter()
+        self.end = None
+        self.children = []
+
+    def finish(self, **attrs):
+        if attrs: self.attrs.update(attrs)
+        self.end = time.perf_counter()
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.perf_counter()) - self.start
+
+    def to_dict(self, origin: float | None = None) -> dict:
+        origin = self.start if origin is None else origin
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 2),
+            "duration_ms": round(self.duration * 1000, 2),
+            **({"attrs": self.attrs} if self.attrs else {}),
+            **({"children": [c.to_dict(origin) for c in self.children]} if self.children else {}),
+        }
+
+
+def start_span(name: str, **attrs):
+    """
+    Opens a leaf span under the current one without making it current
+    (for callbacks like httpx hooks that start and finish in different places).
+    Returns None when nothing is being traced.
+    """
+    parent = _current.get()
+    if parent is None: return None
+    child = Span(name, attrs)
+    parent.children.append(child)
+    return child
+
+
+class span:
+    """
+    `with span("json.parse"):` or `async with span("llm:groq", model=...):`
+    """
+    __slots__ = ("name", "attrs", "_span", "_token")
+
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        self.attrs = attrs
+        self._span = None
+        self._token = None
+
+    def __enter__(self):
+        parent = _current.get()
+        if parent is not None:
+            self._span = Span(self.name, self.attrs)
+            parent.children.append(self._span)
+            self._token = _current.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._span is not None:
+            self._span.finish(**({"error": exc_type.__name__} if exc_type else {}))
+            _current.reset(self._token)
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+# --- httpx hooks (Supabase pool) ---
+
+async def _on_request(request):
+    s = start_span("supabase", method=request.method, path=request.url.path)
+    if s is not None: request.extensions["sipbrain_span"] = s
+
+
+async def _on_response(response):
+    s = response.request.extensions.get("sipbrain_span")
+    if s is not None: s.finish(status=response.status_code)
+
+
+TRACE_EVENT_HOOKS = {"request": [_on_request], "response": [_on_response]}
+
+
+# --- Slow log + profiled traces ---
+
+class SlowLog:
+    """
+    Keeps the N slowest requests seen within the recent window, slowest first.
+    """
+
+    def __init__(self, size: int = SLOW_LOG_SIZE, window: float = SLOW_LOG_WINDOW_SEC):
+        self.size = size
+        self.window = window
+        self._entries = [] # sorted ascending by -duration
+
+    def qualifies(self, duration_ms: float) -> bool:
+        cutoff = time.time() - self.window
+        self._entries = [e for e in self._entries if e[1]["finished_at"] >= cutoff]
+        return len(self._entries) < self.size or -duration_ms < self._entries[-1][0]
+
+    def record(self, entry: dict):
+        bisect.insort(self._entries, (-entry["duration_ms"], entry), key=lambda e: e[0])
+        del self._entries[self.size:]
+
+    def entries(self) -> list:
+        cutoff = time.time() - self.window
+        return [e for _, e in self._entries if e["finished_at"] >= cutoff]
+
+
+slow_log = SlowLog()
+profiled_traces = TTLCache(maxsize=200, ttl=900)
+
+
+def _server_timing(root: Span) -> str:
+    totals = {}
+    for child in root.children:
+        key = child.name.replace(":", "_").replace(" ", "_")
+        totals[key] = totals.get(key, 0.0) + child.duration
+    parts = [f"{name};dur={dur * 1000:.1f}" for name, dur in totals.items()]
+    parts.append(f"total;dur={root.duration * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class TracingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        flagged = headers.get(b"x-profile", b"") in (b"1", b"true") or query.get("profile", [""])[-1] in ("1", "true")
+        trace_id = uuid.uuid4().hex[:16]
+        root = Span(f"{scope['method']} {scope['path']}")
+        token = _current.set(root)
+        streaming = False
+        first_byte = None
+
+        async def send_wrapper(message):
+            nonlocal streaming, first_byte
+            if message["type"] == "http.response.start":
+                streaming = any(k.lower() == b"content-type" and v.startswith(b"text/event-stream") for k, v in message.get("headers") or [])
+                if flagged:
+                    message.setdefault("headers", [])
+                    message["headers"] = list(message["headers"]) + [
+                        (b"x-trace-id", trace_id.encode()),
+                        (b"server-timing", _server_timing(root).encode()),
+                    ]
+            elif message["type"] == "http.response.body" and first_byte is None:
+                first_byte = time.perf_counter()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            root.finish()
+            if streaming: # Open for minutes or hours: time to first byte is the latency that matters
+                root.end = first_byte or root.end
+                root.attrs["stream"] = "time to first byte"
+            self._record(scope, root, trace_id, flagged)
+
+    @staticmethod
+    def _record(scope, root: Span, trace_id: str, flagged: bool):
+        duration_ms = round(root.duration * 1000, 2)
+        slow = slow_log.qualifies(duration_ms)
+        if not (slow or flagged): return
+
+        route = scope.get("route")
+        if route is not None: root.name = f"{scope['method']} {route.path}"
+        entry = {
+            "trace_id": trace_id,
+            "route": root.name,
+            "path": scope["path"],
+            "duration_ms": duration_ms,
+            "finished_at": time.time(),
+            "spans": root.to_dict(),
+        }
+        if slow: slow_log.record(entry)
+        if flagged: profiled_traces.set(trace_id, entry)
@@ -0,0 +1,104 @@
+import os
+import json
+from collections import deque
+
+# =================================================================
+# ⚡ FAST TRIGGER ENGINE (Aho-Corasick over cockpit_rules.json)
+# =================================================================
+# All rule phrases are compiled into one automaton at startup, so every
+# transcript fragment is scanned in a single pass regardless of rule count.
+
+RULES_PATH = os.getenv("COCKPIT_RULES_PATH", os.path.join(os.path.dirname(__file__), "cockpit_rules.json"))
+
+
+class TriggerEngine:
+    def __init__(self, rules: list):
+        self.rules = rules
+        self.hits = {rule['id']: 0 for rule in rules}
+        self.scanned = 0
+        self.matched = 0 # Every match is a Groq round trip we didn't pay for
+
+        # Trie: goto[state] = {char: next_state}; out[state] = [(pattern_len, rule_idx)]
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for idx, rule in enumerate(rules):
+            for pattern in rule['patterns']:
+                self._add(pattern.lower(), idx)
+        self._build_links()
+
+    @classmethod
+    def from_file(cls, path: str = RULES_PATH):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _add(self, pattern: str, rule_idx: int):
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            state = nxt
+        self._out[state].append((len(pattern), rule_idx))
+
+    def _build_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def find_all(self, text: str) -> list:
+        """
+        Returns the indices of every rule whose phrase appears as a whole word/phrase (or its plural).
+        """
+        text = text.lower()
+        found = []
+        state = 0
+        for i, ch in enumerate(text):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for length, rule_idx in self._out[state]:
+                start = i - length + 1
+                # Word boundaries so "fd" doesn't fire inside "fdi"; a plural "s" is allowed ("fds", "fixed deposits")
+                if start > 0 and text[start - 1].isalnum(): continue
+                end = i + 2 if text[i + 1:i + 2] == "s" else i + 1
+                if end < len(text) and text[end].isalnum(): continue
+                if rule_idx not in found: found.append(rule_idx)
+        return found
+
+    def match(self, text: str):
+        """
+        Returns the card of the best matching rule (highest priority, then earliest), or None.
+        """
+        self.scanned += 1
+        found = self.find_all(text)
+        if not found: return None
+
+        best = max(found, key=lambda idx: self.rules[idx].get('priority', 0))
+        rule = self.rules[best]
+        self.hits[rule['id']] += 1
+        self.matched += 1
+        return rule['card']
+
+    def stats(self) -> dict:
+        return {
+            "rules": len(self.rules),
+            "scanned": self.scanned,
+            "matched": self.matched,
+            "hit_ratio": round(self.matched / self.scanned, 4) if self.scanned else 0.0,
+            "hits_by_rule": self.hits,
+        }
+
+
+trigger_engine = TriggerEngine.from_file()
@@ -28,6 +28,8 @@ const formatCurrency = (val: number) => {
   return `₹${val.toLocaleString()}`;
 };
 
+const FEED_SIZE = 50;
+
 export default function AdminDashboard() {
   const [stats, setStats] = useState({ revenue: 0, activeLeads: 0, conversionRate: 0 });
   const [revenueChart, setRevenueChart] = useState<any[]>([]);
@@ -43,11 +45,50 @@ export default function AdminDashboard() {
   const [chatQuery, setChatQuery] = useState("");
   const [isTyping, setIsTyping] = useState(false);
   const chatScrollRef = useRef<HTMLDivElement>(null);
+  const latestCursor = useRef<string | null>(null);
 
   useEffect(() => {
     fetchData();
   }, []);
 
+  // Live dispatch feed: decisions show up (pending) as they are made; "committed" swaps them for the stored rows
+  useEffect(() => {
+    const events = new EventSource('http://localhost:8000/admin/dispatch-feed/stream');
+    events.addEventListener('ready', () => { setBackendStatus(true); pullNewLogs(); }); // Also fills gaps after a reconnect
+    events.addEventListener('decision', (e: MessageEvent) => {
+      const decision = JSON.parse(e.data);
+      setDispatchLogs(prev => [{ ...decision, pending: true }, ...prev].slice(0, FEED_SIZE));
+    });
+    events.addEventListener('committed', (e: MessageEvent) => pullNewLogs(JSON.parse(e.data).run));
+    events.addEventListener('override', (e: MessageEvent) => {
+      const correction = JSON.parse(e.data);
+      setDispatchLogs(prev => prev.map(log => String(log.id) === String(correction.id) ? { ...log, ...correction } : log));
+    });
+    events.onerror = () => setBackendStatus(false);
+    return () => events.close();
+  }, []);
+
+  // Only rows newer than the last one we have; with no cursor yet (empty log) start from the first page
+  const pullNewLogs = async (run?: string) => {
+    try {
+      if (!latestCursor.current) {
+        const res = await axios.get('http://localhost:8000/admin/dispatch-feed', { params: { limit: FEED_SIZE } });
+        latestCursor.current = res.data.latest_cursor;
+        setDispatchLogs(prev => [...res.data.logs, ...prev.filter(log => !(log.pending && (run === undefined || log.run === run)))].slice(0, FEED_SIZE));
+        return;
+      }
+      let fresh: any[] = [];
+      let hasMore = true;
+      while (hasMore) {
+        const res = await axios.get('http://localhost:8000/admin/dispatch-feed', { params: { since: latestCursor.current } });
+        fresh = [...res.data.logs, ...fresh];
+        latestCursor.current = res.data.latest_cursor;
+        hasMore = res.data.has_more;
+      }
+      setDispatchLogs(prev => [...fresh, ...prev.filter(log => !(log.pending && (run === undefined || log.run === run)))].slice(0, FEED_SIZE));
+    } catch (e) { setBackendStatus(false); }
+  };
+
   useEffect(() => {
     if (chatScrollRef.current) {
         chatScrollRef.current.scrollTop = chatScrollRef.current.scrollHeight;
@@ -71,8 +112,9 @@ export default function AdminDashboard() {
 
       // 3. Dispatch Logs
       try {
-          const res = await axios.get('http://localhost:8000/admin/dispatch-feed');
-          setDispatchLogs(res.data);
+          const res = await axios.get('http://localhost:8000/admin/dispatch-feed', { params: { limit: FEED_SIZE } });
+          setDispatchLogs(res.data.logs);
+          latestCursor.current = res.data.latest_cursor;
           setBackendStatus(true);
       } catch (e) { setBackendStatus(false); }
 
@@ -82,18 +124,16 @@ export default function AdminDashboard() {
   const runAIDispatcher = async () => {
     setLoading(true);
     try {
+      // Decisions arrive over the live feed while this runs; the pull covers a missed stream
       await axios.post('http://localhost:8000/admin/trigger-assignment');
-      setTimeout(async () => {
-         const res = await axios.get('http://localhost:8000/admin/dispatch-feed');
-         setDispatchLogs(res.data);
-         setLoading(false);
-      }, 1000);
+      await pullNewLogs();
+      setLoading(false);
     } catch (e) { setLoading(false); alert("AI Offline"); }
   };
 
   const handleOverride = async (logId: string) => {
     const newAgent = prompt("Enter new agent name:");
-    if (!newAgent) return;
+    if (!newAgent || !logId) return; // Pending rows have no id until their run commits
     setDispatchLogs(prev => prev.map(log => log.id === logId ? { ...log, assigned_agent: newAgent, admin_corrected: true, reasoning: `👨‍💼 ADMIN OVERRIDE: Re-assigned to ${newAgent}.` } : log));
     await axios.post('http://localhost:8000/admin/override-assignment', { log_id: logId, new_agent_name: newAgent });
   };
@@ -105,12 +145,43 @@ export default function AdminDashboard() {
       setChatQuery("");
       setIsTyping(true);
 
+      // One AI message, filled in by SSE events as they arrive (created on the first event)
+      const msgId = Date.now();
+      const patch = (fn: (m: any) => any) => {
+        setIsTyping(false);
+        setChatHistory(prev => prev.some(m => m.id === msgId)
+          ? prev.map(m => m.id === msgId ? { ...m, ...fn(m) } : m)
+          : [...prev, { type: 'ai', id: msgId, text: '', ...fn({ text: '' }) }]);
+      };
+
       try {
-        const res = await axios.post('http://localhost:8000/admin/chat', { question: userMsg.text });
-        const aiMsg = { type: 'ai', text: res.data.answer, chart: res.data.chart_data, chartType: res.data.chart_type };
-        setChatHistory(prev => [...prev, aiMsg]);
+        const res = await fetch('http://localhost:8000/admin/chat/stream', {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json' },
+          body: JSON.stringify({ question: userMsg.text }),
+        });
+        if (!res.ok || !res.body) throw new Error(`HTTP ${res.status}`);
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+          const { value, done } = await reader.read();
+          if (done) break;
+          buffer += decoder.decode(value, { stream: true });
+          const frames = buffer.split('\n\n');
+          buffer = frames.pop() || '';
+          for (const frame of frames) {
+            const event = frame.match(/^event: (.*)$/m)?.[1];
+            const data = JSON.parse(frame.match(/^data: (.*)$/m)?.[1] || '{}');
+            if (event === 'step') patch(() => ({ status: data.tool === 'router' ? 'Reading question...' : `Running ${data.tool}...` }));
+            else if (event === 'sql') patch(() => ({ status: 'Querying database...' }));
+            else if (event === 'chart') patch(() => ({ chart: data.chart_data, chartType: data.chart_type }));
+            else if (event === 'token') patch(m => ({ text: m.text + data.text }));
+            else if (event === 'answer') patch(() => ({ text: data.answer, chart: data.chart_data, chartType: data.chart_type, status: null }));
+          }
+        }
       } catch (err) {
-        setChatHistory(prev => [...prev, { type: 'ai', text: "Connection Error." }]);
+        patch(() => ({ text: "Connection Error.", status: null }));
       }
       setIsTyping(false);
     }
@@ -203,7 +274,7 @@ export default function AdminDashboard() {
                        </div>
                        <div className="divide-y divide-slate-100">
                           {dispatchLogs.map(log => (
-                             <DispatchRow key={log.id} log={log} expanded={expandedDecision === log.id} onToggle={() => setExpandedDecision(expandedDecision === log.id ? null : log.id)} onOverride={handleOverride} />
+                             <DispatchRow key={log.id ?? `${log.run}-${log.investor_id}`} log={log} expanded={expandedDecision === log.id} onToggle={() => setExpandedDecision(expandedDecision === log.id ? null : log.id)} onOverride={handleOverride} />
                           ))}
                        </div>
                     </div>
@@ -408,7 +479,8 @@ function ChatMessage({ msg }: any) {
    return (
       <div className={`flex ${isUser ? 'justify-end' : 'justify-start'}`}>
          <div className={`max-w-[90%] p-4 rounded-2xl text-sm leading-relaxed shadow-sm ${isUser ? 'bg-indigo-600 text-white rounded-br-none' : 'bg-white border border-slate-200 text-slate-700 rounded-bl-none'}`}>
-            <p>{msg.text}</p>
+            {msg.status && <p className="text-xs text-slate-400 italic mb-1">{msg.status}</p>}
+            {msg.text && <p>{msg.text}</p>}
             {msg.chart && (
                <div className="mt-4 h-48 w-full bg-slate-50 rounded-xl border border-slate-100 pt-4 pr-4 pb-2">
                   <ResponsiveContainer width="100%" height="100%">
@@ -27,15 +27,51 @@ export default function AgentDashboard() {
         };
         sequence();
 
+        // Live feed: one snapshot, then only the leads that changed.
+        // If the socket drops we poll (the server answers 304 while nothing changed) and keep retrying it.
+        let socket: WebSocket | null = null;
+        let interval: ReturnType<typeof setInterval> | null = null;
+        let retry: ReturnType<typeof setTimeout> | null = null;
+        let closed = false;
+
         const fetchMyLeads = async () => {
             try {
                 const res = await axios.get(`http://localhost:8000/agent/${agentId}/leads`);
                 setLeads(res.data);
             } catch (e) { console.error("Backend offline"); }
         };
-        fetchMyLeads();
-        const interval = setInterval(fetchMyLeads, 5000);
-        return () => clearInterval(interval);
+
+        const connect = () => {
+            socket = new WebSocket(`ws://localhost:8000/ws/agent/${agentId}/leads`);
+            socket.onopen = () => {
+                if (interval) { clearInterval(interval); interval = null; }
+            };
+            socket.onmessage = (event) => {
+                const msg = JSON.parse(event.data);
+                if (msg.type === 'snapshot') { setLeads(msg.leads); return; }
+                setLeads(prev => {
+                    const removed = new Set(msg.removed);
+                    const updated = new Map(msg.upserted.map((l: any) => [l.investor_id, l]));
+                    const known = new Set(prev.map(l => l.investor_id));
+                    // Updated leads keep their position, new ones go to the end
+                    const kept = prev.filter(l => !removed.has(l.investor_id)).map(l => updated.get(l.investor_id) ?? l);
+                    return [...kept, ...msg.upserted.filter((l: any) => !known.has(l.investor_id))];
+                });
+            };
+            socket.onclose = () => {
+                if (closed) return;
+                if (!interval) { fetchMyLeads(); interval = setInterval(fetchMyLeads, 5000); }
+                retry = setTimeout(connect, 10000);
+            };
+        };
+        connect();
+
+        return () => {
+            closed = true;
+            socket?.close();
+            if (interval) clearInterval(interval);
+            if (retry) clearTimeout(retry);
+        };
     }, [user.id, navigate]);
 
     const handleLogout = () => {
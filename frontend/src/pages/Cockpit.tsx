@@ -37,16 +37,32 @@ export default function Cockpit() {
   useEffect(() => {
     if (status !== 'live') return;
 
-    ws.current = new WebSocket('ws://localhost:8000/ws/cockpit');
+    ws.current = new WebSocket('ws://localhost:8000/ws/cockpit?stream=1');
 
     ws.current.onopen = () => console.log('🟢 Connected to AI Brain');
     
     ws.current.onmessage = (event) => {
       const data = JSON.parse(event.data);
+
+      // STREAMED CARD (partial frames share the final card's id)
+      if (data.stream === 'start') {
+        setInterventions(prev => [...prev, { ...data, content: '' }]);
+        setTimeout(() => cardsEndRef.current?.scrollIntoView({ behavior: 'smooth' }), 100);
+        return;
+      }
+      if (data.stream === 'delta') {
+        setInterventions(prev => prev.map(c => c.id === data.id ? { ...c, content: data.content } : c));
+        setCurrentScript(data.content);
+        return;
+      }
+      if (data.stream === 'cancel') {
+        setInterventions(prev => prev.filter(c => c.id !== data.id));
+        return;
+      }
       
-      // AI SENT A FLASH CARD
-      if (data.type === 'objection' || data.type === 'fact') {
-        setInterventions(prev => [...prev, data]);
+      // AI SENT A FLASH CARD (Replaces its streamed draft, if any)
+      if (data.type === 'objection' || data.type === 'fact' || data.type === 'compliance') {
+        setInterventions(prev => prev.some(c => c.id === data.id) ? prev.map(c => c.id === data.id ? data : c) : [...prev, data]);
         // Update Teleprompter
         if (data.content) setCurrentScript(data.content);
         // Scroll to new card
@@ -152,11 +168,11 @@ export default function Cockpit() {
                        key={card.id}
                        initial={{ opacity: 0, x: 50 }}
                        animate={{ opacity: 1, x: 0 }}
-                       className={`p-6 rounded-xl border shadow-2xl ${card.type === 'objection' ? 'bg-orange-950/20 border-orange-500/40' : 'bg-blue-950/20 border-blue-500/40'}`}
+                       className={`p-6 rounded-xl border shadow-2xl ${card.type === 'compliance' ? 'bg-red-950/30 border-red-500/60 animate-pulse' : card.type === 'objection' ? 'bg-orange-950/20 border-orange-500/40' : 'bg-blue-950/20 border-blue-500/40'}`}
                     >
                        <div className="flex items-center gap-3 mb-2">
-                          {card.type === 'objection' ? <AlertTriangle className="text-orange-500" /> : <LineChart className="text-blue-500" />}
-                          <h3 className={`text-lg font-bold ${card.type === 'objection' ? 'text-orange-400' : 'text-blue-400'}`}>{card.title}</h3>
+                          {card.type === 'compliance' ? <Shield className="text-red-500" /> : card.type === 'objection' ? <AlertTriangle className="text-orange-500" /> : <LineChart className="text-blue-500" />}
+                          <h3 className={`text-lg font-bold ${card.type === 'compliance' ? 'text-red-400' : card.type === 'objection' ? 'text-orange-400' : 'text-blue-400'}`}>{card.title}</h3>
                        </div>
                        <p className="text-slate-200 text-lg">{card.content}</p>
                        